@@ -190,6 +190,9 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
     SECURE_SSL_REDIRECT = True
 
+# Los comprobantes con cientos de líneas envían ~7 campos por línea en el formset
+DATA_UPLOAD_MAX_NUMBER_FIELDS = config('DATA_UPLOAD_MAX_NUMBER_FIELDS', default=10000, cast=int)
+
 # Login URL
 LOGIN_URL = 'login:login'
 LOGIN_REDIRECT_URL = 'dashboard:home'
@@ -21,6 +21,12 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
 from login.api import MyTokenObtainPairView, MeView, LogoutView
+from cuentas.api import (
+    BalanceComprobacionAPIView, EstadoResultadosAPIView, BalanceGeneralAPIView, SaldosCuentasAPIView,
+    EstadoFlujoEfectivoAPIView, EstadoCambiosPatrimonioAPIView,
+)
+from transacciones.api import ComprobantesBulkView, ExportarDetallesView, CambiosView, BusquedaComprobantesView
+from inventario.api import AlertasStockView, ProductoPorCodigoView
 
 urlpatterns = [
     path('', lambda request: redirect('dashboard:home') if request.user.is_authenticated else redirect('login:landing'), name='home'),
@@ -40,6 +46,25 @@ urlpatterns = [
     path('api/auth/login/', MyTokenObtainPairView.as_view(), name='auth_login'),
     path('api/auth/me/', MeView.as_view(), name='auth_me'),
     path('api/auth/logout/', LogoutView.as_view(), name='auth_logout'),
+    
+    # Reportes financieros (JSON con ETag)
+    path('api/reportes/balance-comprobacion/', BalanceComprobacionAPIView.as_view(), name='api_balance_comprobacion'),
+    path('api/reportes/estado-resultados/', EstadoResultadosAPIView.as_view(), name='api_estado_resultados'),
+    path('api/reportes/balance-general/', BalanceGeneralAPIView.as_view(), name='api_balance_general'),
+    path('api/reportes/flujo-efectivo/', EstadoFlujoEfectivoAPIView.as_view(), name='api_flujo_efectivo'),
+    path('api/reportes/cambios-patrimonio/', EstadoCambiosPatrimonioAPIView.as_view(), name='api_cambios_patrimonio'),
+    path('api/reportes/saldos-cuentas/', SaldosCuentasAPIView.as_view(), name='api_saldos_cuentas'),
+    
+    # Comprobantes
+    path('api/comprobantes/bulk/', ComprobantesBulkView.as_view(), name='api_comprobantes_bulk'),
+    path('api/comprobantes/buscar/', BusquedaComprobantesView.as_view(), name='api_buscar_comprobantes'),
+    path('api/detalles/exportar/', ExportarDetallesView.as_view(), name='api_exportar_detalles'),
+    path('api/changes/', CambiosView.as_view(), name='api_cambios'),
+    
+    # Inventario
+    path('api/inventario/alertas-stock/', AlertasStockView.as_view(), name='api_alertas_stock'),
+    path('api/inventario/codigos/', ProductoPorCodigoView.as_view(), name='api_productos_codigos'),
+    path('api/inventario/codigos/<str:codigo>/', ProductoPorCodigoView.as_view(), name='api_producto_codigo'),
 ]
 
 # Servir archivos media en desarrollo
@@ -21,6 +21,73 @@ def obtener_empresa_activa():
         return None
 
 
+def empresa_id_solicitada(request):
+    """
+    Id de empresa indicado con ?empresa=<id>, o None si no se indicó o no es
+    un número (un valor inválido se ignora en lugar de llegar al ORM).
+    """
+    empresa_id = request.GET.get('empresa', '').strip()
+    return int(empresa_id) if empresa_id.isdigit() else None
+
+
+def obtener_empresa_request(request):
+    """
+    Obtiene la empresa con la que trabaja el usuario del request.
+    Los superusuarios pueden consultar otra empresa con ?empresa=<id>.
+    El resultado se guarda en el request para no repetir consultas.
+    
+    Args:
+        request: HttpRequest object
+    
+    Returns:
+        Empresa o None si el usuario no tiene empresa asignada
+    """
+    if not hasattr(request, '_empresa_actual'):
+        from login.utils import obtener_empresa_usuario
+        
+        empresa = None
+        empresa_id = empresa_id_solicitada(request)
+        if empresa_id and request.user.is_superuser:
+            empresa = Empresa.objects.filter(id=empresa_id).first()
+        else:
+            empresa = obtener_empresa_usuario(request.user)
+        request._empresa_actual = empresa
+    return request._empresa_actual
+
+
+def aplicar_filtro_empresa(queryset, request, campo='empresa'):
+    """
+    Limita un queryset a los datos que el usuario puede ver.
+    Los superusuarios ven todas las empresas (o la indicada con ?empresa=<id>);
+    los demás usuarios solo ven los datos de su empresa.
+    
+    Args:
+        queryset: QuerySet a filtrar
+        request: HttpRequest object
+        campo: Ruta del campo empresa en el modelo (ej: 'comprobante__empresa')
+    
+    Returns:
+        QuerySet filtrado
+    """
+    if request.user.is_superuser:
+        empresa_id = empresa_id_solicitada(request)
+        return queryset.filter(**{f'{campo}_id': empresa_id}) if empresa_id else queryset
+    
+    empresa = obtener_empresa_request(request)
+    if empresa is None:
+        return queryset.none()
+    return queryset.filter(**{campo: empresa})
+
+
+def empresas_visibles(request):
+    """Empresas que el usuario puede elegir en los filtros de los listados"""
+    empresas = Empresa.objects.filter(activo=True)
+    if request.user.is_superuser:
+        return empresas
+    empresa = obtener_empresa_request(request)
+    return empresas.filter(pk=empresa.pk) if empresa else empresas.none()
+
+
 def aplicar_filtros_fecha(queryset, fecha_desde, fecha_hasta, campo_fecha='fecha'):
     """
     Aplica filtros de fecha a un queryset.
@@ -0,0 +1,223 @@
+"""
+API REST de reportes financieros.
+Expone los reportes de cuentas/reportes.py como JSON para herramientas externas (BI).
+
+Cada respuesta lleva un ETag derivado de la versión del libro contable de la
+empresa; si el cliente envía If-None-Match y nada cambió se responde 304 sin
+recalcular el reporte. Los reportes que terminan en un período bloqueado usan
+el bloqueo en lugar de la versión, porque sus datos ya no cambian.
+"""
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Model, Sum
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from empresa.models import Empresa
+from S_CONTABLE.utils import obtener_empresa_request, obtener_fechas_desde_request
+from transacciones.models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante
+from .models import Cuenta, TipoCuenta
+from .reportes import (
+    BalanceComprobacion, EstadoResultados, BalanceGeneral, EstadoFlujoEfectivo, EstadoCambiosPatrimonio,
+)
+
+ERROR_SIN_EMPRESA = "No tienes una empresa asignada"
+
+
+# ============================================
+# FUNCIONES HELPER
+# ============================================
+
+def obtener_empresa_api(request):
+    """
+    Obtiene la empresa del usuario autenticado.
+    Los superusuarios pueden consultar otra empresa con ?empresa=<id>.
+    """
+    return obtener_empresa_request(request)
+
+
+def serializar_reporte(valor):
+    """
+    Convierte recursivamente el diccionario de un reporte a tipos JSON.
+    Los Decimal se envían como texto para no perder precisión.
+    """
+    if isinstance(valor, dict):
+        return {clave: serializar_reporte(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [serializar_reporte(v) for v in valor]
+    if isinstance(valor, Decimal):
+        return str(valor.quantize(Decimal('0.01')))
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Empresa):
+        return {'id': valor.id, 'nombre': valor.nombre, 'nit': valor.nit}
+    if isinstance(valor, Model):
+        return valor.pk
+    return valor
+
+
+def calcular_etag_reporte(request, *args, con_inventario=False, **kwargs):
+    """
+    Calcula el ETag de un reporte a partir de la versión contable de la empresa
+    (o del bloqueo, si el reporte termina en un período bloqueado) y de los
+    parámetros de la consulta. Con con_inventario (reportes que leen el
+    inventario vigente) la versión contable se incluye aun en períodos bloqueados.
+    """
+    empresa = obtener_empresa_api(request)
+    if not empresa:
+        return None
+    _, fecha_fin = obtener_fechas_desde_request(request)
+    bloqueo = BloqueoPeriodo.vigente(empresa.pk) if fecha_fin else None
+    if bloqueo and fecha_fin <= bloqueo.fecha_hasta:
+        version = f'b{bloqueo.pk}'
+        if con_inventario:
+            version += f'v{Empresa.version_contable_actual(empresa.pk)}'
+    else:
+        version = Empresa.version_contable_actual(empresa.pk)
+    parametros = '&'.join(f'{k}={v}' for k, v in sorted(request.GET.items()))
+    huella = hashlib.md5(f'{request.path}?{parametros}'.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f'"{empresa.pk}-{version}-{huella}"'
+
+
+def calcular_etag_reporte_inventario(request, *args, **kwargs):
+    return calcular_etag_reporte(request, *args, con_inventario=True, **kwargs)
+
+
+class ReporteAPIView(APIView):
+    """
+    Vista base para reportes en JSON con GET condicional.
+    Las subclases solo implementan generar_reporte().
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        """Método abstracto que debe ser implementado por las subclases"""
+        raise NotImplementedError("Este método debe ser implementado por las subclases")
+
+    @method_decorator(condition(etag_func=calcular_etag_reporte))
+    def get(self, request):
+        return self.responder(request)
+
+    def responder(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        fecha_inicio, fecha_fin = obtener_fechas_desde_request(request)
+        datos = self.generar_reporte(request, empresa, fecha_inicio, fecha_fin)
+        return Response(serializar_reporte(datos))
+
+
+# ============================================
+# ENDPOINTS DE REPORTES
+# ============================================
+
+class BalanceComprobacionAPIView(ReporteAPIView):
+    """Balance de Comprobación en JSON (?saldos=1 agrega saldo inicial y final)"""
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        tipo_cuenta = request.GET.get('tipo_cuenta') or None
+        con_saldos = request.GET.get('saldos') in ('1', 'true')
+        return BalanceComprobacion(empresa, fecha_inicio, fecha_fin, tipo_cuenta, con_saldos).generar_con_cache()
+
+
+class EstadoResultadosAPIView(ReporteAPIView):
+    """Estado de Resultados en JSON"""
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        return EstadoResultados(empresa, fecha_inicio, fecha_fin).generar_con_cache()
+
+
+class BalanceGeneralAPIView(ReporteAPIView):
+    """Balance General en JSON"""
+
+    @method_decorator(condition(etag_func=calcular_etag_reporte_inventario))
+    def get(self, request):
+        return self.responder(request)
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        return BalanceGeneral(empresa, fecha_inicio, fecha_fin).generar_con_cache()
+
+
+class EstadoFlujoEfectivoAPIView(ReporteAPIView):
+    """Estado de Flujo de Efectivo (método indirecto) en JSON"""
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        try:
+            return EstadoFlujoEfectivo(empresa, fecha_inicio, fecha_fin).generar_con_cache()
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+
+
+class EstadoCambiosPatrimonioAPIView(ReporteAPIView):
+    """Estado de Cambios en el Patrimonio en JSON"""
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        try:
+            return EstadoCambiosPatrimonio(empresa, fecha_inicio, fecha_fin).generar_con_cache()
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+
+
+class SaldosCuentasAPIView(ReporteAPIView):
+    """
+    Saldos de todas las cuentas que aceptan movimiento.
+    Se calculan con una sola consulta agrupada por cuenta.
+    """
+
+    def generar_reporte(self, request, empresa, fecha_inicio, fecha_fin):
+        movimientos = DetalleComprobante.objects.filter(
+            comprobante__empresa=empresa,
+            comprobante__estado='APROBADO'
+        )
+        # Sin fecha de inicio, los saldos se acumulan desde la última apertura
+        fecha_inicio = fecha_inicio or Comprobante.fecha_ultima_apertura(empresa.id, fecha_fin)
+        if fecha_inicio:
+            movimientos = movimientos.filter(comprobante__fecha__gte=fecha_inicio).exclude(
+                comprobante__tipo=TipoComprobante.APERTURA, comprobante__fecha__gt=fecha_inicio
+            )
+        if fecha_fin:
+            movimientos = movimientos.filter(comprobante__fecha__lte=fecha_fin)
+
+        totales = {
+            fila['cuenta_id']: fila
+            for fila in movimientos.values('cuenta_id').annotate(
+                debito=Sum('debito'), credito=Sum('credito')
+            ).order_by()
+        }
+
+        cuentas = Cuenta.objects.filter(empresa=empresa, acepta_movimiento=True).order_by('codigo')
+        tipo_cuenta = request.GET.get('tipo_cuenta')
+        if tipo_cuenta in TipoCuenta.values:
+            cuentas = cuentas.filter(tipo=tipo_cuenta)
+
+        saldos = []
+        for cuenta in cuentas.only('id', 'codigo', 'nombre', 'tipo', 'naturaleza', 'esta_activa'):
+            fila = totales.get(cuenta.id, {})
+            debito = fila.get('debito') or Decimal('0.00')
+            credito = fila.get('credito') or Decimal('0.00')
+            saldo = debito - credito if cuenta.naturaleza == 'DEBITO' else credito - debito
+            saldos.append({
+                'id': cuenta.id,
+                'codigo': cuenta.codigo,
+                'nombre': cuenta.nombre,
+                'tipo': cuenta.tipo,
+                'naturaleza': cuenta.naturaleza,
+                'esta_activa': cuenta.esta_activa,
+                'debito': debito,
+                'credito': credito,
+                'saldo': saldo,
+            })
+
+        return {
+            'empresa': empresa,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'cuentas': saldos,
+        }
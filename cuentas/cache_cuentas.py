@@ -0,0 +1,50 @@
+"""
+Índice en caché de las cuentas que aceptan movimiento, por empresa.
+
+Los formularios de comprobantes y el endpoint de búsqueda de cuentas usan
+este índice de tuplas (id, codigo, nombre) en lugar de consultar el plan de
+cuentas completo en cada fila.
+
+La clave incluye la versión del plan de cuentas guardada en la empresa
+(Empresa.version_cuentas), que se incrementa al guardar o eliminar una cuenta:
+cada consulta la lee con una consulta por clave primaria y, si cambió, la
+clave es otra y el índice se reconstruye en cualquier proceso. Con la caché
+por defecto (LocMemCache, una por proceso) cada proceso construye su propia
+copia; para compartir una sola entre todos los procesos configure en CACHES un
+backend compartido (Redis o Memcached).
+"""
+from django.core.cache import cache
+
+from empresa.models import Empresa
+
+CLAVE_INDICE_CUENTAS = 'cuentas_movimiento:{empresa_id}:{version}'
+DURACION_INDICE_CUENTAS = 60 * 60  # 1 hora; solo libera las versiones que ya no se consultan
+
+
+def obtener_indice_cuentas(empresa_id):
+    """
+    Retorna la lista ordenada por código de (id, codigo, nombre) de las cuentas
+    activas de la empresa que aceptan movimiento.
+    """
+    if not empresa_id:
+        return []
+
+    clave = CLAVE_INDICE_CUENTAS.format(empresa_id=empresa_id, version=Empresa.version_cuentas_actual(empresa_id))
+    indice = cache.get(clave)
+    if indice is None:
+        from .models import Cuenta
+
+        indice = list(
+            Cuenta.objects.filter(
+                empresa_id=empresa_id,
+                acepta_movimiento=True,
+                esta_activa=True
+            ).order_by('codigo').values_list('id', 'codigo', 'nombre')
+        )
+        cache.set(clave, indice, DURACION_INDICE_CUENTAS)
+    return indice
+
+
+def obtener_etiquetas_cuentas(empresa_id):
+    """Diccionario {id: 'codigo - nombre'} construido desde el índice en caché"""
+    return {cuenta_id: f'{codigo} - {nombre}' for cuenta_id, codigo, nombre in obtener_indice_cuentas(empresa_id)}
@@ -362,3 +362,172 @@ class ExportadorBalanceGeneral(ExportadorReportes):
         except ImportError:
             raise ImportError("openpyxl no está instalado. Ejecuta: pip install openpyxl")
 
+
+
+class ExportadorReporteColumnas(ExportadorReportes):
+    """
+    Exportador de los reportes multiperíodo (Estado de Resultados mensual y
+    Balance General comparativo): una columna por período con su análisis
+    vertical y horizontal.
+    """
+    
+    def _periodo_texto(self):
+        fecha_inicio = self.reporte_data.get('fecha_inicio')
+        fecha_fin = self.reporte_data.get('fecha_fin')
+        if fecha_inicio and fecha_fin:
+            return f"Del {fecha_inicio.strftime('%d/%m/%Y')} al {fecha_fin.strftime('%d/%m/%Y')}"
+        return f"Cortes: {', '.join(self.reporte_data['columnas'])}"
+    
+    def _filas(self):
+        """Recorre las filas en orden: ('seccion', nombre), ('cuenta', fila), ('total', fila)"""
+        for seccion in self.reporte_data['secciones']:
+            yield 'seccion', seccion['nombre']
+            for fila in seccion['filas']:
+                yield 'cuenta', fila
+            yield 'total', seccion['total']
+        for fila in self.reporte_data['resumen']:
+            yield 'total', fila
+    
+    @staticmethod
+    def _formatear_porcentaje(valor):
+        return '—' if valor is None else f'{valor}%'
+    
+    def exportar_pdf(self):
+        """
+        Exporta el reporte a PDF (horizontal). Cada celda muestra el monto y
+        debajo el % vertical y la variación % frente al período anterior.
+        """
+        try:
+            from reportlab.lib import colors
+            from reportlab.lib.units import inch
+            from reportlab.platypus import Paragraph, TableStyle
+            from S_CONTABLE.pdf_utils import GeneradorPDF, formatear_moneda
+            
+            columnas = self.reporte_data['columnas']
+            mostrar_total = self.reporte_data.get('mostrar_total')
+            generador = GeneradorPDF(self.reporte_data['titulo'], orientacion='landscape')
+            generador.agregar_encabezado(self.reporte_data['empresa'], self.reporte_data['titulo'], self._periodo_texto())
+            
+            encabezado = [HEADER_CODIGO, 'Cuenta'] + columnas + (['Total'] if mostrar_total else [])
+            datos = [encabezado]
+            estilos = [
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 6),
+                ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ]
+            
+            for clase, contenido in self._filas():
+                fila_pdf = len(datos)
+                if clase == 'seccion':
+                    datos.append([contenido.upper()] + [''] * (len(encabezado) - 1))
+                    estilos += [
+                        ('SPAN', (0, fila_pdf), (-1, fila_pdf)),
+                        ('FONTNAME', (0, fila_pdf), (-1, fila_pdf), 'Helvetica-Bold'),
+                        ('BACKGROUND', (0, fila_pdf), (-1, fila_pdf), colors.HexColor('#e9ecef')),
+                    ]
+                    continue
+                celdas = [
+                    f"{formatear_moneda(valor['monto'])}\n"
+                    f"{self._formatear_porcentaje(valor['vertical'])} | {self._formatear_porcentaje(valor['horizontal'])}"
+                    for valor in contenido['valores']
+                ]
+                total = [formatear_moneda(contenido['total'])] if mostrar_total else []
+                datos.append([contenido['codigo'], contenido['nombre'][:30]] + celdas + total)
+                if clase == 'total':
+                    estilos += [
+                        ('FONTNAME', (0, fila_pdf), (-1, fila_pdf), 'Helvetica-Bold'),
+                        ('BACKGROUND', (0, fila_pdf), (-1, fila_pdf), colors.HexColor('#d9e1f2')),
+                    ]
+            
+            # 10" útiles en horizontal: código y cuenta fijos, el resto se reparte entre los períodos
+            ancho_periodo = (8.2 * inch) / (len(encabezado) - 2)
+            anchos = [0.5 * inch, 1.3 * inch] + [ancho_periodo] * (len(encabezado) - 2)
+            generador.agregar_tabla(datos, anchos, TableStyle(estilos))
+            generador.agregar_espaciador(0.2)
+            generador.elements.append(Paragraph(
+                'Cada celda: monto; % vertical | variación % frente al período anterior', generador.styles['Normal']
+            ))
+            return generador.construir()
+        
+        except ImportError:
+            raise ImportError("ReportLab no está instalado. Ejecuta: pip install reportlab")
+    
+    def exportar_excel(self):
+        """
+        Exporta el reporte a Excel: por cada período las columnas Monto, % Vertical
+        y % Horizontal (variación frente al período anterior).
+        """
+        try:
+            from openpyxl import Workbook
+            from openpyxl.styles import Font, PatternFill
+            from openpyxl.utils import get_column_letter
+            from io import BytesIO
+            
+            wb = Workbook()
+            ws = wb.active
+            ws.title = self.reporte_data['titulo'][:31]
+            
+            header_font = Font(name='Arial', size=11, bold=True, color='FFFFFF')
+            header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+            seccion_fill = PatternFill(start_color='E9ECEF', end_color='E9ECEF', fill_type='solid')
+            total_fill = PatternFill(start_color='D9E1F2', end_color='D9E1F2', fill_type='solid')
+            mostrar_total = self.reporte_data.get('mostrar_total')
+            
+            ws['A1'] = self.reporte_data['empresa'].nombre
+            ws['A1'].font = Font(name='Arial', size=16, bold=True)
+            ws['A2'] = self.reporte_data['titulo']
+            ws['A2'].font = Font(name='Arial', size=14, bold=True)
+            ws['A3'] = self._periodo_texto()
+            
+            encabezado = [HEADER_CODIGO, 'Cuenta']
+            for columna in self.reporte_data['columnas']:
+                encabezado += [columna, f'{columna} % V', f'{columna} % H']
+            if mostrar_total:
+                encabezado.append('Total')
+            ws.append([])
+            ws.append(encabezado)
+            for celda in ws[ws.max_row]:
+                celda.font = header_font
+                celda.fill = header_fill
+            
+            for clase, contenido in self._filas():
+                if clase == 'seccion':
+                    ws.append([contenido.upper()])
+                    ws.cell(row=ws.max_row, column=1).font = Font(bold=True)
+                    ws.cell(row=ws.max_row, column=1).fill = seccion_fill
+                    continue
+                fila = [contenido['codigo'], contenido['nombre']]
+                for valor in contenido['valores']:
+                    fila += [
+                        float(valor['monto']),
+                        None if valor['vertical'] is None else float(valor['vertical']) / 100,
+                        None if valor['horizontal'] is None else float(valor['horizontal']) / 100,
+                    ]
+                if mostrar_total:
+                    fila.append(float(contenido['total']))
+                ws.append(fila)
+                for indice, celda in enumerate(ws[ws.max_row][2:]):
+                    es_porcentaje = indice % 3 != 0 and not (mostrar_total and celda.column == len(encabezado))
+                    celda.number_format = '0.00%' if es_porcentaje else CURRENCY_FORMAT
+                    if clase == 'total':
+                        celda.font = Font(bold=True)
+                        celda.fill = total_fill
+                if clase == 'total':
+                    ws.cell(row=ws.max_row, column=2).font = Font(bold=True)
+            
+            ws.column_dimensions['A'].width = 12
+            ws.column_dimensions['B'].width = 40
+            for columna in range(3, len(encabezado) + 1):
+                ws.column_dimensions[get_column_letter(columna)].width = 14
+            
+            buffer = BytesIO()
+            wb.save(buffer)
+            buffer.seek(0)
+            return buffer
+        
+        except ImportError:
+            raise ImportError("openpyxl no está instalado. Ejecuta: pip install openpyxl")
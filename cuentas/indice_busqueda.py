@@ -0,0 +1,210 @@
+"""
+Índice de búsqueda de cuentas en memoria, por empresa.
+
+Permite autocompletar cuentas en milisegundos sin recorrer la tabla con
+icontains:
+- Código: lista ordenada de códigos, el prefijo se ubica con bisect.
+- Nombre: índice de palabras (prefijo con bisect) y de trigramas
+  (fragmentos de 3 o más letras en cualquier parte del nombre).
+
+El índice se actualiza de forma incremental cuando se guarda o elimina una
+cuenta. La generación de cada índice es la versión del plan de cuentas
+guardada en la empresa (Empresa.version_cuentas): cada búsqueda la lee con una
+consulta por clave primaria, y los demás procesos, que tienen una generación
+anterior, reconstruyen su copia en la siguiente búsqueda.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from empresa.models import Empresa
+
+LONGITUD_TRIGRAMA = 3
+
+_indices = {}
+_bloqueo = threading.Lock()
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes, para comparar sin importar acentos"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _trigramas(texto):
+    return {texto[i:i + LONGITUD_TRIGRAMA] for i in range(len(texto) - LONGITUD_TRIGRAMA + 1)}
+
+
+def _prefijo_en(lista_ordenada, prefijo):
+    """Genera los elementos de una lista ordenada que comienzan por el prefijo"""
+    for posicion in range(bisect_left(lista_ordenada, (prefijo,)), len(lista_ordenada)):
+        elemento = lista_ordenada[posicion]
+        if not elemento[0].startswith(prefijo):
+            break
+        yield elemento
+
+
+class IndiceCuentas:
+    """
+    Índice de las cuentas de una empresa.
+    Cada cuenta se guarda como {id: (codigo, nombre_normalizado, acepta_movimiento, esta_activa)}.
+    """
+
+    def __init__(self, filas=(), generacion=0):
+        self.generacion = generacion
+        self.cuentas = {}
+        self.codigos = []       # [(codigo, id)] ordenada
+        self.palabras = []      # [(palabra, id)] ordenada
+        self.trigramas = {}     # {trigrama: {ids}}
+        for cuenta_id, codigo, nombre, acepta_movimiento, esta_activa in filas:
+            nombre = self._registrar(cuenta_id, codigo, nombre, acepta_movimiento, esta_activa)
+            self.codigos.append((codigo, cuenta_id))
+            self.palabras.extend((palabra, cuenta_id) for palabra in set(nombre.split()))
+        # En la carga inicial se ordena una sola vez
+        self.codigos.sort()
+        self.palabras.sort()
+
+    def _registrar(self, cuenta_id, codigo, nombre, acepta_movimiento, esta_activa):
+        nombre = normalizar_texto(nombre)
+        self.cuentas[cuenta_id] = (codigo, nombre, acepta_movimiento, esta_activa)
+        for trigrama in _trigramas(nombre):
+            self.trigramas.setdefault(trigrama, set()).add(cuenta_id)
+        return nombre
+
+    def agregar(self, cuenta_id, codigo, nombre, acepta_movimiento=True, esta_activa=True):
+        """Agrega o reemplaza una cuenta en el índice"""
+        self.quitar(cuenta_id)
+        nombre = self._registrar(cuenta_id, codigo, nombre, acepta_movimiento, esta_activa)
+        insort(self.codigos, (codigo, cuenta_id))
+        for palabra in set(nombre.split()):
+            insort(self.palabras, (palabra, cuenta_id))
+
+    def quitar(self, cuenta_id):
+        """Elimina una cuenta del índice (si existe)"""
+        datos = self.cuentas.pop(cuenta_id, None)
+        if datos is None:
+            return
+        codigo, nombre = datos[0], datos[1]
+        del self.codigos[bisect_left(self.codigos, (codigo, cuenta_id))]
+        for palabra in set(nombre.split()):
+            del self.palabras[bisect_left(self.palabras, (palabra, cuenta_id))]
+        for trigrama in _trigramas(nombre):
+            ids = self.trigramas.get(trigrama)
+            if ids:
+                ids.discard(cuenta_id)
+                if not ids:
+                    del self.trigramas[trigrama]
+
+    def _coincide(self, cuenta_id, termino):
+        codigo, nombre = self.cuentas[cuenta_id][:2]
+        return codigo.startswith(termino) or termino in nombre
+
+    def _trigramas_termino(self, termino):
+        """Conjuntos de ids de los trigramas del término, del más pequeño al más grande"""
+        return sorted((self.trigramas.get(t, set()) for t in _trigramas(termino)), key=len)
+
+    def _ids_por_termino(self, termino, trigramas):
+        """Cuentas cuyo código comienza por el término o cuyo nombre lo contiene"""
+        ids = {cuenta_id for _, cuenta_id in _prefijo_en(self.codigos, termino)}
+
+        if not trigramas:
+            ids.update(cuenta_id for _, cuenta_id in _prefijo_en(self.palabras, termino))
+            return ids
+
+        candidatos = trigramas[0]
+        for encontrados in trigramas[1:]:
+            if not candidatos:
+                break
+            candidatos = candidatos & encontrados
+        # Los trigramas pueden coincidir en desorden: se confirma el fragmento completo
+        ids.update(cuenta_id for cuenta_id in candidatos if termino in self.cuentas[cuenta_id][1])
+        return ids
+
+    def buscar(self, texto, limite=None, solo_movimiento=False):
+        """
+        Retorna los ids de las cuentas que coinciden con todos los términos del
+        texto, ordenados por código.
+        """
+        terminos = normalizar_texto(texto).split()
+        if not terminos:
+            return []
+
+        # Se resuelve con el índice solo el término más selectivo; los demás se
+        # verifican directamente sobre ese conjunto reducido
+        trigramas = {t: self._trigramas_termino(t) if len(t) >= LONGITUD_TRIGRAMA else [] for t in terminos}
+        terminos.sort(key=lambda t: len(trigramas[t][0]) if trigramas[t] else len(self.cuentas))
+        ids = self._ids_por_termino(terminos[0], trigramas[terminos[0]])
+        for termino in terminos[1:]:
+            ids = {cuenta_id for cuenta_id in ids if self._coincide(cuenta_id, termino)}
+            if not ids:
+                return []
+
+        if solo_movimiento:
+            ids = {i for i in ids if self.cuentas[i][2] and self.cuentas[i][3]}
+
+        resultado = sorted(ids, key=lambda i: self.cuentas[i][0])
+        return resultado[:limite] if limite else resultado
+
+
+# ============================================
+# REGISTRO DE ÍNDICES POR EMPRESA
+# ============================================
+
+def _generacion_actual(empresa_id):
+    return Empresa.version_cuentas_actual(empresa_id)
+
+
+def _construir_indice(empresa_id, generacion):
+    from .models import Cuenta
+
+    filas = Cuenta.objects.filter(empresa_id=empresa_id).values_list(
+        'id', 'codigo', 'nombre', 'acepta_movimiento', 'esta_activa'
+    )
+    return IndiceCuentas(filas, generacion)
+
+
+def obtener_indice_busqueda(empresa_id):
+    """
+    Retorna el índice de la empresa, construyéndolo si no existe o si otro
+    proceso modificó el plan de cuentas.
+    """
+    generacion = _generacion_actual(empresa_id)
+    indice = _indices.get(empresa_id)
+    if indice is None or indice.generacion != generacion:
+        with _bloqueo:
+            indice = _indices.get(empresa_id)
+            if indice is None or indice.generacion != generacion:
+                indice = _construir_indice(empresa_id, generacion)
+                _indices[empresa_id] = indice
+    return indice
+
+
+def actualizar_cuenta_en_indice(cuenta, eliminada=False):
+    """Aplica el cambio de una cuenta al índice en memoria de su empresa"""
+    generacion = Empresa.incrementar_version_cuentas(cuenta.empresa_id)
+    with _bloqueo:
+        indice = _indices.get(cuenta.empresa_id)
+        if indice is None:
+            return  # Se construirá completo en la primera búsqueda
+        if indice.generacion != generacion - 1:
+            # Este proceso no tenía la versión anterior: se descarta y se reconstruye al buscar
+            del _indices[cuenta.empresa_id]
+            return
+        if eliminada:
+            indice.quitar(cuenta.pk)
+        else:
+            indice.agregar(cuenta.pk, cuenta.codigo, cuenta.nombre, cuenta.acepta_movimiento, cuenta.esta_activa)
+        indice.generacion = generacion
+
+
+def buscar_cuentas_queryset(queryset, texto, empresa_id=None):
+    """
+    Reemplazo de aplicar_busqueda_texto para cuentas: si se conoce la empresa
+    usa el índice en memoria; si no, recurre a la búsqueda con icontains.
+    """
+    if not texto:
+        return queryset
+    if not empresa_id:
+        from S_CONTABLE.utils import aplicar_busqueda_texto
+        return aplicar_busqueda_texto(queryset, texto, ['codigo', 'nombre'])
+    return queryset.filter(id__in=obtener_indice_busqueda(empresa_id).buscar(texto))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0002_activo_costo_gasto_ingreso_pasivo_patrimonio_and_more'),
+        ('empresa', '0003_empresa_version_contable'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cuenta',
+            index=models.Index(fields=['empresa', 'tipo', 'codigo'], name='cuenta_empresa_tipo_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.db.models import Sum, Q
+from django.db.models.signals import post_save, post_delete
 from empresa.models import Empresa
+from empresa.managers import EmpresaManager
+from .indice_busqueda import actualizar_cuenta_en_indice
 from abc import ABC, abstractmethod
 from decimal import Decimal
 
@@ -28,11 +31,14 @@ class Cuenta(models.Model):
     esta_activa = models.BooleanField(default=True, verbose_name="Activa")
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     
+    objects = EmpresaManager()
+    
     class Meta:
         verbose_name = "Cuenta"
         verbose_name_plural = "Cuentas"
         ordering = ['codigo']
         unique_together = ['empresa', 'codigo']
+        indexes = [models.Index(fields=['empresa', 'tipo', 'codigo'], name='cuenta_empresa_tipo_idx')]
     
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
@@ -51,12 +57,17 @@ class Cuenta(models.Model):
         Calcula el saldo actual de la cuenta.
         Implementa POLIMORFISMO según el tipo de cuenta.
         """
-        from transacciones.models import DetalleComprobante
+        from transacciones.models import Comprobante, DetalleComprobante
         
         movimientos = DetalleComprobante.objects.filter(
             cuenta=self,
             comprobante__estado='APROBADO'
-        ).aggregate(
+        )
+        # El saldo se acumula desde la última apertura, que ya trae los saldos anteriores
+        fecha_apertura = Comprobante.fecha_ultima_apertura(self.empresa_id)
+        if fecha_apertura:
+            movimientos = movimientos.filter(comprobante__fecha__gte=fecha_apertura)
+        movimientos = movimientos.aggregate(
             total_debito=Sum('debito'),
             total_credito=Sum('credito')
         )
@@ -244,3 +255,29 @@ class Costo(Cuenta):
             return monto  # Aumenta el costo
         else:
             return -monto  # Disminuye el costo
+
+
+def cuenta_modificada(sender, instance, **kwargs):
+    """Marca el libro de la empresa como modificado al cambiar el plan de cuentas"""
+    Empresa.incrementar_version_contable(instance.empresa_id)
+
+
+def cuenta_guardada_indice(sender, instance, **kwargs):
+    """
+    Actualiza el índice de búsqueda en memoria con la cuenta guardada. Incrementa
+    la versión del plan de cuentas, que también invalida el índice en caché.
+    """
+    actualizar_cuenta_en_indice(instance)
+
+
+def cuenta_eliminada_indice(sender, instance, **kwargs):
+    """Quita la cuenta eliminada del índice de búsqueda en memoria"""
+    actualizar_cuenta_en_indice(instance, eliminada=True)
+
+
+# Las subclases (herencia multi-tabla) emiten señales con su propio sender
+for _modelo_cuenta in (Cuenta, Activo, Pasivo, Patrimonio, Ingreso, Gasto, Costo):
+    post_save.connect(cuenta_modificada, sender=_modelo_cuenta)
+    post_delete.connect(cuenta_modificada, sender=_modelo_cuenta)
+    post_save.connect(cuenta_guardada_indice, sender=_modelo_cuenta)
+    post_delete.connect(cuenta_eliminada_indice, sender=_modelo_cuenta)
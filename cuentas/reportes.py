@@ -4,13 +4,21 @@ Implementa los reportes contables principales:
 - Balance de Comprobación
 - Estado de Resultados
 - Balance General
+- Estado de Resultados mensual y Balance General comparativo (varios períodos en columnas)
+- Estado de Flujo de Efectivo (método indirecto)
+- Estado de Cambios en el Patrimonio
 """
 
-from django.db.models import Sum, Q
+import calendar
+
+from django.core.cache import cache
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
 from decimal import Decimal
 from .models import Cuenta, TipoCuenta
-from transacciones.models import DetalleComprobante
-from datetime import datetime
+from empresa.models import Empresa
+from transacciones.models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante
+from datetime import date, datetime, timedelta
 
 
 # ============================================
@@ -78,6 +86,30 @@ def _generar_lista_cuentas_tipo(movimientos, cuentas_queryset, naturaleza):
     return lista, total
 
 
+TIPOS_CUENTA_RESULTADO = (TipoCuenta.INGRESO, TipoCuenta.COSTO, TipoCuenta.GASTO)
+
+
+def _utilidad_neta(movimientos):
+    """
+    Utilidad neta (ingresos - costos - gastos) de un QuerySet de movimientos con
+    un solo agregado: para las cuentas de resultados equivale a créditos - débitos.
+    """
+    totales = movimientos.filter(
+        cuenta__tipo__in=TIPOS_CUENTA_RESULTADO, cuenta__esta_activa=True
+    ).aggregate(debito=Sum('debito'), credito=Sum('credito'))
+    return (totales['credito'] or Decimal('0.00')) - (totales['debito'] or Decimal('0.00'))
+
+
+def _fecha_primer_cierre(empresa):
+    """
+    Fecha del primer comprobante de cierre aprobado. Las aperturas posteriores
+    repiten saldos ya acumulados y se omiten al acumular desde el inicio del historial.
+    """
+    return Comprobante.objects.filter(
+        empresa=empresa, estado='APROBADO', tipo=TipoComprobante.CIERRE
+    ).order_by('fecha').values_list('fecha', flat=True).first()
+
+
 def _determinar_resultado(monto):
     """Helper: Determina si el resultado es UTILIDAD, PÉRDIDA o EQUILIBRIO"""
     if monto > 0:
@@ -108,20 +140,44 @@ class ReporteFinanciero:
     Implementa ABSTRACCIÓN y proporciona métodos comunes.
     """
     
+    # Los reportes acumulados sin fecha de inicio parten de la última apertura
+    desde_apertura = False
+    # Los reportes que leen el inventario vigente no se fijan al cerrar el período
+    lee_inventario = False
+    
     def __init__(self, empresa, fecha_inicio=None, fecha_fin=None):
         self.empresa = empresa
         self.fecha_inicio = fecha_inicio
         self.fecha_fin = fecha_fin
     
+    def obtener_fecha_inicio(self):
+        """
+        Fecha desde la que se leen los movimientos: la indicada o, en los reportes
+        acumulados, la del último comprobante de apertura (None = todo el historial).
+        """
+        if self.fecha_inicio or not self.desde_apertura:
+            return self.fecha_inicio
+        if not hasattr(self, '_fecha_apertura'):
+            self._fecha_apertura = Comprobante.fecha_ultima_apertura(self.empresa.id, self.fecha_fin)
+        return self._fecha_apertura
+    
     def obtener_movimientos(self):
-        """Obtiene los movimientos filtrados por fecha y empresa"""
+        """
+        Obtiene los movimientos filtrados por fecha y empresa.
+        Los comprobantes de cierre no se incluyen (solo trasladan los resultados al
+        patrimonio) ni las aperturas posteriores al inicio, que repetirían saldos
+        ya acumulados en el período.
+        """
+        fecha_inicio = self.obtener_fecha_inicio()
         movimientos = DetalleComprobante.objects.filter(
             comprobante__empresa=self.empresa,
             comprobante__estado='APROBADO'
-        )
+        ).exclude(comprobante__tipo=TipoComprobante.CIERRE)
         
-        if self.fecha_inicio:
-            movimientos = movimientos.filter(comprobante__fecha__gte=self.fecha_inicio)
+        if fecha_inicio:
+            movimientos = movimientos.filter(comprobante__fecha__gte=fecha_inicio).exclude(
+                comprobante__tipo=TipoComprobante.APERTURA, comprobante__fecha__gt=fecha_inicio
+            )
         
         if self.fecha_fin:
             movimientos = movimientos.filter(comprobante__fecha__lte=self.fecha_fin)
@@ -131,6 +187,43 @@ class ReporteFinanciero:
     def generar(self):
         """Método abstracto que debe ser implementado por las subclases"""
         raise NotImplementedError("Este método debe ser implementado por las subclases")
+    
+    def clave_cache(self):
+        """
+        Clave de caché del reporte si termina dentro de un período bloqueado
+        (sus comprobantes ya no pueden cambiar); None si debe recalcularse.
+        El id del bloqueo forma parte de la clave: si el período se desbloquea y
+        se vuelve a bloquear, los resultados anteriores dejan de usarse. Los
+        reportes que leen el inventario vigente (lee_inventario) agregan la
+        versión contable, que cambia con el valor del inventario.
+        """
+        if not self.fecha_fin:
+            return None
+        bloqueo = BloqueoPeriodo.vigente(self.empresa.id)
+        if not bloqueo or self.fecha_fin > bloqueo.fecha_hasta:
+            return None
+        parametros = ':'.join(
+            f'{clave}={valor}' for clave, valor in sorted(vars(self).items())
+            if clave != 'empresa' and not clave.startswith('_')
+        )
+        version = f'b{bloqueo.pk}'
+        if self.lee_inventario:
+            version += f'v{Empresa.version_contable_actual(self.empresa.id)}'
+        return f'reporte:{self.__class__.__name__}:{self.empresa.id}:{version}:{parametros}'
+    
+    def generar_con_cache(self):
+        """
+        Genera el reporte; los de períodos bloqueados se guardan en caché sin
+        expiración y solo los que incluyen períodos abiertos se recalculan.
+        """
+        clave = self.clave_cache()
+        if clave is None:
+            return self.generar()
+        datos = cache.get(clave)
+        if datos is None:
+            datos = self.generar()
+            cache.set(clave, datos, timeout=None)
+        return datos
 
 
 class BalanceComprobacion(ReporteFinanciero):
@@ -139,15 +232,22 @@ class BalanceComprobacion(ReporteFinanciero):
     Muestra todas las cuentas con sus débitos, créditos y saldos.
     """
     
-    def __init__(self, empresa, fecha_inicio=None, fecha_fin=None, tipo_cuenta=None):
+    desde_apertura = True
+    
+    def __init__(self, empresa, fecha_inicio=None, fecha_fin=None, tipo_cuenta=None, con_saldos=False):
         super().__init__(empresa, fecha_inicio, fecha_fin)
         self.tipo_cuenta = tipo_cuenta
+        # Balance de comprobación de saldos: agrega saldo inicial y saldo final por cuenta
+        self.con_saldos = con_saldos
     
     def generar(self):
         """
         Genera el Balance de Comprobación.
         Retorna un diccionario con las cuentas y sus totales.
         """
+        if self.con_saldos:
+            return self._generar_con_saldos()
+        
         movimientos = self.obtener_movimientos()
         
         # Obtener todas las cuentas activas de la empresa
@@ -216,6 +316,97 @@ class BalanceComprobacion(ReporteFinanciero):
         }
 
 
+    def _movimientos_saldos(self):
+        """
+        Movimientos para el balance de saldos: desde la última apertura anterior a
+        fecha_inicio (su saldo ya incluye el historial previo) hasta fecha_fin, sin
+        cierres ni aperturas posteriores, que repetirían saldos ya acumulados.
+        """
+        desde = Comprobante.fecha_ultima_apertura(self.empresa.id, self.fecha_inicio) if self.fecha_inicio else None
+        movimientos = DetalleComprobante.objects.filter(
+            comprobante__empresa=self.empresa,
+            comprobante__estado='APROBADO',
+            cuenta__esta_activa=True,
+            cuenta__acepta_movimiento=True,
+        ).exclude(comprobante__tipo=TipoComprobante.CIERRE)
+        if desde:
+            movimientos = movimientos.filter(comprobante__fecha__gte=desde)
+        if desde or self.fecha_inicio:
+            movimientos = movimientos.exclude(
+                comprobante__tipo=TipoComprobante.APERTURA, comprobante__fecha__gt=desde or self.fecha_inicio
+            )
+        if self.fecha_fin:
+            movimientos = movimientos.filter(comprobante__fecha__lte=self.fecha_fin)
+        if self.tipo_cuenta:
+            movimientos = movimientos.filter(cuenta__tipo=self.tipo_cuenta)
+        return movimientos
+    
+    def _generar_con_saldos(self):
+        """
+        Balance de comprobación de saldos: saldo inicial, débitos, créditos y
+        saldo final por cuenta en una sola consulta agrupada, separando con
+        agregación condicional lo anterior a fecha_inicio de lo del período.
+        """
+        if self.fecha_inicio:
+            anterior = Q(comprobante__fecha__lt=self.fecha_inicio)
+        else:
+            anterior = Q(pk__in=[])  # Sin fecha de inicio no hay saldo inicial
+        cero = Value(Decimal('0.00'))
+        filas = self._movimientos_saldos().values(
+            'cuenta_id', 'cuenta__codigo', 'cuenta__nombre', 'cuenta__naturaleza'
+        ).annotate(
+            debito_anterior=Coalesce(Sum('debito', filter=anterior), cero),
+            credito_anterior=Coalesce(Sum('credito', filter=anterior), cero),
+            debito=Coalesce(Sum('debito', filter=~anterior), cero),
+            credito=Coalesce(Sum('credito', filter=~anterior), cero),
+        ).order_by('cuenta__codigo')
+        
+        claves_totales = (
+            'saldo_inicial_deudor', 'saldo_inicial_acreedor', 'debitos', 'creditos', 'saldo_deudor', 'saldo_acreedor',
+        )
+        totales = dict.fromkeys(claves_totales, Decimal('0.00'))
+        datos = []
+        for fila in filas:
+            naturaleza = fila['cuenta__naturaleza']
+            inicial_deudor, inicial_acreedor = _calcular_saldos_por_naturaleza(
+                fila['debito_anterior'], fila['credito_anterior'], naturaleza
+            )
+            saldo_deudor, saldo_acreedor = _calcular_saldos_por_naturaleza(
+                fila['debito_anterior'] + fila['debito'], fila['credito_anterior'] + fila['credito'], naturaleza
+            )
+            if not (inicial_deudor or inicial_acreedor or fila['debito'] or fila['credito']):
+                continue
+            datos.append({
+                'cuenta_id': fila['cuenta_id'],
+                'codigo': fila['cuenta__codigo'],
+                'nombre': fila['cuenta__nombre'],
+                'saldo_inicial_deudor': inicial_deudor,
+                'saldo_inicial_acreedor': inicial_acreedor,
+                'debito': fila['debito'],
+                'credito': fila['credito'],
+                'saldo_deudor': saldo_deudor,
+                'saldo_acreedor': saldo_acreedor,
+            })
+            for clave, valor in zip(claves_totales, (
+                inicial_deudor, inicial_acreedor, fila['debito'], fila['credito'], saldo_deudor, saldo_acreedor,
+            )):
+                totales[clave] += valor
+        
+        return {
+            'empresa': self.empresa,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'con_saldos': True,
+            'cuentas': datos,
+            'totales': totales,
+            'esta_balanceado': (
+                totales['saldo_inicial_deudor'] == totales['saldo_inicial_acreedor']
+                and totales['debitos'] == totales['creditos']
+                and totales['saldo_deudor'] == totales['saldo_acreedor']
+            ),
+        }
+
+
 class EstadoResultados(ReporteFinanciero):
     """
     Estado de Resultados (Estado de Pérdidas y Ganancias)
@@ -282,6 +473,10 @@ class BalanceGeneral(ReporteFinanciero):
     Muestra: Activos = Pasivos + Patrimonio
     """
     
+    desde_apertura = True
+    # Sin cuenta de inventario contable integra el valor físico vigente
+    lee_inventario = True
+    
     def generar(self):
         """
         Genera el Balance General.
@@ -304,7 +499,7 @@ class BalanceGeneral(ReporteFinanciero):
         pasivos, total_pasivos = self._agrupar_por_tipo(movimientos, cuentas_pasivo, 'CREDITO')
         patrimonios, total_patrimonio = self._agrupar_por_tipo(movimientos, cuentas_patrimonio, 'CREDITO')
 
-        utilidad_periodo = self._obtener_utilidad_periodo()
+        utilidad_periodo = self._obtener_utilidad_periodo(movimientos)
         total_patrimonio_con_utilidad = total_patrimonio + utilidad_periodo
 
         total_pasivo_patrimonio = total_pasivos + total_patrimonio_con_utilidad
@@ -367,11 +562,10 @@ class BalanceGeneral(ReporteFinanciero):
     def _integrar_inventario(self, activos, total_activos):
         """Integra inventario físico si no hay registro contable en activos."""
         try:
-            from inventario.models import Producto
+            from inventario.models import TotalInventario
             cuenta_inventario_existe = any(a['codigo'] == '1105' for a in activos)
             if not cuenta_inventario_existe:
-                productos_activos = Producto.objects.filter(estado='activo')
-                valor_inventario = sum([p.cantidad * p.precio_unitario for p in productos_activos])
+                valor_inventario = TotalInventario.de_la_empresa(self.empresa)['valor']
                 if valor_inventario > 0:
                     cuenta_inventario, _ = Cuenta.objects.get_or_create(
                         empresa=self.empresa,
@@ -401,11 +595,12 @@ class BalanceGeneral(ReporteFinanciero):
             )
         return activos, total_activos
 
-    def _obtener_utilidad_periodo(self):
-        """Calcula la utilidad neta del período desde el Estado de Resultados."""
-        estado_resultados = EstadoResultados(self.empresa, self.fecha_inicio, self.fecha_fin)
-        resultado = estado_resultados.generar()
-        return resultado['totales']['utilidad_neta']
+    def _obtener_utilidad_periodo(self, movimientos):
+        """
+        Utilidad neta del período con un solo agregado sobre los mismos movimientos
+        del balance (desde la última apertura: los resultados anteriores ya están en ella).
+        """
+        return _utilidad_neta(movimientos)
     
     def _clasificar_activos(self, activos):
         """Clasifica los activos en corrientes y no corrientes"""
@@ -517,3 +712,552 @@ class BalanceGeneral(ReporteFinanciero):
             'comparativo_labels': ['Activos', 'Pasivos', 'Patrimonio'],
             'comparativo_valores': [float(total_activos), float(total_pasivos), float(total_patrimonio)],
         }
+
+
+# ============================================
+# REPORTES MULTIPERÍODO (UNA COLUMNA POR MES O FECHA DE CORTE)
+# ============================================
+
+MAX_PERIODOS_COLUMNAS = 36
+NOMBRES_MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def _fin_de_mes(fecha):
+    """Último día del mes de la fecha"""
+    return date(fecha.year, fecha.month, calendar.monthrange(fecha.year, fecha.month)[1])
+
+
+def _meses_entre(fecha_inicio, fecha_fin):
+    """Primer día de cada mes entre las dos fechas (inclusive)"""
+    meses = []
+    mes = fecha_inicio.replace(day=1)
+    while mes <= fecha_fin:
+        meses.append(mes)
+        mes = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+    return meses
+
+
+def _porcentaje(parte, total):
+    """Porcentaje con 2 decimales; None si el total es cero"""
+    if not total:
+        return None
+    return (parte * 100 / total).quantize(Decimal('0.01'))
+
+
+def _fila_columnas(codigo, nombre, montos, bases, con_total=False):
+    """
+    Fila de un reporte por columnas. Cada columna lleva el monto, el análisis
+    vertical (% sobre la base de la columna) y el horizontal (variación frente
+    a la columna anterior, en valor y en %).
+    """
+    valores = []
+    anterior = None
+    for monto, base in zip(montos, bases):
+        variacion = None if anterior is None else monto - anterior
+        valores.append({
+            'monto': monto,
+            'vertical': _porcentaje(monto, base),
+            'variacion': variacion,
+            'horizontal': None if anterior is None else _porcentaje(variacion, abs(anterior)),
+        })
+        anterior = monto
+    fila = {'codigo': codigo, 'nombre': nombre, 'valores': valores}
+    if con_total:
+        fila['total'] = sum(montos, Decimal('0.00'))
+    return fila
+
+
+def _sumar_columnas(listas, columnas):
+    """Suma elemento a elemento varias listas de montos"""
+    return [sum((lista[i] for lista in listas), Decimal('0.00')) for i in range(columnas)]
+
+
+class EstadoResultadosMultiperiodo(ReporteFinanciero):
+    """
+    Estado de Resultados con una columna por mes entre fecha_inicio y fecha_fin.
+    Los movimientos se agrupan por (cuenta, mes) en una sola consulta y se
+    pivotean en memoria. El análisis vertical usa los ingresos de cada mes como
+    base y el horizontal compara cada mes con el anterior.
+    """
+    
+    SECCIONES = (
+        ('ingresos', 'Ingresos', TipoCuenta.INGRESO),
+        ('costos', 'Costos', TipoCuenta.COSTO),
+        ('gastos', 'Gastos Operacionales', TipoCuenta.GASTO),
+    )
+    
+    def __init__(self, empresa, fecha_inicio=None, fecha_fin=None):
+        fecha_fin = fecha_fin or date.today()
+        fecha_inicio = fecha_inicio or fecha_fin.replace(month=1, day=1)
+        if fecha_inicio > fecha_fin:
+            raise ValueError('La fecha de inicio debe ser anterior a la fecha de fin')
+        if len(_meses_entre(fecha_inicio, fecha_fin)) > MAX_PERIODOS_COLUMNAS:
+            raise ValueError(f'El reporte admite como máximo {MAX_PERIODOS_COLUMNAS} meses')
+        super().__init__(empresa, fecha_inicio, fecha_fin)
+    
+    def _montos_por_cuenta(self, meses):
+        """{cuenta_id: {codigo, nombre, tipo, montos}} con una sola consulta agrupada por mes"""
+        indice_mes = {mes: i for i, mes in enumerate(meses)}
+        filas = self.obtener_movimientos().filter(
+            cuenta__tipo__in=[tipo for _, _, tipo in self.SECCIONES],
+            cuenta__esta_activa=True,
+        ).annotate(
+            mes=TruncMonth('comprobante__fecha')
+        ).values(
+            'cuenta_id', 'cuenta__codigo', 'cuenta__nombre', 'cuenta__tipo', 'mes'
+        ).annotate(
+            debito=Sum('debito'), credito=Sum('credito')
+        ).order_by('cuenta__codigo')
+        
+        cuentas = {}
+        for fila in filas:
+            cuenta = cuentas.setdefault(fila['cuenta_id'], {
+                'codigo': fila['cuenta__codigo'],
+                'nombre': fila['cuenta__nombre'],
+                'tipo': fila['cuenta__tipo'],
+                'montos': [Decimal('0.00')] * len(meses),
+            })
+            # Ingresos de naturaleza crédito; costos y gastos de naturaleza débito
+            if fila['cuenta__tipo'] == TipoCuenta.INGRESO:
+                monto = fila['credito'] - fila['debito']
+            else:
+                monto = fila['debito'] - fila['credito']
+            cuenta['montos'][indice_mes[fila['mes']]] += monto
+        return cuentas
+    
+    def generar(self):
+        """
+        Genera el Estado de Resultados mensual.
+        Retorna columnas, secciones (ingresos, costos, gastos) y el resumen con
+        la utilidad bruta y neta de cada mes.
+        """
+        meses = _meses_entre(self.fecha_inicio, self.fecha_fin)
+        n = len(meses)
+        cuentas = self._montos_por_cuenta(meses)
+        
+        totales = {}
+        for clave, _, tipo in self.SECCIONES:
+            totales[clave] = _sumar_columnas(
+                [c['montos'] for c in cuentas.values() if c['tipo'] == tipo], n
+            )
+        bases = totales['ingresos']
+        
+        secciones = []
+        for clave, nombre, tipo in self.SECCIONES:
+            filas = [
+                _fila_columnas(c['codigo'], c['nombre'], c['montos'], bases, con_total=True)
+                for c in cuentas.values()
+                if c['tipo'] == tipo and any(c['montos'])
+            ]
+            secciones.append({
+                'clave': clave,
+                'nombre': nombre,
+                'filas': filas,
+                'total': _fila_columnas('', f'Total {nombre}', totales[clave], bases, con_total=True),
+            })
+        
+        utilidad_bruta = [i - c for i, c in zip(totales['ingresos'], totales['costos'])]
+        utilidad_neta = [u - g for u, g in zip(utilidad_bruta, totales['gastos'])]
+        
+        return {
+            'empresa': self.empresa,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'titulo': 'Estado de Resultados Mensual',
+            'columnas': [f'{NOMBRES_MESES[mes.month - 1]} {mes.year}' for mes in meses],
+            'mostrar_total': True,
+            'secciones': secciones,
+            'resumen': [
+                _fila_columnas('', 'Utilidad Bruta', utilidad_bruta, bases, con_total=True),
+                _fila_columnas('', 'Utilidad Neta', utilidad_neta, bases, con_total=True),
+            ],
+            'resultado': _determinar_resultado(sum(utilidad_neta, Decimal('0.00'))),
+        }
+
+
+class BalanceGeneralComparativo(ReporteFinanciero):
+    """
+    Balance General a varias fechas de corte (al cierre de cada mes indicado).
+    Una sola consulta agrupa los movimientos hasta el último corte por (cuenta,
+    mes, tipo de comprobante) y los saldos de cada corte se acumulan en memoria.
+    El análisis vertical usa el total de activos de cada corte como base y el
+    horizontal compara cada corte con el anterior.
+    
+    Los saldos se acumulan desde el inicio del historial, por lo que las
+    aperturas posteriores al primer cierre (que repiten esos saldos) no se
+    suman; un cierre solo cuenta en los cortes de meses posteriores, de modo
+    que al corte de su propio mes el resultado aparece como utilidad del
+    ejercicio, igual que en BalanceGeneral.
+    """
+    
+    SECCIONES = (
+        ('activos', 'Activos', TipoCuenta.ACTIVO),
+        ('pasivos', 'Pasivos', TipoCuenta.PASIVO),
+        ('patrimonio', 'Patrimonio', TipoCuenta.PATRIMONIO),
+    )
+    
+    def __init__(self, empresa, fechas_corte):
+        cortes = sorted({_fin_de_mes(fecha) for fecha in fechas_corte if fecha})
+        if not cortes:
+            raise ValueError('Debe indicar al menos una fecha de corte')
+        if len(cortes) > MAX_PERIODOS_COLUMNAS:
+            raise ValueError(f'El reporte admite como máximo {MAX_PERIODOS_COLUMNAS} fechas de corte')
+        super().__init__(empresa, None, cortes[-1])
+        self.fechas_corte = cortes
+    
+    def _movimientos_agrupados(self):
+        """Débitos y créditos por (cuenta, mes, tipo de comprobante) hasta el último corte"""
+        return list(DetalleComprobante.objects.filter(
+            comprobante__empresa=self.empresa,
+            comprobante__estado='APROBADO',
+            comprobante__fecha__lte=self.fecha_fin,
+            cuenta__esta_activa=True,
+        ).annotate(
+            mes=TruncMonth('comprobante__fecha')
+        ).values(
+            'cuenta_id', 'cuenta__codigo', 'cuenta__nombre', 'cuenta__tipo', 'comprobante__tipo', 'mes'
+        ).annotate(
+            debito=Sum('debito'), credito=Sum('credito')
+        ).order_by('cuenta__codigo'))
+    
+    def generar(self):
+        """
+        Genera el Balance General comparativo.
+        Retorna columnas (fechas de corte), secciones (activos, pasivos y
+        patrimonio con la utilidad del ejercicio) y el resumen con el total
+        pasivo + patrimonio y la ecuación contable de cada corte.
+        """
+        meses_corte = [corte.replace(day=1) for corte in self.fechas_corte]
+        n = len(meses_corte)
+        filas = self._movimientos_agrupados()
+        
+        primer_cierre = min(
+            (f['mes'] for f in filas if f['comprobante__tipo'] == TipoComprobante.CIERRE), default=None
+        )
+        
+        cuentas = {}
+        utilidad = [Decimal('0.00')] * n
+        for fila in filas:
+            tipo_comprobante = fila['comprobante__tipo']
+            if tipo_comprobante == TipoComprobante.APERTURA and primer_cierre and fila['mes'] > primer_cierre:
+                continue
+            
+            if fila['cuenta__tipo'] == TipoCuenta.ACTIVO:
+                saldo = fila['debito'] - fila['credito']
+            else:
+                saldo = fila['credito'] - fila['debito']
+            
+            if fila['cuenta__tipo'] in TIPOS_CUENTA_RESULTADO:
+                montos = utilidad
+            else:
+                montos = cuentas.setdefault(fila['cuenta_id'], {
+                    'codigo': fila['cuenta__codigo'],
+                    'nombre': fila['cuenta__nombre'],
+                    'tipo': fila['cuenta__tipo'],
+                    'montos': [Decimal('0.00')] * n,
+                })['montos']
+            
+            for i, mes_corte in enumerate(meses_corte):
+                incluir = fila['mes'] < mes_corte if tipo_comprobante == TipoComprobante.CIERRE else fila['mes'] <= mes_corte
+                if incluir:
+                    montos[i] += saldo
+        
+        totales = {
+            clave: _sumar_columnas([c['montos'] for c in cuentas.values() if c['tipo'] == tipo], n)
+            for clave, _, tipo in self.SECCIONES
+        }
+        totales['patrimonio'] = _sumar_columnas([totales['patrimonio'], utilidad], n)
+        bases = totales['activos']
+        
+        secciones = []
+        for clave, nombre, tipo in self.SECCIONES:
+            filas_seccion = [
+                _fila_columnas(c['codigo'], c['nombre'], c['montos'], bases)
+                for c in cuentas.values()
+                if c['tipo'] == tipo and any(c['montos'])
+            ]
+            if tipo == TipoCuenta.PATRIMONIO and any(utilidad):
+                filas_seccion.append(_fila_columnas('', 'Utilidad (Pérdida) del Ejercicio', utilidad, bases))
+            secciones.append({
+                'clave': clave,
+                'nombre': nombre,
+                'filas': filas_seccion,
+                'total': _fila_columnas('', f'Total {nombre}', totales[clave], bases),
+            })
+        
+        pasivo_patrimonio = _sumar_columnas([totales['pasivos'], totales['patrimonio']], n)
+        
+        return {
+            'empresa': self.empresa,
+            'fecha_inicio': None,
+            'fecha_fin': self.fecha_fin,
+            'titulo': 'Balance General Comparativo',
+            'fechas_corte': self.fechas_corte,
+            'columnas': [f'{corte:%d/%m/%Y}' for corte in self.fechas_corte],
+            'mostrar_total': False,
+            'secciones': secciones,
+            'resumen': [_fila_columnas('', 'Total Pasivo + Patrimonio', pasivo_patrimonio, bases)],
+            'ecuacion_balanceada': [
+                abs(activo - pasivo) < Decimal('0.01') for activo, pasivo in zip(bases, pasivo_patrimonio)
+            ],
+        }
+
+
+# ============================================
+# ESTADO DE FLUJO DE EFECTIVO (MÉTODO INDIRECTO)
+# ============================================
+
+class EstadoFlujoEfectivo(ReporteFinanciero):
+    """
+    Estado de Flujo de Efectivo por el método indirecto.
+    
+    Parte de la utilidad neta y la ajusta con la variación de las cuentas de
+    balance entre dos cortes: el día anterior a fecha_inicio y fecha_fin. Cada
+    corte es una sola consulta agrupada por cuenta, así el reporte cuesta lo
+    mismo que el Balance de Comprobación sin importar el tamaño del libro.
+    
+    Clasificación de las cuentas (sin efectivo):
+    - Operación: activos y pasivos corrientes, depreciaciones y amortizaciones
+    - Inversión: activos no corrientes
+    - Financiación: pasivos no corrientes y patrimonio
+    
+    Los saldos se acumulan sin los comprobantes de cierre ni las aperturas que
+    los siguen, de modo que el traslado del resultado a utilidades acumuladas
+    no aparece como un flujo de financiación.
+    """
+    
+    PREFIJOS_EFECTIVO = ('11',)
+    # En el plan de cuentas del sistema la 1105 es Inventario de Mercancías (ver init_plan_cuentas)
+    CODIGOS_NO_EFECTIVO = ('1105',)
+    PREFIJOS_DEPRECIACION = ('1592', '1597')
+    PREFIJOS_ACTIVO_CORRIENTE = ('11', '12', '13', '14')
+    
+    def __init__(self, empresa, fecha_inicio=None, fecha_fin=None):
+        fecha_fin = fecha_fin or date.today()
+        fecha_inicio = fecha_inicio or fecha_fin.replace(month=1, day=1)
+        if fecha_inicio > fecha_fin:
+            raise ValueError('La fecha de inicio debe ser anterior a la fecha de fin')
+        super().__init__(empresa, fecha_inicio, fecha_fin)
+    
+    def _es_efectivo(self, codigo):
+        return codigo.startswith(self.PREFIJOS_EFECTIVO) and not codigo.startswith(self.CODIGOS_NO_EFECTIVO)
+    
+    def _es_corriente(self, fila):
+        """Usa es_corriente de Activo/Pasivo; sin subclase, los activos 11-14 y todos los pasivos son corrientes"""
+        if fila['cuenta__tipo'] == TipoCuenta.ACTIVO:
+            if fila['cuenta__activo__es_corriente'] is not None:
+                return fila['cuenta__activo__es_corriente']
+            return fila['cuenta__codigo'].startswith(self.PREFIJOS_ACTIVO_CORRIENTE)
+        if fila['cuenta__pasivo__es_corriente'] is not None:
+            return fila['cuenta__pasivo__es_corriente']
+        return True
+    
+    def _saldos_al(self, fecha, fecha_primer_cierre):
+        """
+        Saldo neto (débito - crédito) por cuenta al cierre de la fecha, con una
+        sola consulta agrupada. Retorna {cuenta_id: fila}.
+        """
+        movimientos = DetalleComprobante.objects.filter(
+            comprobante__empresa=self.empresa,
+            comprobante__estado='APROBADO',
+            comprobante__fecha__lte=fecha,
+        ).exclude(comprobante__tipo=TipoComprobante.CIERRE)
+        if fecha_primer_cierre:
+            movimientos = movimientos.exclude(
+                comprobante__tipo=TipoComprobante.APERTURA, comprobante__fecha__gt=fecha_primer_cierre
+            )
+        filas = movimientos.values(
+            'cuenta_id', 'cuenta__codigo', 'cuenta__nombre', 'cuenta__tipo',
+            'cuenta__activo__es_corriente', 'cuenta__pasivo__es_corriente',
+        ).annotate(
+            debito=Sum('debito'), credito=Sum('credito')
+        ).order_by()
+        return {fila['cuenta_id']: fila for fila in filas}
+    
+    def generar(self):
+        """
+        Genera el Estado de Flujo de Efectivo.
+        Retorna la utilidad neta, las partidas y totales de operación, inversión
+        y financiación, el efectivo inicial y final, y si el flujo neto concilia
+        con la variación del efectivo.
+        """
+        fecha_primer_cierre = _fecha_primer_cierre(self.empresa)
+        
+        saldos_iniciales = self._saldos_al(self.fecha_inicio - timedelta(days=1), fecha_primer_cierre)
+        saldos_finales = self._saldos_al(self.fecha_fin, fecha_primer_cierre)
+        
+        cero = Decimal('0.00')
+        utilidad_neta = cero
+        efectivo_inicial = efectivo_final = cero
+        secciones = {'operacion': [], 'inversion': [], 'financiacion': []}
+        
+        for cuenta_id in sorted(
+            saldos_iniciales.keys() | saldos_finales.keys(),
+            key=lambda c: (saldos_finales.get(c) or saldos_iniciales[c])['cuenta__codigo'],
+        ):
+            fila = saldos_finales.get(cuenta_id) or saldos_iniciales[cuenta_id]
+            inicial = saldos_iniciales.get(cuenta_id)
+            final = saldos_finales.get(cuenta_id)
+            saldo_inicial = (inicial['debito'] - inicial['credito']) if inicial else cero
+            saldo_final = (final['debito'] - final['credito']) if final else cero
+            codigo = fila['cuenta__codigo']
+            
+            if fila['cuenta__tipo'] in TIPOS_CUENTA_RESULTADO:
+                utilidad_neta -= saldo_final - saldo_inicial
+                continue
+            if self._es_efectivo(codigo):
+                efectivo_inicial += saldo_inicial
+                efectivo_final += saldo_final
+                continue
+            
+            # Un aumento de saldo deudor consume efectivo; un aumento acreedor lo genera
+            flujo = saldo_inicial - saldo_final
+            if not flujo:
+                continue
+            if codigo.startswith(self.PREFIJOS_DEPRECIACION):
+                seccion = 'operacion'
+            elif fila['cuenta__tipo'] == TipoCuenta.ACTIVO:
+                seccion = 'operacion' if self._es_corriente(fila) else 'inversion'
+            elif fila['cuenta__tipo'] == TipoCuenta.PASIVO:
+                seccion = 'operacion' if self._es_corriente(fila) else 'financiacion'
+            else:
+                seccion = 'financiacion'
+            secciones[seccion].append({
+                'cuenta_id': cuenta_id,
+                'codigo': codigo,
+                'nombre': fila['cuenta__nombre'],
+                'saldo_inicial': saldo_inicial,
+                'saldo_final': saldo_final,
+                'monto': flujo,
+            })
+        
+        totales = {clave: sum((p['monto'] for p in partidas), cero) for clave, partidas in secciones.items()}
+        totales['operacion'] += utilidad_neta
+        flujo_neto = totales['operacion'] + totales['inversion'] + totales['financiacion']
+        variacion_efectivo = efectivo_final - efectivo_inicial
+        
+        return {
+            'empresa': self.empresa,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'utilidad_neta': utilidad_neta,
+            'operacion': secciones['operacion'],
+            'inversion': secciones['inversion'],
+            'financiacion': secciones['financiacion'],
+            'totales': {
+                'operacion': totales['operacion'],
+                'inversion': totales['inversion'],
+                'financiacion': totales['financiacion'],
+                'flujo_neto': flujo_neto,
+            },
+            'efectivo_inicial': efectivo_inicial,
+            'efectivo_final': efectivo_final,
+            'variacion_efectivo': variacion_efectivo,
+            'esta_conciliado': abs(flujo_neto - variacion_efectivo) < Decimal('0.01'),
+        }
+
+
+# ============================================
+# ESTADO DE CAMBIOS EN EL PATRIMONIO
+# ============================================
+
+class EstadoCambiosPatrimonio(ReporteFinanciero):
+    """
+    Estado de Cambios en el Patrimonio.
+    
+    Una sola consulta agrupada sobre las cuentas de patrimonio y de resultados
+    separa, con agregación condicional, el saldo anterior a fecha_inicio y los
+    aumentos (créditos) y disminuciones (débitos) del período. La utilidad del
+    período sale de las mismas filas (cuentas de resultados), sin generar el
+    Estado de Resultados.
+    
+    Los cierres anteriores al período ya trasladaron sus resultados a
+    utilidades acumuladas y cuentan en el saldo inicial; los cierres dentro del
+    período se omiten para que el resultado aparezca como utilidad del período
+    y no como un aumento de utilidades acumuladas.
+    """
+    
+    def __init__(self, empresa, fecha_inicio=None, fecha_fin=None):
+        fecha_fin = fecha_fin or date.today()
+        fecha_inicio = fecha_inicio or fecha_fin.replace(month=1, day=1)
+        if fecha_inicio > fecha_fin:
+            raise ValueError('La fecha de inicio debe ser anterior a la fecha de fin')
+        super().__init__(empresa, fecha_inicio, fecha_fin)
+    
+    def _movimientos_agrupados(self):
+        """Saldo inicial, aumentos y disminuciones por cuenta en una sola consulta"""
+        movimientos = DetalleComprobante.objects.filter(
+            comprobante__empresa=self.empresa,
+            comprobante__estado='APROBADO',
+            comprobante__fecha__lte=self.fecha_fin,
+            cuenta__tipo__in=(TipoCuenta.PATRIMONIO,) + TIPOS_CUENTA_RESULTADO,
+            cuenta__esta_activa=True,
+        ).exclude(
+            comprobante__tipo=TipoComprobante.CIERRE, comprobante__fecha__gte=self.fecha_inicio
+        )
+        fecha_primer_cierre = _fecha_primer_cierre(self.empresa)
+        if fecha_primer_cierre:
+            movimientos = movimientos.exclude(
+                comprobante__tipo=TipoComprobante.APERTURA, comprobante__fecha__gt=fecha_primer_cierre
+            )
+        
+        anterior = Q(comprobante__fecha__lt=self.fecha_inicio)
+        cero = Value(Decimal('0.00'))
+        return movimientos.values(
+            'cuenta_id', 'cuenta__codigo', 'cuenta__nombre', 'cuenta__tipo'
+        ).annotate(
+            saldo_inicial=Coalesce(Sum(F('credito') - F('debito'), filter=anterior), cero),
+            aumentos=Coalesce(Sum('credito', filter=~anterior), cero),
+            disminuciones=Coalesce(Sum('debito', filter=~anterior), cero),
+        ).order_by('cuenta__codigo')
+    
+    def generar(self):
+        """
+        Genera el Estado de Cambios en el Patrimonio.
+        Retorna las cuentas de patrimonio con saldo inicial, aumentos,
+        disminuciones y saldo final, los resultados anteriores no cerrados, la
+        utilidad del período y los totales.
+        """
+        cero = Decimal('0.00')
+        cuentas = []
+        resultados_anteriores = cero
+        utilidad_periodo = cero
+        
+        for fila in self._movimientos_agrupados():
+            if fila['cuenta__tipo'] in TIPOS_CUENTA_RESULTADO:
+                resultados_anteriores += fila['saldo_inicial']
+                utilidad_periodo += fila['aumentos'] - fila['disminuciones']
+                continue
+            saldo_final = fila['saldo_inicial'] + fila['aumentos'] - fila['disminuciones']
+            if not (fila['saldo_inicial'] or fila['aumentos'] or fila['disminuciones']):
+                continue
+            cuentas.append({
+                'cuenta_id': fila['cuenta_id'],
+                'codigo': fila['cuenta__codigo'],
+                'nombre': fila['cuenta__nombre'],
+                'saldo_inicial': fila['saldo_inicial'],
+                'aumentos': fila['aumentos'],
+                'disminuciones': fila['disminuciones'],
+                'saldo_final': saldo_final,
+            })
+        
+        saldo_inicial = sum((c['saldo_inicial'] for c in cuentas), cero) + resultados_anteriores
+        aumentos = sum((c['aumentos'] for c in cuentas), cero)
+        disminuciones = sum((c['disminuciones'] for c in cuentas), cero)
+        
+        return {
+            'empresa': self.empresa,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'cuentas': cuentas,
+            'resultados_anteriores': resultados_anteriores,
+            'utilidad_periodo': utilidad_periodo,
+            'resultado': _determinar_resultado(utilidad_periodo),
+            'totales': {
+                'saldo_inicial': saldo_inicial,
+                'aumentos': aumentos,
+                'disminuciones': disminuciones,
+                'utilidad_periodo': utilidad_periodo,
+                'saldo_final': saldo_inicial + aumentos - disminuciones + utilidad_periodo,
+            },
+        }
@@ -7,6 +7,7 @@ urlpatterns = [
     # Gestión de Cuentas
     path('', views.lista_cuentas, name='lista_cuentas'),
     path('crear/', views.crear_cuenta, name='crear_cuenta'),
+    path('buscar/', views.buscar_cuentas, name='buscar_cuentas'),
     path('arbol/<int:empresa_id>/', views.arbol_cuentas, name='arbol_cuentas'),
     path('<int:cuenta_id>/', views.detalle_cuenta, name='detalle_cuenta'),
     path('<int:cuenta_id>/editar/', views.editar_cuenta, name='editar_cuenta'),
@@ -17,10 +18,18 @@ urlpatterns = [
     path('reportes/balance-comprobacion/', views.balance_comprobacion_view, name='balance_comprobacion'),
     path('reportes/estado-resultados/', views.estado_resultados_view, name='estado_resultados'),
     path('reportes/balance-general/', views.balance_general_view, name='balance_general'),
+    path('reportes/flujo-efectivo/', views.flujo_efectivo_view, name='flujo_efectivo'),
+    path('reportes/cambios-patrimonio/', views.cambios_patrimonio_view, name='cambios_patrimonio'),
+    path('reportes/estado-resultados-mensual/', views.estado_resultados_mensual_view, name='estado_resultados_mensual'),
+    path('reportes/balance-general-comparativo/', views.balance_general_comparativo_view, name='balance_general_comparativo'),
     
     # Exportación de Reportes
     path('reportes/balance-comprobacion/pdf/', views.balance_comprobacion_pdf, name='balance_comprobacion_pdf'),
     path('reportes/estado-resultados/pdf/', views.estado_resultados_pdf, name='estado_resultados_pdf'),
     path('reportes/balance-general/pdf/', views.balance_general_pdf, name='balance_general_pdf'),
     path('reportes/balance-general/excel/', views.balance_general_excel, name='balance_general_excel'),
+    path('reportes/estado-resultados-mensual/<str:formato>/', views.estado_resultados_mensual_view,
+         name='estado_resultados_mensual_exportar'),
+    path('reportes/balance-general-comparativo/<str:formato>/', views.balance_general_comparativo_view,
+         name='balance_general_comparativo_exportar'),
 ]
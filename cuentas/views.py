@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Sum
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
@@ -14,46 +15,49 @@ DETALLE_CUENTA_URL = 'cuentas:detalle_cuenta'
 ERROR_EMPRESA_NO_ENCONTRADA = 'Empresa no encontrada.'
 ERROR_FORMATO_FECHA_INVALIDO = 'Formato de fecha inválido.'
 
-# Importar función reutilizable
-from S_CONTABLE.utils import obtener_empresa_activa as obtener_empresa_unica
+# Importar funciones reutilizables
+from S_CONTABLE.utils import obtener_empresa_request, aplicar_filtro_empresa, empresas_visibles, empresa_id_solicitada
 
 @login_required
 @never_cache
 @require_GET
 def lista_cuentas(request):
     """Lista todas las cuentas con filtros jerárquicos usando utilidades centralizadas"""
-    from S_CONTABLE.utils import aplicar_busqueda_texto, paginar_queryset
+    from S_CONTABLE.utils import paginar_queryset
+    from .indice_busqueda import buscar_cuentas_queryset
     
-    cuentas = Cuenta.objects.select_related('empresa', 'cuenta_padre').all().order_by('codigo')
+    # Solo las cuentas de las empresas visibles para el usuario
+    cuentas = aplicar_filtro_empresa(
+        Cuenta.objects.select_related('empresa', 'cuenta_padre'), request
+    ).order_by('codigo')
     
     # Filtros
     empresa_id = request.GET.get('empresa')
     tipo = request.GET.get('tipo')
     busqueda = request.GET.get('busqueda')
     
-    if empresa_id:
-        cuentas = cuentas.filter(empresa_id=empresa_id)
-    
     if tipo:
         cuentas = cuentas.filter(tipo=tipo)
     
-    # Usar helper centralizado para búsqueda
-    cuentas = aplicar_busqueda_texto(cuentas, busqueda, ['codigo', 'nombre'])
+    # Búsqueda con el índice en memoria cuando se conoce la empresa
+    if request.user.is_superuser:
+        empresa_busqueda = empresa_id_solicitada(request)
+    else:
+        empresa = obtener_empresa_request(request)
+        empresa_busqueda = empresa.id if empresa else None
+    cuentas = buscar_cuentas_queryset(cuentas, busqueda, empresa_busqueda)
     
     # Usar helper centralizado para paginación
     page_obj = paginar_queryset(cuentas, request, items_per_page=20)
     
-    # Para los filtros
-    empresas = Empresa.objects.filter(activo=True)
-    
     context = {
         'page_obj': page_obj,
-        'empresas': empresas,
+        'empresas': empresas_visibles(request),
         'tipos': TipoCuenta.choices,
         'empresa_seleccionada': empresa_id,
         'tipo_seleccionado': tipo,
         'busqueda': busqueda,
-        'total_cuentas': Cuenta.objects.filter(esta_activa=True).count(),
+        'total_cuentas': aplicar_filtro_empresa(Cuenta.objects.filter(esta_activa=True), request).count(),
     }
     
     return render(request, 'cuentas/lista_cuentas.html', context)
@@ -63,7 +67,7 @@ def lista_cuentas(request):
 @require_GET
 def arbol_cuentas(request, empresa_id):
     """Muestra el árbol jerárquico de cuentas de una empresa"""
-    empresa = get_object_or_404(Empresa, id=empresa_id)
+    empresa = get_object_or_404(empresas_visibles(request), id=empresa_id)
     
     # Obtener cuentas de nivel 1 (sin padre)
     cuentas_raiz = Cuenta.objects.filter(
@@ -84,7 +88,9 @@ def arbol_cuentas(request, empresa_id):
 @require_GET
 def detalle_cuenta(request, cuenta_id):
     """Muestra el detalle de una cuenta"""
-    cuenta = get_object_or_404(Cuenta.objects.select_related('empresa', 'cuenta_padre'), id=cuenta_id)
+    cuenta = get_object_or_404(
+        aplicar_filtro_empresa(Cuenta.objects.select_related('empresa', 'cuenta_padre'), request), id=cuenta_id
+    )
     
     # Obtener subcuentas
     subcuentas = cuenta.subcuentas.filter(esta_activa=True).order_by('codigo')
@@ -141,7 +147,7 @@ def crear_cuenta(request):
 @require_http_methods(['GET', 'POST'])
 def editar_cuenta(request, cuenta_id):
     """Edita una cuenta existente"""
-    cuenta = get_object_or_404(Cuenta, id=cuenta_id)
+    cuenta = get_object_or_404(aplicar_filtro_empresa(Cuenta.objects.all(), request), id=cuenta_id)
     
     if request.method == 'POST':
         form = CuentaForm(request.POST, instance=cuenta)
@@ -169,7 +175,7 @@ def editar_cuenta(request, cuenta_id):
 @require_http_methods(['GET', 'POST'])
 def eliminar_cuenta(request, cuenta_id):
     """Desactiva una cuenta (no la elimina físicamente)"""
-    cuenta = get_object_or_404(Cuenta, id=cuenta_id)
+    cuenta = get_object_or_404(aplicar_filtro_empresa(Cuenta.objects.all(), request), id=cuenta_id)
     
     # Verificar si tiene movimientos
     if cuenta.movimientos.exists():
@@ -190,6 +196,47 @@ def eliminar_cuenta(request, cuenta_id):
     return render(request, 'cuentas/confirmar_eliminacion.html', {'cuenta': cuenta})
 
 
+# ============================================
+# BÚSQUEDA DE CUENTAS (JSON)
+# ============================================
+
+@login_required
+@require_GET
+def buscar_cuentas(request):
+    """
+    Retorna en JSON las cuentas que aceptan movimiento de la empresa del usuario
+    (los superusuarios pueden indicar ?empresa=<id>), leídas del índice en caché.
+    Parámetros opcionales: q (prefijo de código o fragmento del nombre, resuelto
+    con el índice de búsqueda en memoria) y limite.
+    """
+    from .cache_cuentas import obtener_indice_cuentas
+    from .indice_busqueda import obtener_indice_busqueda
+    
+    empresa = obtener_empresa_request(request)
+    if not empresa:
+        return JsonResponse({'error': ERROR_EMPRESA_NO_ENCONTRADA}, status=404)
+    
+    try:
+        limite = max(int(request.GET.get('limite', 0)), 0)
+    except ValueError:
+        limite = 0
+    
+    cuentas = obtener_indice_cuentas(empresa.id)
+    texto = request.GET.get('q')
+    if texto:
+        # Autocompletado: prefijo de código o fragmento del nombre
+        ids = obtener_indice_busqueda(empresa.id).buscar(texto, limite=limite, solo_movimiento=True)
+        por_id = {cuenta[0]: cuenta for cuenta in cuentas}
+        cuentas = [por_id[i] for i in ids if i in por_id]
+    elif limite:
+        cuentas = cuentas[:limite]
+    
+    return JsonResponse({
+        'empresa': empresa.id,
+        'resultados': [{'id': cuenta_id, 'codigo': codigo, 'nombre': nombre} for cuenta_id, codigo, nombre in cuentas],
+    })
+
+
 # ============================================
 # VISTAS DE REPORTES FINANCIEROS
 # ============================================
@@ -199,11 +246,8 @@ def eliminar_cuenta(request, cuenta_id):
 @require_GET
 def reportes_menu(request):
     """Menú principal de reportes financieros"""
-    from login.utils import obtener_empresa_usuario
     
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     context = {
         'empresa': empresa,
@@ -218,14 +262,11 @@ def reportes_menu(request):
 def balance_comprobacion_view(request):
     """Vista para el Balance de Comprobación usando utilidades centralizadas"""
     from .reportes import BalanceComprobacion
-    from login.utils import obtener_empresa_usuario
     from .models import TipoCuenta
     from S_CONTABLE.utils import obtener_fechas_desde_request
     
     reporte_data = None
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
@@ -247,15 +288,17 @@ def balance_comprobacion_view(request):
             empresa, 
             fecha_inicio_obj, 
             fecha_fin_obj,
-            tipo_cuenta if tipo_cuenta else None
+            tipo_cuenta if tipo_cuenta else None,
+            con_saldos=bool(request.GET.get('saldos')),
         )
-        reporte_data = reporte.generar()
+        reporte_data = reporte.generar_con_cache()
     
     context = {
         'empresa': empresa,
         'reporte': reporte_data,
         'tipos_cuenta': TipoCuenta.choices,
         'tipo_cuenta_seleccionado': request.GET.get('tipo_cuenta', ''),
+        'con_saldos': bool(request.GET.get('saldos')),
     }
     
     return render(request, 'cuentas/reportes/balance_comprobacion.html', context)
@@ -269,14 +312,11 @@ def balance_comprobacion_pdf(request):
     from django.http import HttpResponse
     from .reportes import BalanceComprobacion
     from datetime import datetime
-    from login.utils import obtener_empresa_usuario
     from S_CONTABLE.pdf_utils import GeneradorPDF, formatear_moneda
     from S_CONTABLE.utils import obtener_fechas_desde_request
     from reportlab.lib.units import inch
     
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada.')
@@ -286,48 +326,52 @@ def balance_comprobacion_pdf(request):
     fecha_inicio_obj, fecha_fin_obj = obtener_fechas_desde_request(request)
     tipo_cuenta = request.GET.get('tipo_cuenta', '')
     
+    con_saldos = bool(request.GET.get('saldos'))
+    
     # Generar reporte
     reporte = BalanceComprobacion(
         empresa, 
         fecha_inicio_obj, 
         fecha_fin_obj,
-        tipo_cuenta if tipo_cuenta else None
+        tipo_cuenta if tipo_cuenta else None,
+        con_saldos=con_saldos,
     )
-    reporte_data = reporte.generar()
+    reporte_data = reporte.generar_con_cache()
     
     # Usar la clase GeneradorPDF para reducir duplicación
-    generador = GeneradorPDF("Balance de Comprobación", orientacion='landscape')
+    titulo = "Balance de Comprobación de Saldos" if con_saldos else "Balance de Comprobación"
+    generador = GeneradorPDF(titulo, orientacion='landscape')
     
     # Agregar encabezado
     periodo = generador.generar_periodo_texto(fecha_inicio_obj, fecha_fin_obj)
-    generador.agregar_encabezado(empresa, "Balance de Comprobación", periodo)
+    generador.agregar_encabezado(empresa, titulo, periodo)
+    
+    # Columnas: con saldos se agregan el saldo inicial deudor y acreedor
+    columnas = ['debito', 'credito', 'saldo_deudor', 'saldo_acreedor']
+    columnas_totales = ['debitos', 'creditos', 'saldo_deudor', 'saldo_acreedor']
+    encabezado = ['Código', 'Cuenta', 'Débitos', 'Créditos', 'Saldo Deudor', 'Saldo Acreedor']
+    anchos = [0.8*inch, 3*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch]
+    if con_saldos:
+        columnas = ['saldo_inicial_deudor', 'saldo_inicial_acreedor'] + columnas
+        columnas_totales = ['saldo_inicial_deudor', 'saldo_inicial_acreedor'] + columnas_totales
+        encabezado = ['Código', 'Cuenta', 'S. Inicial Deudor', 'S. Inicial Acreedor', 'Débitos', 'Créditos',
+                      'S. Final Deudor', 'S. Final Acreedor']
+        anchos = [0.7*inch, 2.3*inch] + [1.05*inch] * 6
     
     # Crear tabla de datos
-    data = [['Código', 'Cuenta', 'Débitos', 'Créditos', 'Saldo Deudor', 'Saldo Acreedor']]
+    data = [encabezado]
     
     for cuenta in reporte_data['cuentas']:
-        data.append([
-            cuenta['codigo'],
-            cuenta['nombre'][:40],
-            formatear_moneda(cuenta['debito']),
-            formatear_moneda(cuenta['credito']),
-            formatear_moneda(cuenta['saldo_deudor']),
-            formatear_moneda(cuenta['saldo_acreedor']),
-        ])
+        data.append(
+            [cuenta['codigo'], cuenta['nombre'][:40 if not con_saldos else 30]]
+            + [formatear_moneda(cuenta[columna]) for columna in columnas]
+        )
     
     # Fila de totales
     totales = reporte_data['totales']
-    data.append([
-        '',
-        'TOTALES',
-        formatear_moneda(totales['debitos']),
-        formatear_moneda(totales['creditos']),
-        formatear_moneda(totales['saldo_deudor']),
-        formatear_moneda(totales['saldo_acreedor']),
-    ])
+    data.append(['', 'TOTALES'] + [formatear_moneda(totales[columna]) for columna in columnas_totales])
     
     # Agregar tabla usando método del generador
-    anchos = [0.8*inch, 3*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch]
     generador.agregar_tabla(data, anchos)
     
     # Indicador de balance
@@ -357,13 +401,10 @@ def balance_comprobacion_pdf(request):
 def estado_resultados_view(request):
     """Vista para el Estado de Resultados usando utilidades centralizadas"""
     from .reportes import EstadoResultados
-    from login.utils import obtener_empresa_usuario
     from S_CONTABLE.utils import obtener_fechas_desde_request
     
     reporte_data = None
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
@@ -376,7 +417,7 @@ def estado_resultados_view(request):
         
         # Generar reporte
         reporte = EstadoResultados(empresa, fecha_inicio_obj, fecha_fin_obj)
-        reporte_data = reporte.generar()
+        reporte_data = reporte.generar_con_cache()
     
     context = {
         'empresa': empresa,
@@ -400,12 +441,9 @@ def estado_resultados_pdf(request):
     from reportlab.lib.enums import TA_CENTER, TA_RIGHT
     from .reportes import EstadoResultados
     from datetime import datetime
-    from login.utils import obtener_empresa_usuario
     from io import BytesIO
     
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada.')
@@ -423,7 +461,7 @@ def estado_resultados_pdf(request):
     
     # Generar reporte
     reporte = EstadoResultados(empresa, fecha_inicio_obj, fecha_fin_obj)
-    data = reporte.generar()
+    data = reporte.generar_con_cache()
     
     # Crear PDF
     buffer = BytesIO()
@@ -503,13 +541,10 @@ def estado_resultados_pdf(request):
 def balance_general_view(request):
     """Vista para el Balance General usando utilidades centralizadas"""
     from .reportes import BalanceGeneral
-    from login.utils import obtener_empresa_usuario
     from S_CONTABLE.utils import obtener_fechas_desde_request
     
     reporte_data = None
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
@@ -535,7 +570,7 @@ def balance_general_view(request):
         
         # Generar reporte
         reporte = BalanceGeneral(empresa, fecha_inicio_obj, fecha_fin_obj)
-        reporte_data = reporte.generar()
+        reporte_data = reporte.generar_con_cache()
     
     context = {
         'empresa': empresa,
@@ -553,12 +588,9 @@ def balance_general_pdf(request):
     from .reportes import BalanceGeneral
     from .export_service import ExportadorBalanceGeneral
     from datetime import datetime
-    from login.utils import obtener_empresa_usuario
     from django.http import FileResponse
     
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada.')
@@ -573,7 +605,7 @@ def balance_general_pdf(request):
         
         # Generar reporte
         reporte = BalanceGeneral(empresa, fecha_inicio_obj, fecha_fin_obj)
-        reporte_data = reporte.generar()
+        reporte_data = reporte.generar_con_cache()
         
         # Exportar a PDF
         exportador = ExportadorBalanceGeneral(reporte_data)
@@ -597,12 +629,9 @@ def balance_general_excel(request):
     from .reportes import BalanceGeneral
     from .export_service import ExportadorBalanceGeneral
     from datetime import datetime
-    from login.utils import obtener_empresa_usuario
     from django.http import HttpResponse
     
-    empresa = obtener_empresa_usuario(request.user)
-    if not empresa:
-        empresa = obtener_empresa_unica()
+    empresa = obtener_empresa_request(request)
     
     if not empresa:
         messages.error(request, 'No tienes una empresa asignada.')
@@ -617,7 +646,7 @@ def balance_general_excel(request):
         
         # Generar reporte
         reporte = BalanceGeneral(empresa, fecha_inicio_obj, fecha_fin_obj)
-        reporte_data = reporte.generar()
+        reporte_data = reporte.generar_con_cache()
         
         # Exportar a Excel
         exportador = ExportadorBalanceGeneral(reporte_data)
@@ -636,3 +665,173 @@ def balance_general_excel(request):
     except Exception as e:
         messages.error(request, f'Error al generar el Excel: {str(e)}')
         return redirect('cuentas:balance_general')
+
+
+@login_required
+@never_cache
+@require_GET
+def flujo_efectivo_view(request):
+    """Vista para el Estado de Flujo de Efectivo (método indirecto)"""
+    from .reportes import EstadoFlujoEfectivo
+    from S_CONTABLE.utils import obtener_fechas_desde_request
+    
+    reporte_data = None
+    empresa = obtener_empresa_request(request)
+    
+    if not empresa:
+        messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
+        return render(request, 'cuentas/reportes/flujo_efectivo.html', {'reporte': None, 'empresa': None})
+    
+    if request.GET.get('generar') or request.GET.get('fecha_inicio') or request.GET.get('fecha_fin'):
+        fecha_inicio_obj, fecha_fin_obj = obtener_fechas_desde_request(request)
+        try:
+            reporte_data = EstadoFlujoEfectivo(empresa, fecha_inicio_obj, fecha_fin_obj).generar_con_cache()
+        except ValueError as e:
+            messages.error(request, str(e))
+    
+    context = {
+        'empresa': empresa,
+        'reporte': reporte_data,
+    }
+    
+    return render(request, 'cuentas/reportes/flujo_efectivo.html', context)
+
+
+@login_required
+@never_cache
+@require_GET
+def cambios_patrimonio_view(request):
+    """Vista para el Estado de Cambios en el Patrimonio"""
+    from .reportes import EstadoCambiosPatrimonio
+    from S_CONTABLE.utils import obtener_fechas_desde_request
+    
+    reporte_data = None
+    empresa = obtener_empresa_request(request)
+    
+    if not empresa:
+        messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
+        return render(request, 'cuentas/reportes/cambios_patrimonio.html', {'reporte': None, 'empresa': None})
+    
+    if request.GET.get('generar') or request.GET.get('fecha_inicio') or request.GET.get('fecha_fin'):
+        fecha_inicio_obj, fecha_fin_obj = obtener_fechas_desde_request(request)
+        try:
+            reporte_data = EstadoCambiosPatrimonio(empresa, fecha_inicio_obj, fecha_fin_obj).generar_con_cache()
+        except ValueError as e:
+            messages.error(request, str(e))
+    
+    context = {
+        'empresa': empresa,
+        'reporte': reporte_data,
+    }
+    
+    return render(request, 'cuentas/reportes/cambios_patrimonio.html', context)
+
+
+# ============================================
+# REPORTES MULTIPERÍODO (COLUMNAS)
+# ============================================
+
+FORMATOS_EXPORTACION = ('pdf', 'excel')
+REPORTE_COLUMNAS_TEMPLATE = 'cuentas/reportes/reporte_columnas.html'
+
+
+def _exportar_reporte_columnas(reporte_data, formato, nombre_base):
+    """Respuesta de descarga (PDF o Excel) de un reporte multiperíodo"""
+    from django.http import HttpResponse
+    from datetime import datetime
+    from .export_service import ExportadorReporteColumnas
+    
+    exportador = ExportadorReporteColumnas(reporte_data)
+    fecha = datetime.now().strftime('%Y%m%d')
+    if formato == 'pdf':
+        response = HttpResponse(exportador.exportar_pdf(), content_type='application/pdf')
+        filename = f'{nombre_base}_{fecha}.pdf'
+    else:
+        response = HttpResponse(
+            exportador.exportar_excel().read(),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        filename = f'{nombre_base}_{fecha}.xlsx'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _responder_reporte_columnas(request, reporte_data, formato, contexto):
+    """Muestra el reporte en HTML o lo descarga si se pidió un formato de exportación"""
+    if formato and formato not in FORMATOS_EXPORTACION:
+        messages.error(request, f'Formato de exportación no soportado: {formato}')
+        formato = None
+    if formato and reporte_data:
+        return _exportar_reporte_columnas(reporte_data, formato, contexto['nombre_archivo'])
+    contexto['reporte'] = reporte_data
+    return render(request, REPORTE_COLUMNAS_TEMPLATE, contexto)
+
+
+@login_required
+@never_cache
+@require_GET
+def estado_resultados_mensual_view(request, formato=None):
+    """Estado de Resultados con una columna por mes (exportable a PDF o Excel)"""
+    from .reportes import EstadoResultadosMultiperiodo
+    from S_CONTABLE.utils import obtener_fechas_desde_request
+    
+    empresa = obtener_empresa_request(request)
+    contexto = {
+        'empresa': empresa,
+        'titulo': 'Estado de Resultados Mensual',
+        'modo': 'meses',
+        'url_nombre': 'cuentas:estado_resultados_mensual',
+        'nombre_archivo': 'estado_resultados_mensual',
+    }
+    if not empresa:
+        messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
+        return render(request, REPORTE_COLUMNAS_TEMPLATE, contexto)
+    
+    reporte_data = None
+    if request.GET.get('generar') or request.GET.get('fecha_inicio') or request.GET.get('fecha_fin'):
+        fecha_inicio_obj, fecha_fin_obj = obtener_fechas_desde_request(request)
+        try:
+            reporte_data = EstadoResultadosMultiperiodo(empresa, fecha_inicio_obj, fecha_fin_obj).generar_con_cache()
+        except ValueError as e:
+            messages.error(request, str(e))
+    
+    return _responder_reporte_columnas(request, reporte_data, formato, contexto)
+
+
+@login_required
+@never_cache
+@require_GET
+def balance_general_comparativo_view(request, formato=None):
+    """
+    Balance General a varias fechas de corte (?cortes=2024-12-31,2025-06-30),
+    exportable a PDF o Excel.
+    """
+    from .reportes import BalanceGeneralComparativo
+    from S_CONTABLE.utils import parsear_fecha
+    
+    empresa = obtener_empresa_request(request)
+    cortes_texto = request.GET.get('cortes', '')
+    contexto = {
+        'empresa': empresa,
+        'titulo': 'Balance General Comparativo',
+        'modo': 'cortes',
+        'cortes': cortes_texto,
+        'url_nombre': 'cuentas:balance_general_comparativo',
+        'nombre_archivo': 'balance_general_comparativo',
+    }
+    if not empresa:
+        messages.error(request, 'No tienes una empresa asignada. Contacta al administrador.')
+        return render(request, REPORTE_COLUMNAS_TEMPLATE, contexto)
+    
+    reporte_data = None
+    if cortes_texto:
+        fechas = [parsear_fecha(valor.strip()) for valor in cortes_texto.split(',') if valor.strip()]
+        if None in fechas:
+            messages.error(request, ERROR_FORMATO_FECHA_INVALIDO)
+        else:
+            try:
+                reporte_data = BalanceGeneralComparativo(empresa, fechas).generar_con_cache()
+            except ValueError as e:
+                messages.error(request, str(e))
+    
+    return _responder_reporte_columnas(request, reporte_data, formato, contexto)
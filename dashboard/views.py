@@ -6,11 +6,12 @@ from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper
 from empresa.models import Empresa
 from cuentas.models import Cuenta
 from transacciones.models import Comprobante, DetalleComprobante
-from inventario.models import Producto, Categoria, MovimientoInventario
+from inventario.models import Producto, Categoria, MovimientoInventario, TotalInventario
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
+from S_CONTABLE.utils import aplicar_filtro_empresa
 
 def get_admin_statistics():
     """Obtiene estadísticas generales del sistema para administradores"""
@@ -31,22 +32,18 @@ def get_admin_totals():
     )
 
 
-def get_inventory_statistics():
-    """Obtiene estadísticas de inventario"""
-    total_productos = Producto.objects.filter(estado='activo').count()
-    total_categorias = Categoria.objects.count()
-    productos_bajo_stock = Producto.objects.filter(
-        cantidad__lte=F('stock_minimo'),
+def get_inventory_statistics(request):
+    """Obtiene estadísticas de inventario de las empresas visibles para el usuario"""
+    productos = aplicar_filtro_empresa(Producto.objects.all(), request)
+    total_productos = productos.filter(estado='activo').count()
+    total_categorias = aplicar_filtro_empresa(Categoria.objects.all(), request).count()
+    productos_bajo_stock = productos.filter(
+        bajo_stock=True,
         estado='activo'
     ).count()
     
-    valor_inventario = Producto.objects.filter(estado='activo').aggregate(
-        total=Sum(
-            ExpressionWrapper(
-                F('cantidad') * F('precio_unitario'),
-                output_field=DecimalField()
-            )
-        )
+    valor_inventario = aplicar_filtro_empresa(TotalInventario.objects.all(), request).aggregate(
+        total=Sum('valor')
     )['total'] or Decimal('0.00')
     
     return {
@@ -78,7 +75,7 @@ def get_recent_data(es_admin):
     }
 
 
-def get_chart_data(es_admin):
+def get_chart_data(request, es_admin):
     """Obtiene datos para gráficos"""
     comprobantes_por_tipo = []
     if es_admin:
@@ -86,7 +83,7 @@ def get_chart_data(es_admin):
             total=Count('id')
         ).order_by('-total')
     
-    productos_por_categoria = Producto.objects.filter(
+    productos_por_categoria = aplicar_filtro_empresa(Producto.objects.all(), request).filter(
         estado='activo',
         categoria__isnull=False
     ).values(
@@ -95,7 +92,7 @@ def get_chart_data(es_admin):
         total=Count('id')
     ).order_by('-total')[:5]
     
-    movimientos_por_tipo = MovimientoInventario.objects.values('tipo').annotate(
+    movimientos_por_tipo = aplicar_filtro_empresa(MovimientoInventario.objects.all(), request).values('tipo').annotate(
         total=Count('id'),
         cantidad_total=Sum('cantidad')
     ).order_by('tipo')
@@ -107,19 +104,20 @@ def get_chart_data(es_admin):
     }
 
 
-def get_inventory_movements():
+def get_inventory_movements(request):
     """Obtiene movimientos de inventario recientes y de los últimos 7 días"""
-    movimientos_recientes = MovimientoInventario.objects.select_related(
+    movimientos = aplicar_filtro_empresa(MovimientoInventario.objects.all(), request)
+    movimientos_recientes = movimientos.select_related(
         'producto', 'usuario'
     ).order_by('-fecha')[:5]
     
-    productos_restock = Producto.objects.filter(
-        cantidad__lte=F('stock_minimo'),
+    productos_restock = aplicar_filtro_empresa(Producto.objects.all(), request).filter(
+        bajo_stock=True,
         estado='activo'
     ).order_by('cantidad')[:5]
     
     fecha_hace_7_dias = timezone.now() - timedelta(days=7)
-    movimientos_ultimos_7_dias = MovimientoInventario.objects.filter(
+    movimientos_ultimos_7_dias = movimientos.filter(
         fecha__gte=fecha_hace_7_dias
     ).extra(
         select={'fecha_dia': 'DATE(fecha)'}
@@ -134,11 +132,12 @@ def get_inventory_movements():
     }
 
 
-def get_monthly_financial_data(es_admin):
+def get_monthly_financial_data(request, es_admin):
     """Calcula datos financieros del mes actual"""
     fecha_inicio_mes = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    movimientos = aplicar_filtro_empresa(MovimientoInventario.objects.all(), request)
     
-    ingresos_mes = MovimientoInventario.objects.filter(
+    ingresos_mes = movimientos.filter(
         tipo='entrada',
         fecha__gte=fecha_inicio_mes
     ).aggregate(
@@ -150,7 +149,7 @@ def get_monthly_financial_data(es_admin):
         )
     )['total'] or Decimal('0.00')
     
-    egresos_mes = MovimientoInventario.objects.filter(
+    egresos_mes = movimientos.filter(
         tipo='salida',
         fecha__gte=fecha_inicio_mes
     ).aggregate(
@@ -205,11 +204,11 @@ def dashboard_view(request):
         user_stats = {'total_usuarios': 0, 'usuarios_admin': 0}
     
     # Obtener todas las estadísticas usando funciones auxiliares
-    inventory_stats = get_inventory_statistics()
+    inventory_stats = get_inventory_statistics(request)
     recent_data = get_recent_data(es_admin)
-    chart_data = get_chart_data(es_admin)
-    inventory_movements = get_inventory_movements()
-    financial_data = get_monthly_financial_data(es_admin)
+    chart_data = get_chart_data(request, es_admin)
+    inventory_movements = get_inventory_movements(request)
+    financial_data = get_monthly_financial_data(request, es_admin)
     
     # Construir contexto combinando todos los datos
     context = {
@@ -0,0 +1,24 @@
+"""
+Managers y QuerySets para filtrar datos por empresa (multi-empresa).
+Todos los modelos con FK 'empresa' exponen .de_empresa(empresa), que usa
+los índices compuestos que comienzan por empresa.
+"""
+from django.db import models
+
+
+class EmpresaQuerySet(models.QuerySet):
+    """QuerySet con filtrado por empresa"""
+
+    def de_empresa(self, empresa):
+        """
+        Filtra los registros de una empresa (instancia o id).
+        Si empresa es None no retorna registros, para no mezclar datos de empresas.
+        """
+        if empresa is None:
+            return self.none()
+        return self.filter(empresa=empresa)
+
+
+class EmpresaManager(models.Manager.from_queryset(EmpresaQuerySet)):
+    """Manager por defecto de los modelos que pertenecen a una empresa"""
+    pass
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0002_alter_empresa_email_alter_empresa_telefono'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='version_contable',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Se incrementa con cada cambio en el libro contable', verbose_name='Versión Contable'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='version_cuentas',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Se incrementa con cada cambio en el plan de cuentas', verbose_name='Versión del Plan de Cuentas'),
+        ),
+    ]
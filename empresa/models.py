@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 
+# Contadores que solo cambian con UPDATE ... = campo + 1 (incrementar_version_*)
+CAMPOS_VERSION = ('version_contable', 'version_cuentas')
+
+
 class Empresa(models.Model):
     """Modelo para gestionar empresas en el sistema contable"""
     nombre = models.CharField(max_length=200, verbose_name="Nombre de la Empresa")
@@ -12,6 +17,10 @@ class Empresa(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     activo = models.BooleanField(default=True, verbose_name="Activo")
     usuario_creador = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='empresas_creadas')
+    version_contable = models.PositiveBigIntegerField(default=0, editable=False, verbose_name="Versión Contable",
+                                                      help_text="Se incrementa con cada cambio en el libro contable")
+    version_cuentas = models.PositiveBigIntegerField(default=0, editable=False, verbose_name="Versión del Plan de Cuentas",
+                                                     help_text="Se incrementa con cada cambio en el plan de cuentas")
     
     class Meta:
         verbose_name = "Empresa"
@@ -20,3 +29,47 @@ class Empresa(models.Model):
     
     def __str__(self):
         return f"{self.nombre} - {self.nit}"
+    
+    def save(self, *args, **kwargs):
+        """
+        Los contadores de versión nunca se escriben desde la instancia: una copia
+        leída antes de un incremento los devolvería a un valor anterior.
+        """
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [campo.name for campo in self._meta.concrete_fields if not campo.primary_key]
+            kwargs['update_fields'] = [campo for campo in update_fields if campo not in CAMPOS_VERSION]
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def incrementar_version_contable(empresa_id):
+        """
+        Incrementa la versión del libro contable de la empresa.
+        Se usa para calcular ETags de los reportes: si la versión no cambia,
+        los reportes tampoco.
+        """
+        if empresa_id:
+            Empresa.objects.filter(pk=empresa_id).update(version_contable=F('version_contable') + 1)
+    
+    @staticmethod
+    def version_contable_actual(empresa_id):
+        """Versión guardada del libro contable (0 si la empresa no existe)"""
+        return Empresa.objects.filter(pk=empresa_id).values_list('version_contable', flat=True).first() or 0
+    
+    @staticmethod
+    def incrementar_version_cuentas(empresa_id):
+        """
+        Incrementa la versión del plan de cuentas de la empresa y retorna la nueva.
+        Los índices de cuentas en memoria de cada proceso la comparan con la suya
+        para saber si deben reconstruirse.
+        """
+        if not empresa_id:
+            return 0
+        Empresa.objects.filter(pk=empresa_id).update(version_cuentas=F('version_cuentas') + 1)
+        return Empresa.version_cuentas_actual(empresa_id)
+    
+    @staticmethod
+    def version_cuentas_actual(empresa_id):
+        """Versión guardada del plan de cuentas (0 si la empresa no existe)"""
+        return Empresa.objects.filter(pk=empresa_id).values_list('version_cuentas', flat=True).first() or 0
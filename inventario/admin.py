@@ -1,26 +1,26 @@
 from django.contrib import admin
-from .models import Categoria, Producto, MovimientoInventario
+from .models import Categoria, Producto, MovimientoInventario, CapaCosto, CorteInventario, TotalInventario, AjustePrecios
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'descripcion', 'fecha_creacion')
+    list_display = ('nombre', 'empresa', 'descripcion', 'fecha_creacion')
     search_fields = ('nombre', 'descripcion')
-    list_filter = ('fecha_creacion',)
+    list_filter = ('empresa', 'fecha_creacion')
     ordering = ('nombre',)
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     list_display = ('codigo', 'nombre', 'categoria', 'cantidad', 'precio_unitario', 'valor_total', 'necesita_restock', 'estado')
-    list_filter = ('categoria', 'estado', 'fecha_creacion')
+    list_filter = ('empresa', 'categoria', 'estado', 'bajo_stock', 'fecha_creacion')
     search_fields = ('codigo', 'nombre', 'descripcion')
     list_editable = ('cantidad', 'precio_unitario', 'estado')
-    readonly_fields = ('fecha_creacion', 'fecha_actualizacion', 'valor_total')
+    readonly_fields = ('fecha_creacion', 'fecha_actualizacion', 'valor_total', 'costo_promedio')
     fieldsets = (
         ('Información Básica', {
-            'fields': ('codigo', 'nombre', 'descripcion', 'categoria')
+            'fields': ('empresa', 'codigo', 'nombre', 'descripcion', 'categoria')
         }),
         ('Inventario', {
-            'fields': ('cantidad', 'stock_minimo', 'precio_unitario')
+            'fields': ('cantidad', 'stock_minimo', 'precio_unitario', 'costo_promedio')
         }),
         ('Estado y Fechas', {
             'fields': ('estado', 'usuario_creador', 'fecha_creacion', 'fecha_actualizacion'),
@@ -33,20 +33,22 @@ class ProductoAdmin(admin.ModelAdmin):
     valor_total.short_description = 'Valor Total'
     
     def necesita_restock(self, obj):
-        return "⚠️ Sí" if obj.necesita_restock else "✅ No"
+        return "⚠️ Sí" if obj.bajo_stock else "✅ No"
     necesita_restock.short_description = 'Necesita Restock'
+    necesita_restock.admin_order_field = 'bajo_stock'
     
     def save_model(self, request, obj, form, change):
         if not change:  # Si es un nuevo objeto
             obj.usuario_creador = request.user
+        obj.usuario_edicion = request.user
         super().save_model(request, obj, form, change)
 
 @admin.register(MovimientoInventario)
 class MovimientoInventarioAdmin(admin.ModelAdmin):
-    list_display = ('producto', 'tipo', 'cantidad', 'motivo', 'fecha', 'usuario')
-    list_filter = ('tipo', 'fecha', 'producto__categoria')
+    list_display = ('producto', 'tipo', 'cantidad', 'costo_total', 'motivo', 'fecha', 'usuario')
+    list_filter = ('empresa', 'tipo', 'fecha', 'producto__categoria')
     search_fields = ('producto__nombre', 'producto__codigo', 'motivo')
-    readonly_fields = ('fecha',)
+    readonly_fields = ('fecha', 'costo_unitario', 'costo_total')
     date_hierarchy = 'fecha'
     
     fieldsets = (
@@ -54,7 +56,7 @@ class MovimientoInventarioAdmin(admin.ModelAdmin):
             'fields': ('producto', 'tipo', 'cantidad', 'motivo')
         }),
         ('Detalles', {
-            'fields': ('observaciones', 'usuario', 'fecha'),
+            'fields': ('observaciones', 'costo_unitario', 'costo_total', 'usuario', 'fecha'),
             'classes': ('collapse',)
         }),
     )
@@ -63,3 +65,32 @@ class MovimientoInventarioAdmin(admin.ModelAdmin):
         if not change:  # Si es un nuevo objeto
             obj.usuario = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(CapaCosto)
+class CapaCostoAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'fecha', 'cantidad_inicial', 'cantidad_restante', 'costo_unitario')
+    list_filter = ('empresa',)
+    search_fields = ('producto__nombre', 'producto__codigo')
+    readonly_fields = ('empresa', 'producto', 'movimiento', 'fecha', 'cantidad_inicial', 'cantidad_restante', 'costo_unitario')
+
+@admin.register(CorteInventario)
+class CorteInventarioAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'fecha', 'cantidad', 'valor', 'fecha_creacion')
+    list_filter = ('empresa', 'fecha')
+    search_fields = ('producto__nombre', 'producto__codigo')
+    date_hierarchy = 'fecha'
+    readonly_fields = ('empresa', 'producto', 'fecha', 'cantidad', 'valor', 'fecha_creacion')
+
+@admin.register(TotalInventario)
+class TotalInventarioAdmin(admin.ModelAdmin):
+    list_display = ('empresa', 'categoria', 'productos', 'cantidad', 'valor', 'fecha_actualizacion')
+    list_filter = ('empresa',)
+    readonly_fields = ('empresa', 'categoria', 'productos', 'cantidad', 'valor', 'fecha_actualizacion')
+
+@admin.register(AjustePrecios)
+class AjustePreciosAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'empresa', 'campo', 'tipo', 'valor', 'redondeo', 'productos', 'total_anterior', 'total_nuevo', 'usuario')
+    list_filter = ('empresa', 'campo', 'tipo', 'fecha')
+    date_hierarchy = 'fecha'
+    readonly_fields = ('empresa', 'campo', 'tipo', 'valor', 'redondeo', 'categoria', 'estado', 'codigos',
+                       'productos', 'total_anterior', 'total_nuevo', 'usuario', 'fecha')
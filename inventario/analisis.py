@@ -0,0 +1,192 @@
+"""
+Análisis ABC y rotación del inventario.
+
+Las cantidades de cada producto se leen con dos consultas (existencias de los
+productos activos y movimientos agrupados por producto) directamente a arreglos
+de NumPy; la clasificación ABC por valor de consumo, la rotación y los días de
+inventario se calculan sobre los arreglos completos, sin recorrer los productos
+en Python. El resultado se guarda en caché hasta el final del día.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .kardex import inicio_del_dia
+from .models import MovimientoInventario, Producto
+
+DIAS_ANALISIS = 365
+# Participación acumulada en el valor de consumo hasta la que llega cada clase
+LIMITE_CLASE_A = 0.80
+LIMITE_CLASE_B = 0.95
+CLASES_ABC = ('A', 'B', 'C')
+
+
+def _segundos_hasta_medianoche():
+    ahora = timezone.localtime()
+    return max(int((inicio_del_dia(ahora.date() + timedelta(days=1)) - ahora).total_seconds()), 1)
+
+
+def clasificar_abc(valores):
+    """
+    Clase ABC (0=A, 1=B, 2=C) de cada valor de consumo. Un producto es A si
+    la participación acumulada de los productos que lo preceden (ordenados por
+    valor descendente) es menor al límite de A, y así con B; sin consumo es C.
+    """
+    clases = np.full(len(valores), 2, dtype=np.int8)
+    total = valores.sum()
+    if not total:
+        return clases
+    orden = np.argsort(-valores, kind='stable')
+    previa = (np.cumsum(valores[orden]) - valores[orden]) / total
+    clases[orden] = np.select([previa < LIMITE_CLASE_A, previa < LIMITE_CLASE_B], [0, 1], default=2)
+    clases[valores <= 0] = 2
+    return clases
+
+
+class AnalisisInventario:
+    """
+    Clasificación ABC y rotación de los productos activos de una empresa en
+    los 'dias' anteriores a 'fecha_fin' (inclusive).
+    Uso: AnalisisInventario(empresa, fecha_fin, dias).generar_con_cache()
+    """
+
+    def __init__(self, empresa, fecha_fin=None, dias=DIAS_ANALISIS):
+        self.empresa = empresa
+        self.fecha_fin = fecha_fin or timezone.localdate()
+        self.dias = dias
+        self.fecha_inicio = self.fecha_fin - timedelta(days=dias - 1)
+
+    def clave_cache(self):
+        return (f'analisis_inventario:{self.empresa.id}:{timezone.localdate():%Y%m%d}:'
+                f'{self.fecha_fin:%Y%m%d}:{self.dias}')
+
+    def _existencias(self):
+        """Arreglos (ids ordenados, cantidad actual) de los productos activos"""
+        filas = Producto.objects.de_empresa(self.empresa).filter(estado='activo').order_by('id').values_list(
+            'id', 'cantidad'
+        )
+        datos = np.array(list(filas), dtype=np.int64).reshape(-1, 2)
+        return datos[:, 0], datos[:, 1]
+
+    def _movimientos(self):
+        """
+        Una fila por producto con movimientos desde el inicio del período:
+        (id, unidades vendidas, costo de lo vendido, variación desde el inicio,
+        variación posterior al fin del período).
+        """
+        inicio = inicio_del_dia(self.fecha_inicio)
+        despues = inicio_del_dia(self.fecha_fin + timedelta(days=1))
+        salidas = Q(tipo='salida', fecha__lt=despues)
+        filas = MovimientoInventario.objects.de_empresa(self.empresa).filter(fecha__gte=inicio).values(
+            'producto_id'
+        ).annotate(
+            unidades=Sum('cantidad', filter=salidas),
+            costo=Sum('costo_total', filter=salidas),
+            variacion_total=Sum('variacion'),
+            variacion_posterior=Sum('variacion', filter=Q(fecha__gte=despues)),
+        ).order_by().values_list('producto_id', 'unidades', 'costo', 'variacion_total', 'variacion_posterior')
+        datos = np.array(
+            [(producto_id, unidades or 0, float(costo or 0), variacion or 0, posterior or 0)
+             for producto_id, unidades, costo, variacion, posterior in filas],
+            dtype=np.float64,
+        ).reshape(-1, 5)
+        return datos[:, 0].astype(np.int64), datos[:, 1], datos[:, 2], datos[:, 3], datos[:, 4]
+
+    def generar(self):
+        """
+        Retorna un diccionario con arreglos alineados por producto (ids, clase,
+        unidades y valor consumidos, existencia final, rotación, días de
+        inventario), ordenados por valor de consumo descendente, y el resumen
+        por clase.
+        """
+        ids, cantidad = self._existencias()
+        consumo_unidades = np.zeros(len(ids))
+        consumo_valor = np.zeros(len(ids))
+        variacion = np.zeros(len(ids))
+        posterior = np.zeros(len(ids))
+
+        mov_ids, unidades, costo, mov_variacion, mov_posterior = self._movimientos()
+        # Los movimientos de productos inactivos no entran al análisis
+        validos = np.isin(mov_ids, ids)
+        posiciones = np.searchsorted(ids, mov_ids[validos])
+        consumo_unidades[posiciones] = unidades[validos]
+        consumo_valor[posiciones] = costo[validos]
+        variacion[posiciones] = mov_variacion[validos]
+        posterior[posiciones] = mov_posterior[validos]
+
+        # Existencia al final e inicio del período, despejadas de la actual
+        existencia_final = cantidad - posterior
+        existencia_inicial = cantidad - variacion
+        existencia_promedio = (existencia_inicial + existencia_final) / 2
+        rotacion = np.divide(consumo_unidades, existencia_promedio,
+                             out=np.zeros(len(ids)), where=existencia_promedio > 0)
+        consumo_diario = consumo_unidades / self.dias
+        dias_inventario = np.divide(existencia_final, consumo_diario,
+                                    out=np.full(len(ids), np.nan), where=consumo_diario > 0)
+        clases = clasificar_abc(consumo_valor)
+
+        orden = np.lexsort((ids, -consumo_valor))
+        total_valor = float(consumo_valor.sum())
+        resumen = []
+        for indice, clase in enumerate(CLASES_ABC):
+            de_la_clase = clases == indice
+            valor = float(consumo_valor[de_la_clase].sum())
+            resumen.append({
+                'clase': clase,
+                'productos': int(de_la_clase.sum()),
+                'valor': valor,
+                'participacion': valor / total_valor * 100 if total_valor else 0.0,
+            })
+
+        return {
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'dias': self.dias,
+            'generado': timezone.now(),
+            'ids': ids[orden],
+            'clases': clases[orden],
+            'consumo_unidades': consumo_unidades[orden],
+            'consumo_valor': consumo_valor[orden],
+            'existencia': existencia_final[orden],
+            'rotacion': rotacion[orden],
+            'dias_inventario': dias_inventario[orden],
+            'resumen': resumen,
+            'total_valor': total_valor,
+        }
+
+    def generar_con_cache(self, refrescar=False):
+        """Genera el análisis una vez por día y parámetros; 'refrescar' fuerza el recálculo"""
+        clave = self.clave_cache()
+        datos = None if refrescar else cache.get(clave)
+        if datos is None:
+            datos = self.generar()
+            cache.set(clave, datos, _segundos_hasta_medianoche())
+        return datos
+
+
+def filas_analisis(datos, posiciones):
+    """
+    Filas para mostrar de las posiciones indicadas del análisis, con los
+    productos leídos en una sola consulta.
+    """
+    posiciones = np.asarray(posiciones, dtype=np.int64)
+    productos = Producto.objects.select_related('categoria').in_bulk(datos['ids'][posiciones].tolist())
+    filas = []
+    for posicion in posiciones:
+        producto = productos.get(int(datos['ids'][posicion]))
+        if producto is None:
+            continue
+        dias = datos['dias_inventario'][posicion]
+        filas.append({
+            'producto': producto,
+            'clase': CLASES_ABC[datos['clases'][posicion]],
+            'consumo_unidades': int(datos['consumo_unidades'][posicion]),
+            'consumo_valor': float(datos['consumo_valor'][posicion]),
+            'existencia': int(datos['existencia'][posicion]),
+            'rotacion': float(datos['rotacion'][posicion]),
+            'dias_inventario': None if np.isnan(dias) else float(dias),
+        })
+    return filas
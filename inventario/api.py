@@ -0,0 +1,111 @@
+"""
+API REST de inventario.
+"""
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from cuentas.api import obtener_empresa_api, ERROR_SIN_EMPRESA
+from .codigos_pos import MAX_CODIGOS_LOTE, consultar_codigos
+from .models import Producto
+
+LIMITE_ALERTAS_DEFECTO = 100
+LIMITE_ALERTAS_MAXIMO = 1000
+
+
+class AlertasStockView(APIView):
+    """
+    Productos activos que cruzaron el stock mínimo.
+    GET /api/inventario/alertas-stock/?since=<fecha ISO>&limit=<n> retorna los
+    que bajaron del umbral después de 'since', del más antiguo al más reciente;
+    el cliente guarda 'siguiente' y lo envía en la próxima consulta. Usa el
+    índice parcial sobre bajo_stock, así que no recorre todos los productos.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        productos = Producto.objects.de_empresa(empresa).filter(bajo_stock=True, estado='activo')
+        desde = request.GET.get('since')
+        if desde:
+            fecha = parse_datetime(desde)
+            if fecha is None:
+                return Response(
+                    {"detail": "El parámetro 'since' debe ser una fecha ISO 8601"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+            productos = productos.filter(fecha_bajo_stock__gt=fecha)
+
+        try:
+            limite = int(request.GET.get('limit', LIMITE_ALERTAS_DEFECTO))
+        except ValueError:
+            limite = LIMITE_ALERTAS_DEFECTO
+        limite = min(max(limite, 1), LIMITE_ALERTAS_MAXIMO)
+
+        alertas = list(
+            productos.order_by('fecha_bajo_stock', 'id').values(
+                'id', 'codigo', 'nombre', 'cantidad', 'stock_minimo', 'fecha_bajo_stock'
+            )[:limite + 1]
+        )
+        hay_mas = len(alertas) > limite
+        alertas = alertas[:limite]
+
+        return Response({
+            'resultados': alertas,
+            'siguiente': alertas[-1]['fecha_bajo_stock'] if alertas else desde,
+            'hay_mas': hay_mas,
+        })
+
+
+def _producto_pos(codigo, datos):
+    producto_id, nombre, precio_venta, cantidad = datos
+    return {
+        'codigo': codigo,
+        'id': producto_id,
+        'nombre': nombre,
+        'precio_venta': str(precio_venta),
+        'cantidad': cantidad,
+    }
+
+
+class ProductoPorCodigoView(APIView):
+    """
+    Consulta de productos activos por código para el punto de venta.
+    GET /api/inventario/codigos/<codigo>/ retorna un producto (404 si no existe).
+    GET /api/inventario/codigos/?codigos=a,b,c resuelve un lote (máximo
+    MAX_CODIGOS_LOTE) en el orden recibido, con los no encontrados aparte.
+    Lee de la caché en memoria de codigos_pos; los fallos van en una sola consulta IN.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, codigo=None):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        if codigo is not None:
+            datos = consultar_codigos(empresa.id, [codigo])[codigo]
+            if datos is None:
+                return Response({"detail": f"No existe un producto activo con código {codigo}"},
+                                status=status.HTTP_404_NOT_FOUND)
+            return Response(_producto_pos(codigo, datos))
+
+        codigos = list(dict.fromkeys(c.strip() for c in request.GET.get('codigos', '').split(',') if c.strip()))
+        if not codigos:
+            return Response({"detail": "Indique los códigos con ?codigos=a,b,c"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codigos) > MAX_CODIGOS_LOTE:
+            return Response({"detail": f"Máximo {MAX_CODIGOS_LOTE} códigos por consulta"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        encontrados = consultar_codigos(empresa.id, codigos)
+        return Response({
+            'resultados': [_producto_pos(c, encontrados[c]) for c in codigos if encontrados[c] is not None],
+            'no_encontrados': [c for c in codigos if encontrados[c] is None],
+        })
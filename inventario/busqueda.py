@@ -0,0 +1,114 @@
+"""
+Búsqueda de texto completo de productos.
+
+Según el motor de base de datos:
+- SQLite: tabla virtual FTS5 (inventario_producto_fts) con el código, nombre y
+  descripción de cada producto; se sincroniza al guardar o eliminar productos.
+- PostgreSQL: índices GIN de trigramas (pg_trgm) sobre UPPER(codigo) y
+  UPPER(nombre), que aceleran directamente las búsquedas con icontains.
+- Otros motores: búsqueda con icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLA_FTS = 'inventario_producto_fts'
+PATRON_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+
+def usa_fts5(conexion=None):
+    return (conexion or connection).vendor == 'sqlite'
+
+
+def usa_trigramas(conexion=None):
+    return (conexion or connection).vendor == 'postgresql'
+
+
+# ============================================
+# SINCRONIZACIÓN DEL ÍNDICE (SQLite FTS5)
+# ============================================
+
+def crear_indice_fts(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+        "codigo, nombre, descripcion, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def indexar_producto(producto):
+    """Agrega o reemplaza el producto en el índice de texto completo"""
+    if not usa_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [producto.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLA_FTS} (rowid, codigo, nombre, descripcion) VALUES (%s, %s, %s, %s)',
+            [producto.pk, producto.codigo, producto.nombre, producto.descripcion or '']
+        )
+
+
+def desindexar_producto(producto_id):
+    """Elimina el producto del índice de texto completo"""
+    if not usa_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [producto_id])
+
+
+def reconstruir_indice(conexion=None):
+    """
+    Reconstruye el índice completo desde la tabla de productos.
+    Necesario después de operaciones masivas que no disparan señales.
+    Retorna la cantidad de productos indexados.
+    """
+    conexion = conexion or connection
+    if not usa_fts5(conexion):
+        return 0
+    with conexion.cursor() as cursor:
+        crear_indice_fts(cursor)
+        cursor.execute(f'DELETE FROM {TABLA_FTS}')
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, codigo, nombre, descripcion) "
+            "SELECT id, codigo, nombre, COALESCE(descripcion, '') FROM inventario_producto"
+        )
+        return cursor.rowcount
+
+
+# ============================================
+# CONSULTAS
+# ============================================
+
+def _consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    se busca como prefijo y todas deben estar presentes.
+    """
+    terminos = PATRON_TERMINO.findall(texto)
+    return ' AND '.join(f'"{termino}"*' for termino in terminos)
+
+
+def buscar_productos(queryset, texto):
+    """
+    Filtra un queryset de productos por código, nombre o descripción usando el
+    índice de texto completo del motor de base de datos.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+
+    if usa_fts5():
+        consulta = _consulta_fts(texto)
+        if not consulta:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', [consulta])
+        )
+
+    # PostgreSQL usa los índices de trigramas para icontains; los demás motores recorren la tabla
+    filtro = Q()
+    for termino in texto.split():
+        filtro &= Q(codigo__icontains=termino) | Q(nombre__icontains=termino) | Q(descripcion__icontains=termino)
+    return queryset.filter(filtro)
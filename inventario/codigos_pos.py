@@ -0,0 +1,136 @@
+"""
+Consulta de productos por código para el punto de venta (lectores de código de barras).
+
+Cada proceso mantiene una caché LRU en memoria de
+(empresa_id, codigo) -> (id, nombre, precio_venta, cantidad) de los productos
+activos; los códigos inexistentes también se recuerdan (None) para no
+consultarlos en cada lectura. Los fallos de un lote se resuelven con una sola
+consulta IN.
+
+Las entradas se invalidan al guardar o eliminar el producto (señales) y al
+ajustar precios de forma masiva. Esa invalidación es local al proceso: los
+demás procesos ven el cambio cuando la entrada vence (DURACION_CACHE_CODIGOS).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+TAMANO_CACHE_CODIGOS = 20000
+DURACION_CACHE_CODIGOS = 30  # segundos; acota lo desactualizado en otros procesos
+MAX_CODIGOS_LOTE = 200
+
+
+class CacheCodigos:
+    """
+    LRU en memoria {(empresa_id, codigo): (vence, datos)}, con un índice
+    inverso {producto_id: clave} para invalidar aunque el código haya cambiado.
+    """
+
+    def __init__(self, tamano=TAMANO_CACHE_CODIGOS, duracion=DURACION_CACHE_CODIGOS):
+        self.tamano = tamano
+        self.duracion = duracion
+        self.entradas = OrderedDict()
+        self.claves_producto = {}
+        self.bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, empresa_id, codigos):
+        """Retorna ({codigo: datos} de las entradas vigentes, [codigos faltantes])"""
+        ahora = time.monotonic()
+        encontrados, faltantes = {}, []
+        with self.bloqueo:
+            for codigo in codigos:
+                clave = (empresa_id, codigo)
+                entrada = self.entradas.get(clave)
+                if entrada is None or entrada[0] < ahora:
+                    faltantes.append(codigo)
+                    continue
+                self.entradas.move_to_end(clave)
+                encontrados[codigo] = entrada[1]
+            self.aciertos += len(encontrados)
+            self.fallos += len(faltantes)
+        return encontrados, faltantes
+
+    def guardar(self, empresa_id, resultados):
+        """Guarda {codigo: datos o None} y descarta las entradas menos usadas"""
+        vence = time.monotonic() + self.duracion
+        with self.bloqueo:
+            for codigo, datos in resultados.items():
+                clave = (empresa_id, codigo)
+                self.entradas[clave] = (vence, datos)
+                self.entradas.move_to_end(clave)
+                if datos is not None:
+                    self.claves_producto[datos[0]] = clave
+            while len(self.entradas) > self.tamano:
+                _, (_, datos) = self.entradas.popitem(last=False)
+                if datos is not None:
+                    self.claves_producto.pop(datos[0], None)
+
+    def invalidar(self, empresa_id, producto_id, codigo):
+        """Quita la entrada del producto (con su código anterior) y la de su código actual"""
+        with self.bloqueo:
+            clave = self.claves_producto.pop(producto_id, None)
+            if clave is not None:
+                self.entradas.pop(clave, None)
+            self.entradas.pop((empresa_id, codigo), None)
+
+    def limpiar(self, empresa_id=None):
+        """Vacía la caché completa o solo la de una empresa"""
+        with self.bloqueo:
+            if empresa_id is None:
+                self.entradas.clear()
+                self.claves_producto.clear()
+                return
+            for clave in [clave for clave in self.entradas if clave[0] == empresa_id]:
+                _, datos = self.entradas.pop(clave)
+                if datos is not None:
+                    self.claves_producto.pop(datos[0], None)
+
+
+_cache = CacheCodigos()
+
+
+def _consultar_base(empresa_id, codigos):
+    """{codigo: (id, nombre, precio_venta, cantidad) o None} con una sola consulta IN"""
+    from .models import Producto
+
+    resultados = dict.fromkeys(codigos)
+    filas = Producto.objects.filter(empresa_id=empresa_id, estado='activo', codigo__in=codigos).values_list(
+        'codigo', 'id', 'nombre', 'precio_venta', 'cantidad'
+    )
+    for codigo, producto_id, nombre, precio_venta, cantidad in filas:
+        resultados[codigo] = (producto_id, nombre, precio_venta, cantidad)
+    return resultados
+
+
+def consultar_codigos(empresa_id, codigos):
+    """
+    Resuelve una lista de códigos de productos activos de la empresa.
+    Retorna {codigo: (id, nombre, precio_venta, cantidad) o None si no existe}.
+    """
+    codigos = list(dict.fromkeys(codigos))
+    encontrados, faltantes = _cache.obtener(empresa_id, codigos)
+    if faltantes:
+        consultados = _consultar_base(empresa_id, faltantes)
+        _cache.guardar(empresa_id, consultados)
+        encontrados.update(consultados)
+    return encontrados
+
+
+def consultar_codigo(empresa_id, codigo):
+    """(id, nombre, precio_venta, cantidad) del producto activo con ese código, o None"""
+    return consultar_codigos(empresa_id, [codigo])[codigo]
+
+
+def invalidar_producto(empresa_id, producto_id, codigo):
+    _cache.invalidar(empresa_id, producto_id, codigo)
+
+
+def invalidar_empresa(empresa_id):
+    """Para cambios masivos que no pasan por Producto.save (update())"""
+    _cache.limpiar(empresa_id)
+
+
+def estadisticas_cache():
+    return {'entradas': len(_cache.entradas), 'aciertos': _cache.aciertos, 'fallos': _cache.fallos}
@@ -0,0 +1,164 @@
+"""
+Cortes mensuales de inventario e inventario a una fecha.
+
+Un corte guarda la existencia y el valor de cada producto al último día de un
+mes. Para consultar el inventario a cualquier fecha se parte del corte más
+cercano anterior y se suman, con una consulta agrupada por producto, solo los
+movimientos posteriores al corte; no se recorre todo el historial.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+
+from .costeo import costos_apertura
+from .kardex import VALOR_CON_SIGNO, inicio_del_dia
+from .models import CorteInventario, MovimientoInventario, Producto
+
+CERO = Decimal('0.00')
+
+
+def fin_de_mes(fecha):
+    return date(fecha.year, fecha.month, calendar.monthrange(fecha.year, fecha.month)[1])
+
+
+def meses_hasta(desde, hasta):
+    """Últimos días de cada mes entre dos fechas (inclusive)"""
+    fecha = fin_de_mes(desde)
+    while fecha <= hasta:
+        yield fecha
+        fecha = fin_de_mes(fecha + timedelta(days=1))
+
+
+def _movimientos_agrupados(movimientos):
+    """{producto_id: (cantidad, valor)} de los movimientos, en una sola consulta"""
+    return {
+        fila['producto_id']: (fila['cantidad'] or 0, fila['valor'] or CERO)
+        for fila in movimientos.values('producto_id').annotate(
+            cantidad=Sum('variacion'), valor=Sum(VALOR_CON_SIGNO)
+        ).order_by()
+    }
+
+
+def _saldos_sin_corte(productos, hasta):
+    """
+    Saldos de productos sin corte previo: el stock que no proviene de
+    movimientos (cargado al crear el producto, valorado al costo de su capa
+    de apertura o, si no la tiene, al precio unitario)
+    más los movimientos anteriores a 'hasta'.
+    """
+    if not productos:
+        return {}
+    antes = Q(fecha__lt=hasta)
+    totales = {
+        fila['producto_id']: fila
+        for fila in MovimientoInventario.objects.filter(producto_id__in=[p['id'] for p in productos])
+        .values('producto_id')
+        .annotate(
+            total=Sum('variacion'),
+            cantidad=Sum('variacion', filter=antes),
+            valor=Sum(VALOR_CON_SIGNO, filter=antes),
+        ).order_by()
+    }
+    costos = costos_apertura([p['id'] for p in productos])
+    saldos = {}
+    for producto in productos:
+        fila = totales.get(producto['id'], {})
+        cantidad = fila.get('cantidad') or 0
+        valor = fila.get('valor') or CERO
+        if producto['fecha_creacion'] < hasta:
+            sin_movimientos = producto['cantidad'] - (fila.get('total') or 0)
+            cantidad += sin_movimientos
+            valor += sin_movimientos * costos.get(producto['id'], producto['precio_unitario'])
+        saldos[producto['id']] = (cantidad, valor)
+    return saldos
+
+
+def saldos_a_la_fecha(empresa, fecha, antes_de_corte=None):
+    """
+    Existencia y valor de cada producto de la empresa al final de 'fecha'.
+    Usa el corte más reciente con fecha <= fecha (o < antes_de_corte al
+    generar un corte nuevo). Retorna ({producto_id: (cantidad, valor)}, fecha_corte).
+    """
+    cortes = CorteInventario.objects.de_empresa(empresa)
+    cortes = cortes.filter(fecha__lt=antes_de_corte) if antes_de_corte else cortes.filter(fecha__lte=fecha)
+    fecha_corte = cortes.aggregate(ultimo=Max('fecha'))['ultimo']
+    hasta = inicio_del_dia(fecha + timedelta(days=1))
+
+    saldos = {}
+    if fecha_corte:
+        saldos = {
+            producto_id: (cantidad, valor)
+            for producto_id, cantidad, valor in cortes.filter(fecha=fecha_corte).values_list(
+                'producto_id', 'cantidad', 'valor'
+            )
+        }
+        posteriores = MovimientoInventario.objects.de_empresa(empresa).filter(
+            fecha__gte=inicio_del_dia(fecha_corte + timedelta(days=1)), fecha__lt=hasta
+        )
+        for producto_id, (cantidad, valor) in _movimientos_agrupados(posteriores).items():
+            if producto_id in saldos:
+                saldo_cantidad, saldo_valor = saldos[producto_id]
+                saldos[producto_id] = (saldo_cantidad + cantidad, saldo_valor + valor)
+
+    # Productos creados después del corte (o todos, si no hay cortes)
+    faltantes = [
+        producto for producto in Producto.objects.de_empresa(empresa).filter(fecha_creacion__lt=hasta).values(
+            'id', 'cantidad', 'precio_unitario', 'fecha_creacion'
+        )
+        if producto['id'] not in saldos
+    ]
+    saldos.update(_saldos_sin_corte(faltantes, hasta))
+    return saldos, fecha_corte
+
+
+@transaction.atomic
+def generar_corte(empresa, fecha):
+    """
+    Genera (o reemplaza) el corte de la empresa al final del mes de 'fecha',
+    a partir del corte del mes anterior. Retorna el número de productos.
+    """
+    fecha = fin_de_mes(fecha)
+    saldos, _ = saldos_a_la_fecha(empresa, fecha, antes_de_corte=fecha)
+    CorteInventario.objects.de_empresa(empresa).filter(fecha=fecha).delete()
+    CorteInventario.objects.bulk_create([
+        CorteInventario(empresa=empresa, producto_id=producto_id, fecha=fecha, cantidad=cantidad,
+                        valor=valor.quantize(Decimal('0.01')))
+        for producto_id, (cantidad, valor) in saldos.items()
+    ], batch_size=1000)
+    return len(saldos)
+
+
+def inventario_a_la_fecha(empresa, fecha):
+    """
+    Reporte de inventario a una fecha: existencia, valor y costo promedio por
+    producto, con totales. Solo incluye productos con existencia o valor.
+    """
+    saldos, fecha_corte = saldos_a_la_fecha(empresa, fecha)
+    productos = Producto.objects.de_empresa(empresa).filter(id__in=saldos.keys()).select_related('categoria')
+
+    filas = []
+    total_cantidad, total_valor = 0, CERO
+    for producto in productos.order_by('codigo'):
+        cantidad, valor = saldos[producto.id]
+        if not cantidad and not valor:
+            continue
+        valor = valor.quantize(Decimal('0.01'))
+        filas.append({
+            'producto': producto,
+            'cantidad': cantidad,
+            'valor': valor,
+            'costo_promedio': (valor / cantidad).quantize(Decimal('0.01')) if cantidad else CERO,
+        })
+        total_cantidad += cantidad
+        total_valor += valor
+
+    return {
+        'empresa': empresa,
+        'fecha': fecha,
+        'fecha_corte': fecha_corte,
+        'productos': filas,
+        'totales': {'cantidad': total_cantidad, 'valor': total_valor},
+    }
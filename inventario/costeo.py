@@ -0,0 +1,344 @@
+"""
+Costeo de inventario: capas FIFO y costo promedio ponderado.
+
+Cada entrada crea una capa de costo (CapaCosto) con su cantidad y costo
+unitario; cada salida consume las capas más antiguas, por lo que su costo se
+calcula en O(capas consumidas) sin recorrer el historial de movimientos. El
+costo promedio ponderado del producto se actualiza en cada entrada.
+
+Todo ocurre dentro de la misma transacción que actualiza el stock, con la fila
+del producto bloqueada (select_for_update) para que dos salidas simultáneas no
+consuman la misma capa.
+"""
+from collections import deque
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+CENTAVOS = Decimal('0.01')
+PRECISION_COSTO = Decimal('0.0001')
+CERO = Decimal('0.00')
+
+
+def _redondear(valor, precision=CENTAVOS):
+    return valor.quantize(precision, rounding=ROUND_HALF_UP)
+
+
+def nuevo_costo_promedio(cantidad, costo_promedio, cantidad_entrada, costo_entrada):
+    """Costo promedio ponderado después de una entrada"""
+    cantidad_total = cantidad + cantidad_entrada
+    if cantidad_total <= 0:
+        return _redondear(costo_entrada, PRECISION_COSTO)
+    valor = Decimal(max(cantidad, 0)) * costo_promedio + Decimal(cantidad_entrada) * costo_entrada
+    return _redondear(valor / Decimal(cantidad_total), PRECISION_COSTO)
+
+
+# ============================================
+# MOTOR EN MEMORIA (reconstrucción y benchmark)
+# ============================================
+
+class CapasProducto:
+    """
+    Capas FIFO y costo promedio de un producto en memoria.
+    Lo usan la reconstrucción del costeo y el benchmark; registrar_movimiento
+    aplica la misma lógica sobre la base de datos.
+    """
+
+    def __init__(self, costo_referencia=CERO, conservar_agotadas=False):
+        self.capas = deque()  # [cantidad_restante, costo_unitario, capa]
+        # La reconstrucción guarda también las capas agotadas, como registrar_movimiento
+        self.agotadas = [] if conservar_agotadas else None
+        self.cantidad = 0
+        self.costo_promedio = Decimal(costo_referencia)
+        self.costo_referencia = Decimal(costo_referencia)
+
+    def entrada(self, cantidad, costo_unitario, capa=None):
+        self.costo_promedio = nuevo_costo_promedio(self.cantidad, self.costo_promedio, cantidad, costo_unitario)
+        self.capas.append([cantidad, costo_unitario, capa])
+        self.cantidad += cantidad
+
+    def salida(self, cantidad):
+        """
+        Consume capas desde la más antigua y retorna el costo total FIFO.
+        Si las capas no alcanzan (stock previo al costeo) el faltante se valora
+        al costo promedio.
+        """
+        pendiente = cantidad
+        costo = CERO
+        while pendiente and self.capas:
+            capa = self.capas[0]
+            consumo = min(pendiente, capa[0])
+            costo += Decimal(consumo) * capa[1]
+            capa[0] -= consumo
+            pendiente -= consumo
+            if not capa[0]:
+                self.capas.popleft()
+                if self.agotadas is not None:
+                    self.agotadas.append(capa)
+        if pendiente:
+            costo += Decimal(pendiente) * (self.costo_promedio or self.costo_referencia)
+        self.cantidad -= cantidad
+        return _redondear(costo)
+
+
+# ============================================
+# REGISTRO DE MOVIMIENTOS
+# ============================================
+
+def _consumir_capas(producto, cantidad):
+    """
+    Consume capas FIFO del producto y retorna el costo total de la salida.
+    Todo el stock tiene capa (el inicial y el anterior al costeo en capas de
+    apertura), así que solo lee las capas con saldo (índice parcial) y se
+    detiene al cubrir la cantidad; las capas modificadas se guardan con un
+    único bulk_update. Si faltaran capas, el resto se valora al costo promedio.
+    """
+    from .models import CapaCosto
+
+    vigentes = CapaCosto.objects.filter(producto=producto, cantidad_restante__gt=0)
+    costo = CERO
+    pendiente = cantidad
+    modificadas = []
+    for capa in vigentes.order_by('id').iterator(chunk_size=50):
+        if not pendiente:
+            break
+        consumo = min(pendiente, capa.cantidad_restante)
+        costo += Decimal(consumo) * capa.costo_unitario
+        capa.cantidad_restante -= consumo
+        pendiente -= consumo
+        modificadas.append(capa)
+    if modificadas:
+        CapaCosto.objects.bulk_update(modificadas, ['cantidad_restante'])
+    if pendiente:
+        costo += Decimal(pendiente) * (producto.costo_promedio or producto.precio_unitario)
+    return _redondear(costo)
+
+
+def _crear_capa(movimiento, producto, cantidad, costo_unitario):
+    from .models import CapaCosto
+
+    return CapaCosto.objects.create(
+        empresa_id=producto.empresa_id,
+        producto=producto,
+        movimiento=movimiento,
+        fecha=movimiento.fecha,
+        cantidad_inicial=cantidad,
+        cantidad_restante=cantidad,
+        costo_unitario=costo_unitario,
+    )
+
+
+def crear_capa_apertura(producto):
+    """
+    Capa sin movimiento con el stock con que se crea el producto, al costo
+    promedio (al crear, el precio unitario). Así la capa de apertura conserva
+    el costo con que entró el stock inicial aunque el precio cambie después.
+    Los cambios posteriores de stock siempre pasan por registrar_movimiento.
+    """
+    from .models import CapaCosto
+
+    CapaCosto.objects.create(
+        empresa_id=producto.empresa_id,
+        producto=producto,
+        fecha=producto.fecha_creacion or timezone.now(),
+        cantidad_inicial=producto.cantidad,
+        cantidad_restante=producto.cantidad,
+        costo_unitario=_redondear(producto.costo_promedio or producto.precio_unitario, PRECISION_COSTO),
+    )
+
+
+def costos_apertura(producto_ids):
+    """
+    {producto_id: costo unitario} del stock que entró sin movimiento (al crear
+    el producto o, en datos anteriores, al editarlo), promediando sus capas de
+    apertura con una sola consulta agrupada. Es un costo guardado: no cambia con los ajustes de
+    precio. Los productos sin capas de apertura (costeados antes de que
+    existieran y sin reconstruir) no aparecen.
+    """
+    from .models import CapaCosto
+
+    filas = CapaCosto.objects.filter(producto_id__in=producto_ids, movimiento__isnull=True).values(
+        'producto_id'
+    ).annotate(
+        cantidad=Sum('cantidad_inicial'),
+        valor=Sum(F('cantidad_inicial') * F('costo_unitario')),
+    ).order_by()
+    return {
+        fila['producto_id']: _redondear(fila['valor'] / fila['cantidad'], PRECISION_COSTO)
+        for fila in filas
+        if fila['cantidad']
+    }
+
+
+@transaction.atomic
+def registrar_movimiento(movimiento):
+    """
+    Aplica un movimiento de inventario (aún sin guardar) al stock y al costeo:
+    - Entrada: suma stock, crea una capa al costo de la entrada (o al precio
+      unitario del producto) y actualiza el costo promedio ponderado.
+    - Salida: valida el stock, resta y valora la salida con las capas FIFO.
+    - Ajuste: fija la cantidad; la diferencia entra al costo promedio o sale por FIFO.
+    Guarda el producto y el movimiento (que genera el comprobante con el costo
+    calculado). Lanza ValidationError si no hay stock suficiente.
+    """
+    from .models import Producto
+
+    producto = Producto.objects.select_for_update().get(pk=movimiento.producto_id)
+    movimiento.producto = producto
+    cantidad = movimiento.cantidad
+
+    if movimiento.tipo == 'ajuste':
+        diferencia = cantidad - producto.cantidad
+    elif movimiento.tipo == 'salida':
+        diferencia = -cantidad
+    else:
+        diferencia = cantidad
+
+    if producto.cantidad + diferencia < 0:
+        raise ValidationError(
+            f'Stock insuficiente para {producto.nombre}. Disponible: {producto.cantidad}'
+        )
+
+    capa_pendiente = None
+    if diferencia > 0:
+        costo_unitario = movimiento.costo_unitario or (
+            producto.costo_promedio if movimiento.tipo == 'ajuste' else producto.precio_unitario
+        ) or producto.precio_unitario
+        movimiento.costo_unitario = _redondear(costo_unitario, PRECISION_COSTO)
+        movimiento.costo_total = _redondear(Decimal(diferencia) * movimiento.costo_unitario)
+        producto.costo_promedio = nuevo_costo_promedio(
+            producto.cantidad, producto.costo_promedio, diferencia, movimiento.costo_unitario
+        )
+        capa_pendiente = diferencia
+    elif diferencia < 0:
+        movimiento.costo_total = _consumir_capas(producto, -diferencia)
+        movimiento.costo_unitario = _redondear(movimiento.costo_total / Decimal(-diferencia), PRECISION_COSTO)
+    else:
+        movimiento.costo_unitario = movimiento.costo_total = CERO
+
+    movimiento.variacion = diferencia
+    producto.cantidad += diferencia
+    producto.save(registrar_ajuste=False)
+    movimiento.save()
+    if capa_pendiente:
+        _crear_capa(movimiento, producto, capa_pendiente, movimiento.costo_unitario)
+    return movimiento
+
+
+# ============================================
+# RECONSTRUCCIÓN
+# ============================================
+
+def _cantidad_inicial(movimientos, cantidad_actual):
+    """
+    Stock anterior al primer movimiento. Sin ajustes se despeja del stock
+    actual; con ajustes (que fijan la cantidad) es lo mínimo necesario para que
+    ninguna salida anterior al primer ajuste deje el stock negativo.
+    """
+    if not any(tipo == 'ajuste' for _, tipo, _ in movimientos):
+        neto = sum(cantidad if tipo == 'entrada' else -cantidad for _, tipo, cantidad in movimientos)
+        return max(cantidad_actual - neto, 0)
+    saldo = minimo = 0
+    for _, tipo, cantidad in movimientos:
+        if tipo == 'ajuste':
+            break
+        saldo += cantidad if tipo == 'entrada' else -cantidad
+        minimo = min(minimo, saldo)
+    return -minimo
+
+
+@transaction.atomic
+def reconstruir_costeo(producto):
+    """
+    Recalcula desde cero las capas FIFO, el costo promedio y el costo y la
+    variación de stock de cada movimiento de un producto, recorriendo su historial una sola vez. Las
+    capas sin movimiento (stock que entró al crear el producto) se
+    repiten en su fecha con su costo; el stock anterior sin capa se
+    valora al precio unitario. Las capas agotadas se conservan, para que una
+    nueva reconstrucción parta de las mismas aperturas. No modifica los
+    comprobantes contables ya generados.
+    Retorna (movimientos recalculados, capas vigentes).
+    """
+    from .models import CapaCosto, MovimientoInventario
+
+    movimientos = list(
+        MovimientoInventario.objects.filter(producto=producto).order_by('fecha', 'id').only(
+            'id', 'tipo', 'cantidad', 'costo_unitario', 'costo_total', 'variacion', 'fecha'
+        )
+    )
+    # Capas sin movimiento: stock que entró al crear el producto
+    aperturas = list(
+        CapaCosto.objects.filter(producto=producto, movimiento__isnull=True).order_by('fecha', 'id').values_list(
+            'fecha', 'cantidad_inicial', 'costo_unitario'
+        )
+    )
+    CapaCosto.objects.filter(producto=producto).delete()
+    eventos = sorted(
+        [(fecha, None, (cantidad, costo_unitario)) for fecha, cantidad, costo_unitario in aperturas]
+        + [(movimiento.fecha, movimiento, None) for movimiento in movimientos],
+        key=lambda evento: (evento[0], evento[1] is not None),
+    )
+
+    costo_inicial = aperturas[0][2] if aperturas else producto.precio_unitario
+    motor = CapasProducto(costo_inicial, conservar_agotadas=True)
+    inicial = _cantidad_inicial(
+        [(m.id, m.tipo, m.cantidad) if m else (None, 'entrada', apertura[0]) for _, m, apertura in eventos],
+        producto.cantidad,
+    )
+    if inicial:
+        motor.entrada(inicial, costo_inicial, (None, producto.fecha_creacion, inicial))
+
+    for fecha, movimiento, apertura in eventos:
+        if movimiento is None:
+            cantidad, costo_unitario = apertura
+            motor.entrada(cantidad, costo_unitario, (None, fecha, cantidad))
+            continue
+        if movimiento.tipo == 'ajuste':
+            diferencia = movimiento.cantidad - motor.cantidad
+        elif movimiento.tipo == 'salida':
+            diferencia = -movimiento.cantidad
+        else:
+            diferencia = movimiento.cantidad
+
+        if diferencia > 0:
+            costo_unitario = movimiento.costo_unitario if movimiento.tipo == 'entrada' else CERO
+            costo_unitario = costo_unitario or motor.costo_promedio or producto.precio_unitario
+            motor.entrada(diferencia, costo_unitario, (movimiento.id, movimiento.fecha, diferencia))
+            movimiento.costo_unitario = costo_unitario
+            movimiento.costo_total = _redondear(Decimal(diferencia) * costo_unitario)
+        elif diferencia < 0:
+            movimiento.costo_total = motor.salida(-diferencia)
+            movimiento.costo_unitario = _redondear(movimiento.costo_total / Decimal(-diferencia), PRECISION_COSTO)
+        else:
+            movimiento.costo_unitario = movimiento.costo_total = CERO
+        movimiento.variacion = diferencia
+
+    # Stock editado sin movimiento (datos anteriores a los ajustes de edición): se ajustan las capas al stock actual
+    if producto.cantidad > motor.cantidad:
+        diferencia = producto.cantidad - motor.cantidad
+        motor.entrada(diferencia, motor.costo_promedio or producto.precio_unitario, (None, producto.fecha_actualizacion, diferencia))
+    elif producto.cantidad < motor.cantidad:
+        motor.salida(motor.cantidad - producto.cantidad)
+
+    MovimientoInventario.objects.bulk_update(
+        movimientos, ['costo_unitario', 'costo_total', 'variacion'], batch_size=1000
+    )
+    capas = [
+        CapaCosto(
+            empresa_id=producto.empresa_id,
+            producto=producto,
+            movimiento_id=movimiento_id,
+            fecha=fecha,
+            cantidad_inicial=inicial,
+            cantidad_restante=restante,
+            costo_unitario=costo_unitario,
+        )
+        for restante, costo_unitario, (movimiento_id, fecha, inicial) in [*motor.agotadas, *motor.capas]
+    ]
+    CapaCosto.objects.bulk_create(capas, batch_size=1000)
+    producto.costo_promedio = motor.costo_promedio
+    producto.save(update_fields=['costo_promedio'])
+    return len(movimientos), len(motor.capas)
@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from django import forms
-from .models import Producto, Categoria, MovimientoInventario
+from .models import Producto, Categoria, MovimientoInventario, AjustePrecios
+from .precios import separar_codigos
 
 class ImportarProductosForm(forms.Form):
     archivo = forms.FileField(
@@ -72,6 +75,21 @@ class ProductoForm(forms.ModelForm):
             'estado': 'Estado',
         }
 
+    def __init__(self, *args, empresa=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if empresa is not None:
+            self.instance.empresa = empresa
+        # Solo las categorías de la empresa del producto
+        self.fields['categoria'].queryset = Categoria.objects.de_empresa(self.instance.empresa_id)
+
+    def clean_codigo(self):
+        codigo = self.cleaned_data.get('codigo')
+        if codigo:
+            duplicados = Producto.objects.de_empresa(self.instance.empresa_id).filter(codigo=codigo)
+            if duplicados.exclude(pk=self.instance.pk).exists():
+                raise forms.ValidationError('Ya existe un producto con este código en la empresa.')
+        return codigo
+
 class CategoriaForm(forms.ModelForm):
     class Meta:
         model = Categoria
@@ -92,10 +110,22 @@ class CategoriaForm(forms.ModelForm):
             'descripcion': 'Descripción',
         }
 
+    def __init__(self, *args, empresa=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if empresa is not None:
+            self.instance.empresa = empresa
+
+    def clean_nombre(self):
+        nombre = self.cleaned_data.get('nombre')
+        duplicados = Categoria.objects.de_empresa(self.instance.empresa_id).filter(nombre__iexact=nombre)
+        if nombre and duplicados.exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError('Ya existe una categoría con este nombre en la empresa.')
+        return nombre
+
 class MovimientoInventarioForm(forms.ModelForm):
     class Meta:
         model = MovimientoInventario
-        fields = ['tipo', 'cantidad', 'motivo', 'observaciones']
+        fields = ['tipo', 'cantidad', 'costo_unitario', 'motivo', 'observaciones']
         widgets = {
             'tipo': forms.Select(attrs={
                 'class': 'form-control'
@@ -104,6 +134,12 @@ class MovimientoInventarioForm(forms.ModelForm):
                 'class': 'form-control',
                 'min': '1'
             }),
+            'costo_unitario': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '0.01',
+                'placeholder': 'Solo entradas: vacío usa el precio unitario'
+            }),
             'motivo': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Motivo del movimiento'
@@ -117,10 +153,20 @@ class MovimientoInventarioForm(forms.ModelForm):
         labels = {
             'tipo': 'Tipo de Movimiento',
             'cantidad': 'Cantidad',
+            'costo_unitario': 'Costo Unitario',
             'motivo': 'Motivo',
             'observaciones': 'Observaciones',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Las salidas se valoran por FIFO; solo las entradas informan su costo
+        self.fields['costo_unitario'].required = False
+        self.fields['costo_unitario'].initial = None
+
+    def clean_costo_unitario(self):
+        return self.cleaned_data.get('costo_unitario') or Decimal('0')
+
 class FiltroProductoForm(forms.Form):
     busqueda = forms.CharField(
         required=False,
@@ -144,3 +190,58 @@ class FiltroProductoForm(forms.Form):
             'class': 'form-control'
         })
     )
+
+class AjustePreciosForm(forms.Form):
+    categoria = forms.ModelChoiceField(
+        queryset=Categoria.objects.none(),
+        required=False,
+        empty_label="Todas las categorías",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    estado = forms.ChoiceField(
+        choices=[('', 'Todos los estados')] + Producto.ESTADO_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    codigos = forms.CharField(
+        required=False,
+        label='Códigos',
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 2,
+            'placeholder': 'Opcional: códigos separados por coma o por línea'
+        })
+    )
+    campo = forms.ChoiceField(
+        choices=AjustePrecios.CAMPO_CHOICES,
+        label='Precio a ajustar',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    tipo = forms.ChoiceField(
+        choices=AjustePrecios.TIPO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    valor = forms.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text='Porcentaje (8 = +8%) o valor a sumar; negativo para rebajas',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
+    )
+    redondeo = forms.ChoiceField(
+        choices=AjustePrecios.REDONDEO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    def __init__(self, *args, empresa=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['categoria'].queryset = Categoria.objects.de_empresa(empresa)
+
+    def clean_codigos(self):
+        return separar_codigos(self.cleaned_data.get('codigos') or '')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('tipo') == 'porcentaje' and cleaned_data.get('valor') is not None \
+                and cleaned_data['valor'] <= -100:
+            raise forms.ValidationError('Una rebaja porcentual debe ser mayor a -100%.')
+        return cleaned_data
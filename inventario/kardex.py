@@ -0,0 +1,154 @@
+"""
+Kardex (tarjeta de inventario) de un producto.
+
+El saldo anterior (cantidad y valor) se obtiene con una sola agregación sobre
+la variación y el costo de los movimientos; luego los movimientos se recorren
+en orden (fecha, id) calculando el saldo acumulado fila por fila. La
+paginación es por llave (id del último movimiento mostrado): el saldo de
+arranque de cada página sale de la misma agregación y no se recorren con
+OFFSET ni se acumulan en Python las filas de las páginas anteriores.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+
+from .costeo import costos_apertura
+from .models import MovimientoInventario
+
+TAMANO_PAGINA_KARDEX = 100
+TAMANO_CHUNK_KARDEX = 2000
+CENTAVOS = Decimal('0.01')
+CERO = Decimal('0.00')
+
+# Valor con signo: las entradas suman su costo y las salidas lo restan
+VALOR_CON_SIGNO = Case(
+    When(variacion__lt=0, then=-F('costo_total')),
+    default=F('costo_total'),
+)
+
+CAMPOS_FILA = ('id', 'fecha', 'tipo', 'motivo', 'variacion', 'costo_unitario', 'costo_total')
+
+
+def inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+class Kardex:
+    """
+    Kardex de un producto entre dos fechas (opcionales).
+    Uso: Kardex(producto, fecha_inicio, fecha_fin).pagina(despues=<id>)
+    """
+
+    def __init__(self, producto, fecha_inicio=None, fecha_fin=None):
+        self.producto = producto
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.costo_apertura = None
+
+    def _costo_apertura(self):
+        if self.costo_apertura is None:
+            self.costo_apertura = costos_apertura([self.producto.id]).get(self.producto.id, self.producto.precio_unitario)
+        return self.costo_apertura
+
+    def _movimientos(self):
+        movimientos = MovimientoInventario.objects.filter(producto=self.producto)
+        if self.fecha_inicio:
+            movimientos = movimientos.filter(fecha__gte=inicio_del_dia(self.fecha_inicio))
+        if self.fecha_fin:
+            movimientos = movimientos.filter(fecha__lt=inicio_del_dia(self.fecha_fin + timedelta(days=1)))
+        return movimientos.order_by('fecha', 'id')
+
+    def _saldo(self, hasta):
+        """
+        Cantidad y valor acumulados de los movimientos que cumplen 'hasta' (Q),
+        con una sola agregación. El stock que no proviene de movimientos (cargado
+        al crear el producto) se toma como saldo inicial al
+        costo de sus capas de apertura (o al precio unitario si no las tiene).
+        """
+        totales = MovimientoInventario.objects.filter(producto=self.producto).aggregate(
+            variacion_total=Sum('variacion'),
+            cantidad=Sum('variacion', filter=hasta),
+            valor=Sum(VALOR_CON_SIGNO, filter=hasta),
+        )
+        stock_sin_movimientos = self.producto.cantidad - (totales['variacion_total'] or 0)
+        cantidad = (totales['cantidad'] or 0) + stock_sin_movimientos
+        valor = (totales['valor'] or CERO) + stock_sin_movimientos * self._costo_apertura()
+        return cantidad, valor.quantize(CENTAVOS)
+
+    def saldo_inicial(self):
+        """Saldo antes de la fecha de inicio (o el stock sin movimientos si no hay fecha)"""
+        if not self.fecha_inicio:
+            return self._saldo(Q(pk__in=[]))
+        return self._saldo(Q(fecha__lt=inicio_del_dia(self.fecha_inicio)))
+
+    def saldo_final(self):
+        if not self.fecha_fin:
+            return self._saldo(~Q(pk__in=[]))
+        return self._saldo(Q(fecha__lt=inicio_del_dia(self.fecha_fin + timedelta(days=1))))
+
+    def _saldo_hasta_movimiento(self, movimiento_id):
+        """Saldo después del movimiento indicado (cursor de la paginación)"""
+        fecha = MovimientoInventario.objects.filter(
+            producto=self.producto, pk=movimiento_id
+        ).values_list('fecha', flat=True).first()
+        if fecha is None:
+            return None, None
+        return fecha, self._saldo(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lte=movimiento_id))
+
+    def filas(self, saldo, despues=None):
+        """
+        Genera las filas del kardex con el saldo acumulado a partir de 'saldo'
+        (cantidad, valor). 'despues' es (fecha, id) del último movimiento ya
+        mostrado. Lee los movimientos en bloques con un cursor del servidor.
+        """
+        movimientos = self._movimientos()
+        if despues:
+            fecha, movimiento_id = despues
+            movimientos = movimientos.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=movimiento_id))
+
+        cantidad, valor = saldo
+        for fila in movimientos.values(*CAMPOS_FILA).iterator(chunk_size=TAMANO_CHUNK_KARDEX):
+            variacion = fila['variacion']
+            if variacion < 0:
+                valor -= fila['costo_total']
+            else:
+                valor += fila['costo_total']
+            cantidad += variacion
+            fila.update({
+                'entrada': variacion if variacion > 0 else 0,
+                'salida': -variacion if variacion < 0 else 0,
+                'saldo_cantidad': cantidad,
+                'saldo_valor': valor,
+                'costo_promedio': (valor / cantidad).quantize(CENTAVOS) if cantidad else CERO,
+            })
+            yield fila
+
+    def pagina(self, despues=None, tamano=TAMANO_PAGINA_KARDEX):
+        """
+        Una página del kardex. 'despues' es el id del último movimiento de la
+        página anterior; el saldo de arranque se recalcula con una agregación
+        en lugar de recorrer las páginas previas.
+        """
+        cursor = None
+        if despues:
+            fecha, saldo = self._saldo_hasta_movimiento(despues)
+            if fecha is not None:
+                cursor = (fecha, despues)
+        if cursor is None:
+            saldo = self.saldo_inicial()
+
+        filas = list(islice(self.filas(saldo, cursor), tamano + 1))
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        return {
+            'producto': self.producto,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+            'saldo_anterior': {'cantidad': saldo[0], 'valor': saldo[1]},
+            'filas': filas,
+            'hay_mas': hay_mas,
+            'siguiente': filas[-1]['id'] if hay_mas else None,
+        }
@@ -0,0 +1,65 @@
+"""
+Comando de gestión para calcular el análisis ABC y de rotación del inventario
+Uso:
+    python manage.py analisis_inventario --empresa=<id>
+    python manage.py analisis_inventario --empresa=<id> --fecha=2025-06-30 --dias=90 --top=20
+    python manage.py analisis_inventario --empresa=<id> --refrescar
+
+Deja el resultado en la caché del día, por lo que puede ejecutarse en la
+madrugada (cron) para que la vista de análisis responda sin calcular.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from inventario.analisis import AnalisisInventario, DIAS_ANALISIS, filas_analisis
+from S_CONTABLE.utils import parsear_fecha
+
+
+class Command(BaseCommand):
+    help = 'Calcula la clasificación ABC y la rotación de los productos y la guarda en caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de la empresa (por defecto todas las activas)')
+        parser.add_argument('--fecha', help='Último día del período (AAAA-MM-DD, por defecto hoy)')
+        parser.add_argument('--dias', type=int, default=DIAS_ANALISIS, help='Días del período')
+        parser.add_argument('--top', type=int, default=10, help='Productos de mayor consumo a mostrar')
+        parser.add_argument('--refrescar', action='store_true', help='Recalcula aunque exista en caché')
+
+    def handle(self, *args, **options):
+        if options['empresa']:
+            try:
+                empresas = [Empresa.objects.get(id=options['empresa'])]
+            except Empresa.DoesNotExist:
+                raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+        else:
+            empresas = list(Empresa.objects.filter(activo=True))
+
+        fecha = parsear_fecha(options['fecha'])
+        if options['fecha'] and not fecha:
+            raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor que cero')
+
+        for empresa in empresas:
+            inicio = time.perf_counter()
+            datos = AnalisisInventario(empresa, fecha, options['dias']).generar_con_cache(options['refrescar'])
+            duracion = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(
+                f'{empresa.nombre}: {len(datos["ids"])} productos, del {datos["fecha_inicio"]:%d/%m/%Y} '
+                f'al {datos["fecha_fin"]:%d/%m/%Y} ({duracion:.0f} ms)'
+            )
+            for resumen in datos['resumen']:
+                self.stdout.write(
+                    f'  Clase {resumen["clase"]}: {resumen["productos"]} productos, '
+                    f'${resumen["valor"]:,.2f} ({resumen["participacion"]:.1f}%)'
+                )
+            for fila in filas_analisis(datos, range(min(options['top'], len(datos['ids'])))):
+                dias = '-' if fila['dias_inventario'] is None else f'{fila["dias_inventario"]:.0f}'
+                self.stdout.write(
+                    f'    [{fila["clase"]}] {fila["producto"].codigo} {fila["producto"].nombre}: '
+                    f'${fila["consumo_valor"]:,.2f}, rotación {fila["rotacion"]:.2f}, {dias} días'
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Análisis calculado para {len(empresas)} empresa(s)'))
@@ -0,0 +1,94 @@
+"""
+Comando de gestión para medir la latencia de la consulta de productos por código (punto de venta)
+Uso:
+    python manage.py benchmark_codigos
+    python manage.py benchmark_codigos --empresa=<id> --consultas=20000 --lote=20
+
+Compara, sobre códigos reales de la empresa: la consulta ORM por código, la
+caché en memoria sin datos (fallos) y con datos (aciertos), los lotes con una
+sola consulta IN y la petición completa al endpoint de la API.
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from empresa.models import Empresa
+from inventario.api import ProductoPorCodigoView
+from inventario.codigos_pos import consultar_codigo, consultar_codigos, invalidar_empresa
+from inventario.models import Producto
+
+
+def _percentil(tiempos, percentil):
+    return tiempos[min(int(len(tiempos) * percentil / 100), len(tiempos) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de la consulta de productos por código con y sin caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de la empresa (por defecto la primera activa)')
+        parser.add_argument('--consultas', type=int, default=5000, help='Consultas por escenario')
+        parser.add_argument('--lote', type=int, default=20, help='Códigos por consulta en el escenario de lotes')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['empresa']:
+            empresa = Empresa.objects.filter(id=options['empresa']).first()
+        else:
+            empresa = Empresa.objects.filter(activo=True).order_by('id').first()
+        if not empresa:
+            raise CommandError('No se encontró la empresa')
+
+        codigos = list(Producto.objects.de_empresa(empresa).filter(estado='activo').values_list('codigo', flat=True))
+        if not codigos:
+            raise CommandError(f'La empresa {empresa.nombre} no tiene productos activos')
+        aleatorio = random.Random(options['semilla'])
+        muestra = [aleatorio.choice(codigos) for _ in range(options['consultas'])]
+        lotes = [muestra[i:i + options['lote']] for i in range(0, len(muestra), options['lote'])]
+        self.stdout.write(f'{empresa.nombre}: {len(codigos)} productos activos, {len(muestra)} consultas\n')
+
+        def orm(codigo):
+            return Producto.objects.filter(empresa=empresa, estado='activo', codigo=codigo).values_list(
+                'id', 'nombre', 'precio_venta', 'cantidad'
+            ).first()
+
+        self._medir('ORM por código', muestra, orm)
+        invalidar_empresa(empresa.id)
+        self._medir('Caché (primera lectura)', list(dict.fromkeys(muestra)),
+                    lambda codigo: consultar_codigo(empresa.id, codigo))
+        self._medir('Caché (con datos)', muestra, lambda codigo: consultar_codigo(empresa.id, codigo))
+        invalidar_empresa(empresa.id)
+        self._medir(f'Lote de {options["lote"]} (sin caché, 1 consulta IN)', lotes,
+                    lambda lote: consultar_codigos(empresa.id, lote), por=len(lotes[0]))
+
+        usuario = User.objects.filter(is_superuser=True).first() or User.objects.first()
+        if usuario is None:
+            self.stdout.write('  (sin usuarios: se omite la medición de la API)')
+        else:
+            fabrica = APIRequestFactory()
+            vista = ProductoPorCodigoView.as_view()
+
+            def api(codigo):
+                peticion = fabrica.get(f'/api/inventario/codigos/{codigo}/', {'empresa': empresa.id})
+                force_authenticate(peticion, user=usuario)
+                return vista(peticion, codigo=codigo)
+
+            self._medir('API por código (caché con datos)', muestra, api)
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark terminado'))
+
+    def _medir(self, nombre, entradas, funcion, por=1):
+        tiempos = []
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            funcion(entrada)
+            tiempos.append((time.perf_counter() - inicio) * 1_000_000 / por)
+        tiempos.sort()
+        total = sum(tiempos) * por / 1_000_000
+        self.stdout.write(
+            f'  {nombre:<42} p50 {_percentil(tiempos, 50):>8.1f} µs   p95 {_percentil(tiempos, 95):>8.1f} µs   '
+            f'p99 {_percentil(tiempos, 99):>8.1f} µs   {len(tiempos) * por / total:>10,.0f} códigos/s'
+        )
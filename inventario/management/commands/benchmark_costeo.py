@@ -0,0 +1,107 @@
+"""
+Comando de gestión para medir el costeo FIFO incremental frente a recalcular
+el historial en cada salida.
+Uso:
+    python manage.py benchmark_costeo
+    python manage.py benchmark_costeo --movimientos=1000000 --productos=200
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from inventario.costeo import CapasProducto
+
+
+class Command(BaseCommand):
+    help = 'Mide el costeo FIFO incremental sobre movimientos sintéticos (no usa la base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movimientos', type=int, default=1_000_000, help='Movimientos a simular')
+        parser.add_argument('--productos', type=int, default=100, help='Productos entre los que se reparten')
+        parser.add_argument('--muestra', type=int, default=500,
+                            help='Salidas recalculadas desde el historial para comparar')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def _generar(self, cantidad, productos, semilla):
+        """Movimientos (producto, es_entrada, cantidad, costo) con stock siempre suficiente"""
+        aleatorio = random.Random(semilla)
+        costos = [Decimal(c) / 100 for c in range(500, 5000, 7)]
+        stock = [0] * productos
+        movimientos = []
+        for _ in range(cantidad):
+            producto = aleatorio.randrange(productos)
+            if stock[producto] < 10 or aleatorio.random() < 0.45:
+                unidades = aleatorio.randint(5, 50)
+                movimientos.append((producto, True, unidades, aleatorio.choice(costos)))
+                stock[producto] += unidades
+            else:
+                unidades = aleatorio.randint(1, min(stock[producto], 30))
+                movimientos.append((producto, False, unidades, None))
+                stock[producto] -= unidades
+        return movimientos
+
+    @staticmethod
+    def _costo_recalculando(historial, unidades):
+        """Costo de una salida recorriendo todo el historial del producto (enfoque anterior)"""
+        motor = CapasProducto()
+        for es_entrada, cantidad, costo in historial:
+            if es_entrada:
+                motor.entrada(cantidad, costo)
+            else:
+                motor.salida(cantidad)
+        return motor.salida(unidades)
+
+    def handle(self, *args, **options):
+        total, productos = options['movimientos'], options['productos']
+        self.stdout.write(f'Generando {total:,} movimientos en {productos} productos...')
+        movimientos = self._generar(total, productos, options['semilla'])
+
+        # Incremental: cada salida consume solo las capas que necesita
+        motores = [CapasProducto() for _ in range(productos)]
+        costos = []
+        inicio = time.perf_counter()
+        for producto, es_entrada, cantidad, costo in movimientos:
+            if es_entrada:
+                motores[producto].entrada(cantidad, costo)
+            else:
+                costos.append(motores[producto].salida(cantidad))
+        incremental = time.perf_counter() - inicio
+        salidas = len(costos)
+        self.stdout.write(
+            f'Incremental: {incremental:.2f} s, {total / incremental:,.0f} movimientos/s, '
+            f'{incremental / max(salidas, 1) * 1e6:.1f} µs por salida'
+        )
+
+        # Recalculando: una muestra de salidas, cada una repasa el historial de su producto
+        muestra = min(options['muestra'], salidas)
+        if not muestra:
+            return
+        historiales = [[] for _ in range(productos)]
+        indices_salida = []
+        for indice, (producto, es_entrada, cantidad, costo) in enumerate(movimientos):
+            if not es_entrada:
+                indices_salida.append((indice, len(historiales[producto])))
+            historiales[producto].append((es_entrada, cantidad, costo))
+        paso = max(len(indices_salida) // muestra, 1)
+        seleccion = indices_salida[::paso][:muestra]
+
+        inicio = time.perf_counter()
+        diferencias = 0
+        for orden, (indice, posicion) in enumerate(seleccion):
+            producto, _, cantidad, _ = movimientos[indice]
+            costo = self._costo_recalculando(historiales[producto][:posicion], cantidad)
+            if costo != costos[orden * paso]:
+                diferencias += 1
+        recalculado = time.perf_counter() - inicio
+        por_salida = recalculado / len(seleccion)
+        self.stdout.write(
+            f'Recalculando historial: {por_salida * 1e6:,.1f} µs por salida '
+            f'(estimado para {salidas:,} salidas: {por_salida * salidas:,.0f} s)'
+        )
+        estilo = self.style.SUCCESS if not diferencias else self.style.ERROR
+        self.stdout.write(estilo(
+            f'✓ {len(seleccion)} salidas comparadas, {diferencias} con costo distinto; '
+            f'incremental {por_salida * salidas / incremental:,.0f}x más rápido'
+        ))
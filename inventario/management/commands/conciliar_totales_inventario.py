@@ -0,0 +1,42 @@
+"""
+Comando de gestión para conciliar los totales de inventario por categoría
+Uso:
+    python manage.py conciliar_totales_inventario
+    python manage.py conciliar_totales_inventario --empresa=<id>
+    python manage.py conciliar_totales_inventario --solo-verificar
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from inventario.models import Categoria
+from inventario.totales import conciliar_totales
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales de inventario (cantidad y valor por categoría) desde los productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de la empresa (por defecto todas)')
+        parser.add_argument('--solo-verificar', action='store_true', help='Informar diferencias sin corregirlas')
+
+    def handle(self, *args, **options):
+        empresa_ids = None
+        if options['empresa']:
+            if not Empresa.objects.filter(id=options['empresa']).exists():
+                raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+            empresa_ids = [options['empresa']]
+
+        corregir = not options['solo_verificar']
+        diferencias = conciliar_totales(empresa_ids, corregir=corregir)
+        nombres = dict(Categoria.objects.filter(
+            id__in=[categoria_id for _, categoria_id, _, _ in diferencias if categoria_id]
+        ).values_list('id', 'nombre'))
+
+        for empresa_id, categoria_id, guardado, calculado in diferencias:
+            self.stdout.write(self.style.WARNING(
+                f'  Empresa {empresa_id} / {nombres.get(categoria_id, "Sin categoría")}: '
+                f'guardado {guardado[1]} unidades ${guardado[2]:,.2f}, '
+                f'calculado {calculado[1]} unidades ${calculado[2]:,.2f}'
+            ))
+        accion = 'corregidas' if corregir else 'encontradas'
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(diferencias)} diferencias {accion}'))
@@ -0,0 +1,61 @@
+"""
+Comando de gestión para generar los cortes mensuales de inventario
+Uso:
+    python manage.py generar_cortes_inventario
+    python manage.py generar_cortes_inventario --empresa=<id> --hasta=2025-06-30
+    python manage.py generar_cortes_inventario --empresa=<id> --desde=2025-01-01 --hasta=2025-06-30
+
+Sin --desde continúa desde el mes siguiente al último corte (o desde el primer
+movimiento). Sin --hasta llega al cierre del mes anterior. Pensado para
+ejecutarse periódicamente (cron) al inicio de cada mes.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from empresa.models import Empresa
+from inventario.cortes import generar_corte, meses_hasta
+from inventario.models import CorteInventario, MovimientoInventario
+from S_CONTABLE.utils import parsear_fecha
+
+
+class Command(BaseCommand):
+    help = 'Genera los cortes mensuales (existencia y valor por producto) para consultar el inventario a una fecha'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de la empresa (por defecto todas las activas)')
+        parser.add_argument('--desde', help='Primer mes a generar o regenerar (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Último mes a generar (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        if options['empresa']:
+            try:
+                empresas = [Empresa.objects.get(id=options['empresa'])]
+            except Empresa.DoesNotExist:
+                raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+        else:
+            empresas = list(Empresa.objects.filter(activo=True))
+
+        desde, hasta = parsear_fecha(options['desde']), parsear_fecha(options['hasta'])
+        if (options['desde'] and not desde) or (options['hasta'] and not hasta):
+            raise CommandError('Las fechas deben tener el formato AAAA-MM-DD')
+        hasta = hasta or date.today().replace(day=1) - timedelta(days=1)
+
+        for empresa in empresas:
+            inicio = desde or self._primer_mes_pendiente(empresa)
+            if not inicio:
+                continue
+            for fecha in meses_hasta(inicio, hasta):
+                productos = generar_corte(empresa, fecha)
+                self.stdout.write(f'  {empresa.nombre} al {fecha:%d/%m/%Y}: {productos} productos')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Cortes generados hasta el {hasta:%d/%m/%Y}'))
+
+    def _primer_mes_pendiente(self, empresa):
+        ultimo = CorteInventario.objects.de_empresa(empresa).aggregate(ultimo=Max('fecha'))['ultimo']
+        if ultimo:
+            return ultimo + timedelta(days=1)
+        primero = MovimientoInventario.objects.de_empresa(empresa).aggregate(primero=Min('fecha'))['primero']
+        return timezone.localtime(primero).date() if primero else None
@@ -0,0 +1,46 @@
+"""
+Comando de gestión para reconstruir el costeo FIFO y promedio del inventario
+Uso:
+    python manage.py reconstruir_costos
+    python manage.py reconstruir_costos --empresa=<id>
+    python manage.py reconstruir_costos --empresa=<id> --productos 10 11
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from inventario.costeo import reconstruir_costeo
+from inventario.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las capas FIFO, el costo promedio y el costo de los movimientos desde el historial'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de la empresa (por defecto todas)')
+        parser.add_argument('--productos', type=int, nargs='+', help='IDs de los productos a reconstruir')
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.all()
+        if options['empresa']:
+            try:
+                empresa = Empresa.objects.get(id=options['empresa'])
+            except Empresa.DoesNotExist:
+                raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+            productos = Producto.objects.de_empresa(empresa)
+        if options['productos']:
+            productos = productos.filter(id__in=options['productos'])
+
+        total_movimientos = total_capas = 0
+        for producto in productos.order_by('id').iterator():
+            movimientos, capas = reconstruir_costeo(producto)
+            total_movimientos += movimientos
+            total_capas += capas
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'  {producto.codigo}: {movimientos} movimientos, {capas} capas vigentes, '
+                    f'costo promedio ${producto.costo_promedio:,.4f}'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total_movimientos} movimientos recalculados, {total_capas} capas vigentes'
+        ))
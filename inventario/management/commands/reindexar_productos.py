@@ -0,0 +1,18 @@
+"""
+Comando de gestión para reconstruir el índice de búsqueda de productos
+Uso: python manage.py reindexar_productos
+"""
+from django.core.management.base import BaseCommand
+
+from inventario.busqueda import reconstruir_indice, usa_fts5
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de texto completo de productos (necesario tras cargas masivas)'
+
+    def handle(self, *args, **options):
+        if not usa_fts5():
+            self.stdout.write('El motor de base de datos actual no usa un índice FTS; no hay nada que reconstruir')
+            return
+        total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} productos indexados'))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0003_producto_precio_venta'),
+        ('login', '0006_perfil_empresa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='categorias', to='empresa.empresa'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_inventario', to='empresa.empresa'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='empresa',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='productos', to='empresa.empresa'),
+        ),
+        migrations.AlterField(
+            model_name='categoria',
+            name='nombre',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo',
+            field=models.CharField(help_text='Código único del producto dentro de la empresa', max_length=50),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categoria',
+            unique_together={('empresa', 'nombre')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='producto',
+            unique_together={('empresa', 'codigo')},
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['empresa', 'fecha'], name='movimiento_empresa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['empresa', 'estado', 'nombre'], name='producto_empresa_estado_idx'),
+        ),
+    ]
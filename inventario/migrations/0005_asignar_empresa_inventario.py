@@ -0,0 +1,73 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def asignar_empresa(apps, schema_editor):
+    """
+    Asigna la empresa a los registros existentes: productos, la del perfil
+    del usuario creador o, si no hay, la primera empresa activa; categorías, la
+    de sus productos (ver asignar_categorias); movimientos, la de su producto.
+    """
+    Empresa = apps.get_model('empresa', 'Empresa')
+    Perfil = apps.get_model('login', 'Perfil')
+    Categoria = apps.get_model('inventario', 'Categoria')
+    Producto = apps.get_model('inventario', 'Producto')
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+
+    empresa_defecto = Empresa.objects.filter(activo=True).order_by('id').values_list('id', flat=True).first()
+    if empresa_defecto is None:
+        return
+
+    empresa_creador = Perfil.objects.filter(
+        user_id=OuterRef('usuario_creador_id'), empresa__isnull=False
+    ).values('empresa_id')[:1]
+    Producto.objects.filter(empresa__isnull=True).update(
+        empresa_id=Coalesce(Subquery(empresa_creador), Value(empresa_defecto))
+    )
+    asignar_categorias(Categoria, Producto, empresa_defecto)
+    MovimientoInventario.objects.filter(empresa__isnull=True).update(
+        empresa_id=Subquery(Producto.objects.filter(pk=OuterRef('producto_id')).values('empresa_id')[:1])
+    )
+
+
+def asignar_categorias(Categoria, Producto, empresa_defecto):
+    """
+    Cada categoría sin empresa pasa a la empresa de sus productos. Si la usan
+    productos de varias empresas se copia en cada una (y sus productos pasan a
+    la copia); si la empresa ya tiene una categoría con ese nombre, se usa esa.
+    Las categorías sin productos van a la empresa por defecto.
+    """
+    for categoria in Categoria.objects.filter(empresa__isnull=True).order_by('id'):
+        empresas = list(
+            Producto.objects.filter(categoria=categoria).values_list('empresa_id', flat=True).distinct().order_by('empresa_id')
+        ) or [empresa_defecto]
+        conservada = False
+        for empresa_id in empresas:
+            destino = Categoria.objects.filter(empresa_id=empresa_id, nombre=categoria.nombre).first()
+            if destino is None and not conservada:
+                Categoria.objects.filter(pk=categoria.pk).update(empresa_id=empresa_id)
+                conservada = True
+                continue
+            if destino is None:
+                destino = Categoria.objects.create(
+                    empresa_id=empresa_id, nombre=categoria.nombre, descripcion=categoria.descripcion
+                )
+            Producto.objects.filter(categoria=categoria, empresa_id=empresa_id).update(categoria=destino)
+        if not conservada:
+            # Todas sus empresas ya tenían una categoría con el mismo nombre
+            categoria.delete()
+
+
+class Migration(migrations.Migration):
+    # Solo datos: en PostgreSQL no puede compartir transacción con los ALTER TABLE de 0004
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0004_empresa_inventario'),
+        ('login', '0006_perfil_empresa'),
+    ]
+
+    operations = [
+        migrations.RunPython(asignar_empresa, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    """
+    SQLite: tabla FTS5 con los productos existentes.
+    PostgreSQL: índices GIN de trigramas para las búsquedas con icontains.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS inventario_producto_fts USING fts5("
+            "codigo, nombre, descripcion, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO inventario_producto_fts (rowid, codigo, nombre, descripcion) "
+            "SELECT id, codigo, nombre, COALESCE(descripcion, '') FROM inventario_producto"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for campo in ('codigo', 'nombre', 'descripcion'):
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS producto_{campo}_trgm_idx '
+                f'ON inventario_producto USING gin (UPPER({campo}) gin_trgm_ops)'
+            )
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS inventario_producto_fts')
+    elif vendor == 'postgresql':
+        for campo in ('codigo', 'nombre', 'descripcion'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS producto_{campo}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_asignar_empresa_inventario'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
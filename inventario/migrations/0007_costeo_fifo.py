@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:23
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def inicializar_costo_promedio(apps, schema_editor):
+    """Los productos existentes parten con el precio unitario como costo promedio"""
+    Producto = apps.get_model('inventario', 'Producto')
+    Producto.objects.filter(costo_promedio=0).update(costo_promedio=models.F('precio_unitario'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0006_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='costo_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='costo_unitario',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), help_text='Costo por unidad: el de compra en entradas, el FIFO en salidas', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='costo_promedio',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), help_text='Costo promedio ponderado por unidad (se actualiza con cada entrada)', max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='CapaCosto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('cantidad_inicial', models.PositiveIntegerField()),
+                ('cantidad_restante', models.PositiveIntegerField()),
+                ('costo_unitario', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='empresa.empresa')),
+                ('movimiento', models.ForeignKey(blank=True, help_text='Entrada que originó la capa (vacío para el stock inicial)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='inventario.movimientoinventario')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capas_costo', to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Capa de Costo',
+                'verbose_name_plural': 'Capas de Costo',
+                'ordering': ['producto', 'id'],
+                'indexes': [models.Index(condition=models.Q(('cantidad_restante__gt', 0)), fields=['producto', 'id'], name='capa_costo_vigente_idx')],
+            },
+        ),
+        migrations.RunPython(inicializar_costo_promedio, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def inicializar_variacion(apps, schema_editor):
+    """
+    Entradas y salidas existentes; los ajustes quedan en cero hasta ejecutar
+    reconstruir_costos, que calcula su diferencia recorriendo el historial.
+    """
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    MovimientoInventario.objects.filter(tipo='entrada').update(variacion=models.F('cantidad'))
+    MovimientoInventario.objects.filter(tipo='salida').update(variacion=-models.F('cantidad'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0007_costeo_fifo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='variacion',
+            field=models.IntegerField(default=0, help_text='Cambio en el stock: positivo si entra, negativo si sale (los ajustes guardan la diferencia)'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha', 'id'], name='movimiento_producto_fecha_idx'),
+        ),
+        migrations.RunPython(inicializar_variacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0008_kardex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Último día del mes del corte')),
+                ('cantidad', models.IntegerField()),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cortes_inventario', to='empresa.empresa')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes', to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Corte de Inventario',
+                'verbose_name_plural': 'Cortes de Inventario',
+                'ordering': ['-fecha', 'producto'],
+                'indexes': [models.Index(fields=['empresa', 'fecha'], name='corte_empresa_fecha_idx')],
+                'unique_together': {('producto', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marcar_bajo_stock(apps, schema_editor):
+    """Marca los productos que ya están bajo stock; la última actualización aproxima cuándo cruzaron el umbral"""
+    Producto = apps.get_model('inventario', 'Producto')
+    Producto.objects.filter(cantidad__lte=models.F('stock_minimo')).update(
+        bajo_stock=True, fecha_bajo_stock=models.F('fecha_actualizacion')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0009_cortes_inventario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='bajo_stock',
+            field=models.BooleanField(default=False, editable=False, help_text='cantidad <= stock_minimo; se mantiene al guardar el producto'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_bajo_stock',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Momento en que el producto cruzó el stock mínimo', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('bajo_stock', True)), fields=['empresa', 'estado', 'fecha_bajo_stock'], name='producto_bajo_stock_idx'),
+        ),
+        migrations.RunPython(marcar_bajo_stock, migrations.RunPython.noop),
+    ]
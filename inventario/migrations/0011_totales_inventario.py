@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:31
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def calcular_totales(apps, schema_editor):
+    """Totales iniciales por empresa y categoría desde los productos activos"""
+    Producto = apps.get_model('inventario', 'Producto')
+    TotalInventario = apps.get_model('inventario', 'TotalInventario')
+    filas = Producto.objects.filter(estado='activo', empresa__isnull=False).values('empresa_id', 'categoria_id').annotate(
+        productos=models.Count('id'),
+        total_cantidad=models.Sum('cantidad'),
+        valor=models.Sum(models.ExpressionWrapper(
+            models.F('cantidad') * models.F('precio_unitario'), output_field=models.DecimalField()
+        )),
+    ).order_by()
+    TotalInventario.objects.bulk_create([
+        TotalInventario(
+            empresa_id=fila['empresa_id'], categoria_id=fila['categoria_id'], productos=fila['productos'],
+            cantidad=fila['total_cantidad'] or 0, valor=fila['valor'] or Decimal('0.00'),
+        )
+        for fila in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0010_bajo_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TotalInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('productos', models.IntegerField(default=0)),
+                ('cantidad', models.BigIntegerField(default=0)),
+                ('valor', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='totales_inventario', to='inventario.categoria')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totales_inventario', to='empresa.empresa')),
+            ],
+            options={
+                'verbose_name': 'Total de Inventario',
+                'verbose_name_plural': 'Totales de Inventario',
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'categoria'), name='total_inventario_categoria_unico'), models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('empresa',), name='total_inventario_sin_categoria_unico')],
+            },
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:38
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('inventario', '0011_totales_inventario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AjustePrecios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(choices=[('precio_venta', 'Precio de venta'), ('precio_unitario', 'Costo unitario')], max_length=20)),
+                ('tipo', models.CharField(choices=[('porcentaje', 'Porcentaje'), ('fijo', 'Valor fijo')], max_length=10)),
+                ('valor', models.DecimalField(decimal_places=2, help_text='Porcentaje (8 = +8%) o valor a sumar; negativo para rebajas', max_digits=12)),
+                ('redondeo', models.CharField(choices=[('centavos', 'Al centavo'), ('unidad', 'A la unidad'), ('decena', 'A la decena'), ('centena', 'A la centena'), ('mil', 'Al millar')], default='centavos', max_length=10)),
+                ('estado', models.CharField(blank=True, max_length=15)),
+                ('codigos', models.TextField(blank=True, help_text='Códigos seleccionados, separados por coma')),
+                ('productos', models.IntegerField(default=0)),
+                ('total_anterior', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total_nuevo', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.categoria')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ajustes_precios', to='empresa.empresa')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ajuste de Precios',
+                'verbose_name_plural': 'Ajustes de Precios',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
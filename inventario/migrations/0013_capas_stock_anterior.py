@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Sum
+
+
+def crear_capas_stock_anterior(apps, schema_editor):
+    """
+    El stock sin capas (anterior al costeo FIFO o editado sin movimiento) pasa
+    a una capa de apertura al costo promedio. Es el stock más antiguo, por lo
+    que la capa se ubica antes de las vigentes (que se vuelven a crear detrás).
+    """
+    Producto = apps.get_model('inventario', 'Producto')
+    CapaCosto = apps.get_model('inventario', 'CapaCosto')
+
+    en_capas = dict(
+        CapaCosto.objects.filter(cantidad_restante__gt=0).values('producto_id').annotate(
+            total=Sum('cantidad_restante')
+        ).order_by().values_list('producto_id', 'total')
+    )
+    for producto in Producto.objects.filter(cantidad__gt=0).order_by('id').iterator(chunk_size=500):
+        sin_capas = producto.cantidad - en_capas.get(producto.id, 0)
+        if sin_capas <= 0:
+            continue
+        vigentes = list(CapaCosto.objects.filter(producto_id=producto.id, cantidad_restante__gt=0).order_by('id'))
+        CapaCosto.objects.filter(pk__in=[capa.pk for capa in vigentes]).delete()
+        apertura = CapaCosto(
+            empresa_id=producto.empresa_id,
+            producto_id=producto.id,
+            fecha=producto.fecha_creacion,
+            cantidad_inicial=sin_capas,
+            cantidad_restante=sin_capas,
+            costo_unitario=producto.costo_promedio or producto.precio_unitario,
+        )
+        for capa in vigentes:
+            capa.pk = None
+        CapaCosto.objects.bulk_create([apertura, *vigentes])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_ajuste_precios'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_capas_stock_anterior, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,41 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
+from empresa.models import Empresa
+from empresa.managers import EmpresaManager
+from .busqueda import indexar_producto, desindexar_producto
+from .codigos_pos import invalidar_producto
+from .costeo import crear_capa_apertura, registrar_movimiento
 
 class Categoria(models.Model):
-    nombre = models.CharField(max_length=100, unique=True)
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='categorias',
+                                null=True, blank=True)
+    nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    objects = EmpresaManager()
+    
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
+        unique_together = ['empresa', 'nombre']
     
     def __str__(self):
         return self.nombre
 
+# Campos de los que depende el aporte de un producto a los totales de inventario
+CAMPOS_TOTALES_INVENTARIO = ('empresa', 'categoria', 'estado', 'cantidad', 'precio_unitario')
+
+# Motivo de los ajustes que registran la edición directa del stock
+MOTIVO_AJUSTE_EDICION = 'Stock modificado en la edición del producto'
+
+
 class Producto(models.Model):
     ESTADO_CHOICES = [
         ('activo', 'Activo'),
@@ -23,7 +43,9 @@ class Producto(models.Model):
         ('descontinuado', 'Descontinuado'),
     ]
     
-    codigo = models.CharField(max_length=50, unique=True, help_text="Código único del producto")
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='productos',
+                                null=True, blank=True)
+    codigo = models.CharField(max_length=50, help_text="Código único del producto dentro de la empresa")
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True)
@@ -45,20 +67,46 @@ class Producto(models.Model):
         help_text="Precio de venta por unidad",
         default=Decimal('0.01')
     )
+    costo_promedio = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=Decimal('0.0000'),
+        help_text="Costo promedio ponderado por unidad (se actualiza con cada entrada)"
+    )
     stock_minimo = models.IntegerField(
         default=5,
         validators=[MinValueValidator(0)],
         help_text="Cantidad mínima antes de alertar"
     )
     estado = models.CharField(max_length=15, choices=ESTADO_CHOICES, default='activo')
+    bajo_stock = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="cantidad <= stock_minimo; se mantiene al guardar el producto"
+    )
+    fecha_bajo_stock = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Momento en que el producto cruzó el stock mínimo"
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     usuario_creador = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     
+    objects = EmpresaManager()
+    
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['nombre']
+        unique_together = ['empresa', 'codigo']
+        indexes = [
+            models.Index(fields=['empresa', 'estado', 'nombre'], name='producto_empresa_estado_idx'),
+            # Solo los productos bajo stock: conteos, widget del dashboard y alertas por fecha
+            models.Index(fields=['empresa', 'estado', 'fecha_bajo_stock'], name='producto_bajo_stock_idx',
+                         condition=models.Q(bajo_stock=True)),
+        ]
     
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
@@ -73,15 +121,99 @@ class Producto(models.Model):
         """Verifica si el producto necesita reabastecimiento"""
         return self.cantidad <= self.stock_minimo
     
+    def aporte_totales(self):
+        """
+        (empresa_id, categoria_id, cantidad, valor) con que el producto suma a los
+        totales de inventario, o None si no suma (inactivo o sin empresa).
+        """
+        if self.estado != 'activo' or not self.empresa_id:
+            return None
+        return (self.empresa_id, self.categoria_id, self.cantidad, self.cantidad * self.precio_unitario)
+    
+    def _fila_guardada(self):
+        """Valores guardados del producto, bloqueando la fila hasta el fin de la transacción"""
+        return Producto.objects.select_for_update().filter(pk=self.pk).values(
+            'empresa_id', 'categoria_id', 'estado', 'cantidad', 'precio_unitario'
+        ).first()
+    
+    @staticmethod
+    def _aporte_de_fila(fila):
+        if not fila or fila['estado'] != 'activo' or not fila['empresa_id']:
+            return None
+        return (fila['empresa_id'], fila['categoria_id'], fila['cantidad'], fila['cantidad'] * fila['precio_unitario'])
+    
+    def _aporte_guardado(self):
+        """Aporte a los totales según la fila guardada, bloqueándola hasta el fin de la transacción"""
+        return self._aporte_de_fila(self._fila_guardada())
+    
+    def _actualizar_bajo_stock(self):
+        """
+        Sincroniza el indicador bajo_stock. La fecha solo cambia al cruzar el
+        umbral, para que las alertas listen los productos que bajaron desde un momento dado.
+        Retorna True si el indicador cambió.
+        """
+        bajo_stock = self.necesita_restock
+        if bajo_stock == self.bajo_stock and (self.fecha_bajo_stock is not None) == bajo_stock:
+            return False
+        self.bajo_stock = bajo_stock
+        self.fecha_bajo_stock = timezone.now() if bajo_stock else None
+        return True
+    
     def save(self, *args, **kwargs):
+        # registrar_movimiento ya registra el cambio de stock; los cambios de cantidad hechos
+        # al editar o importar el producto se registran aquí como un ajuste fechado
+        registrar_ajuste = kwargs.pop('registrar_ajuste', True)
+        if not self.empresa_id and self.usuario_creador_id:
+            perfil = getattr(self.usuario_creador, 'perfil', None)
+            self.empresa_id = perfil.empresa_id if perfil else None
         if not self.codigo:
             # Generar código automático si no se proporciona
-            ultimo_producto = Producto.objects.all().order_by('id').last()
+            ultimo_producto = Producto.objects.order_by('id').last()
             if ultimo_producto:
                 self.codigo = f"PROD{ultimo_producto.id + 1:04d}"
             else:
                 self.codigo = "PROD0001"
-        super().save(*args, **kwargs)
+        if not self.costo_promedio and self.precio_unitario:
+            # Sin entradas registradas el costo de referencia es el precio unitario
+            self.costo_promedio = self.precio_unitario
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) & set(CAMPOS_TOTALES_INVENTARIO):
+            if self._actualizar_bajo_stock():
+                kwargs['update_fields'] = {*update_fields, 'bajo_stock', 'fecha_bajo_stock'}
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            # El aporte anterior se lee de la base (no de la instancia, que puede estar desactualizada)
+            fila = None if self._state.adding else self._fila_guardada()
+            cantidad = self.cantidad
+            if registrar_ajuste and fila and cantidad != fila['cantidad']:
+                # El resto de los campos se guarda con el stock anterior y el ajuste fija el nuevo
+                self.cantidad = fila['cantidad']
+            if self._actualizar_bajo_stock() and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'bajo_stock', 'fecha_bajo_stock'}
+            super().save(*args, **kwargs)
+            TotalInventario.aplicar_cambio(self._aporte_de_fila(fila), self.aporte_totales())
+            if fila is None:
+                if registrar_ajuste and self.cantidad > 0:
+                    crear_capa_apertura(self)
+            elif self.cantidad != cantidad:
+                self._registrar_ajuste(cantidad)
+    
+    def _registrar_ajuste(self, cantidad):
+        """
+        Registra un cambio directo de stock (edición o importación) como un
+        movimiento de ajuste, para que el kardex, los cortes y las capas lo
+        ubiquen en su fecha. El usuario se toma de 'usuario_edicion' si la vista lo asignó.
+        """
+        movimiento = registrar_movimiento(MovimientoInventario(
+            producto_id=self.pk,
+            tipo='ajuste',
+            cantidad=cantidad,
+            motivo=MOTIVO_AJUSTE_EDICION,
+            usuario=getattr(self, 'usuario_edicion', None),
+        ))
+        for campo in ('cantidad', 'costo_promedio', 'bajo_stock', 'fecha_bajo_stock', 'fecha_actualizacion'):
+            setattr(self, campo, getattr(movimiento.producto, campo))
 
 class MovimientoInventario(models.Model):
     TIPO_MOVIMIENTO = [
@@ -90,18 +222,38 @@ class MovimientoInventario(models.Model):
         ('ajuste', 'Ajuste'),
     ]
     
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='movimientos_inventario',
+                                null=True, blank=True)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
     tipo = models.CharField(max_length=10, choices=TIPO_MOVIMIENTO)
     cantidad = models.IntegerField()
     motivo = models.CharField(max_length=200)
     observaciones = models.TextField(blank=True)
+    costo_unitario = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=Decimal('0.0000'),
+        help_text="Costo por unidad: el de compra en entradas, el FIFO en salidas"
+    )
+    costo_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    variacion = models.IntegerField(
+        default=0,
+        help_text="Cambio en el stock: positivo si entra, negativo si sale (los ajustes guardan la diferencia)"
+    )
     fecha = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     
+    objects = EmpresaManager()
+    
     class Meta:
         verbose_name = "Movimiento de Inventario"
         verbose_name_plural = "Movimientos de Inventario"
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['empresa', 'fecha'], name='movimiento_empresa_fecha_idx'),
+            # Kardex: saldo inicial y paginación por (fecha, id) dentro de un producto
+            models.Index(fields=['producto', 'fecha', 'id'], name='movimiento_producto_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tipo.title()} - {self.producto.nombre} - {self.cantidad}"
@@ -113,6 +265,9 @@ class MovimientoInventario(models.Model):
         - Salida: Débito Costo de Ventas, Crédito Inventario
         """
         es_nuevo = self.pk is None
+        if not self.empresa_id:
+            # El movimiento pertenece a la empresa del producto
+            self.empresa_id = self.producto.empresa_id
         super().save(*args, **kwargs)
         
         # Generar comprobante contable solo para nuevos movimientos
@@ -124,21 +279,20 @@ class MovimientoInventario(models.Model):
         try:
             from transacciones.models import Comprobante, DetalleComprobante, TipoComprobante
             from cuentas.models import Cuenta
-            from empresa.models import Empresa
             from decimal import Decimal
             
-            # Obtener la empresa (primera activa o del perfil del usuario)
-            empresa = None
-            if self.usuario and hasattr(self.usuario, 'perfil') and self.usuario.perfil.empresa:
+            # Obtener la empresa (del movimiento, del perfil del usuario o primera activa)
+            empresa = self.empresa
+            if not empresa and self.usuario and hasattr(self.usuario, 'perfil') and self.usuario.perfil.empresa:
                 empresa = self.usuario.perfil.empresa
-            else:
+            elif not empresa:
                 empresa = Empresa.objects.filter(activo=True).first()
             
             if not empresa:
                 return  # No se puede crear comprobante sin empresa
             
-            # Valor del movimiento
-            valor = Decimal(str(self.cantidad)) * self.producto.precio_unitario
+            # Valor del movimiento: costo calculado por el costeo FIFO (o precio unitario si no se costeó)
+            valor = self.costo_total or Decimal(str(self.cantidad)) * self.producto.precio_unitario
             
             # Obtener o crear cuentas necesarias
             cuenta_inventario, _ = Cuenta.objects.get_or_create(
@@ -258,4 +412,242 @@ class MovimientoInventario(models.Model):
             # Log del error pero no interrumpir el guardado del movimiento
             import logging
             logger = logging.getLogger(__name__)
-            logger.error(f'Error al generar comprobante contable para movimiento de inventario: {e}')
\ No newline at end of file
+            logger.error(f'Error al generar comprobante contable para movimiento de inventario: {e}')
+
+
+class CapaCosto(models.Model):
+    """
+    Capa de costo FIFO: unidades que entraron juntas a un mismo costo.
+    Las salidas consumen cantidad_restante de las capas más antiguas.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='capas_costo',
+                                null=True, blank=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='capas_costo')
+    movimiento = models.ForeignKey(MovimientoInventario, on_delete=models.CASCADE, related_name='capas_costo',
+                                   null=True, blank=True, help_text="Entrada que originó la capa (vacío para el stock inicial)")
+    fecha = models.DateTimeField()
+    cantidad_inicial = models.PositiveIntegerField()
+    cantidad_restante = models.PositiveIntegerField()
+    costo_unitario = models.DecimalField(max_digits=14, decimal_places=4)
+    
+    objects = EmpresaManager()
+    
+    class Meta:
+        verbose_name = "Capa de Costo"
+        verbose_name_plural = "Capas de Costo"
+        ordering = ['producto', 'id']
+        indexes = [
+            # Solo las capas con saldo: la salida lee únicamente las que consume
+            models.Index(fields=['producto', 'id'], name='capa_costo_vigente_idx',
+                         condition=models.Q(cantidad_restante__gt=0)),
+        ]
+    
+    def __str__(self):
+        return f"{self.producto.codigo} - {self.cantidad_restante}/{self.cantidad_inicial} a {self.costo_unitario}"
+    
+    @property
+    def valor_restante(self):
+        return self.cantidad_restante * self.costo_unitario
+
+
+class CorteInventario(models.Model):
+    """
+    Existencia y valor de un producto al cierre de un mes. El inventario a una
+    fecha parte del corte más cercano anterior y suma solo los movimientos posteriores.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='cortes_inventario',
+                                null=True, blank=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='cortes')
+    fecha = models.DateField(help_text="Último día del mes del corte")
+    cantidad = models.IntegerField()
+    valor = models.DecimalField(max_digits=16, decimal_places=2)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    objects = EmpresaManager()
+    
+    class Meta:
+        verbose_name = "Corte de Inventario"
+        verbose_name_plural = "Cortes de Inventario"
+        ordering = ['-fecha', 'producto']
+        unique_together = ['producto', 'fecha']
+        indexes = [models.Index(fields=['empresa', 'fecha'], name='corte_empresa_fecha_idx')]
+    
+    def __str__(self):
+        return f"{self.producto.codigo} al {self.fecha:%d/%m/%Y}: {self.cantidad}"
+
+
+class TotalInventario(models.Model):
+    """
+    Cantidad y valor (cantidad x precio unitario) de los productos activos de
+    una empresa por categoría; la fila sin categoría agrupa los demás. Se
+    actualiza por diferencia al guardar o eliminar productos, así que los
+    reportes leen el total en O(categorías). conciliar_totales_inventario lo
+    recalcula desde los productos.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='totales_inventario')
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='totales_inventario',
+                                  null=True, blank=True)
+    productos = models.IntegerField(default=0)
+    cantidad = models.BigIntegerField(default=0)
+    valor = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = EmpresaManager()
+    
+    class Meta:
+        verbose_name = "Total de Inventario"
+        verbose_name_plural = "Totales de Inventario"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'categoria'], name='total_inventario_categoria_unico'),
+            models.UniqueConstraint(fields=['empresa'], condition=models.Q(categoria__isnull=True),
+                                    name='total_inventario_sin_categoria_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.categoria or 'Sin categoría'}: {self.cantidad} unidades, ${self.valor:,.2f}"
+    
+    @classmethod
+    def _sumar(cls, empresa_id, categoria_id, productos, cantidad, valor):
+        filtro = {'empresa_id': empresa_id, 'categoria_id': categoria_id}
+        actualizadas = cls.objects.filter(**filtro).update(
+            productos=models.F('productos') + productos,
+            cantidad=models.F('cantidad') + cantidad,
+            valor=models.F('valor') + valor,
+            fecha_actualizacion=timezone.now(),
+        )
+        if not actualizadas:
+            cls.objects.create(productos=productos, cantidad=cantidad, valor=valor, **filtro)
+        if valor:
+            # El valor del inventario entra al Balance General: cambia la versión de sus reportes
+            Empresa.incrementar_version_contable(empresa_id)
+    
+    @classmethod
+    def aplicar_cambio(cls, anterior, actual):
+        """
+        Actualiza los totales con la diferencia entre dos aportes de un producto
+        (ver Producto.aporte_totales); None significa que no aportaba o ya no aporta.
+        """
+        if anterior == actual:
+            return
+        if anterior and actual and anterior[:2] == actual[:2]:
+            cls._sumar(*actual[:2], 0, actual[2] - anterior[2], actual[3] - anterior[3])
+            return
+        if anterior:
+            cls._sumar(*anterior[:2], -1, -anterior[2], -anterior[3])
+        if actual:
+            cls._sumar(*actual[:2], 1, actual[2], actual[3])
+    
+    @classmethod
+    def de_la_empresa(cls, empresa):
+        """Totales de la empresa por categoría y el total general, leyendo una fila por categoría"""
+        categorias = list(cls.objects.de_empresa(empresa).select_related('categoria').order_by('categoria__nombre'))
+        return {
+            'categorias': categorias,
+            'productos': sum(total.productos for total in categorias),
+            'cantidad': sum(total.cantidad for total in categorias),
+            'valor': sum((total.valor for total in categorias), Decimal('0.00')),
+        }
+
+
+class AjustePrecios(models.Model):
+    """
+    Registro de auditoría de un ajuste masivo de precios: una fila por lote
+    (no por producto) con el criterio de selección, la regla aplicada y los
+    totales de precios antes y después.
+    """
+    CAMPO_CHOICES = [
+        ('precio_venta', 'Precio de venta'),
+        ('precio_unitario', 'Costo unitario'),
+    ]
+    TIPO_CHOICES = [
+        ('porcentaje', 'Porcentaje'),
+        ('fijo', 'Valor fijo'),
+    ]
+    REDONDEO_CHOICES = [
+        ('centavos', 'Al centavo'),
+        ('unidad', 'A la unidad'),
+        ('decena', 'A la decena'),
+        ('centena', 'A la centena'),
+        ('mil', 'Al millar'),
+    ]
+    
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='ajustes_precios')
+    campo = models.CharField(max_length=20, choices=CAMPO_CHOICES)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    valor = models.DecimalField(max_digits=12, decimal_places=2,
+                                help_text="Porcentaje (8 = +8%) o valor a sumar; negativo para rebajas")
+    redondeo = models.CharField(max_length=10, choices=REDONDEO_CHOICES, default='centavos')
+    categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=15, blank=True)
+    codigos = models.TextField(blank=True, help_text="Códigos seleccionados, separados por coma")
+    productos = models.IntegerField(default=0)
+    total_anterior = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total_nuevo = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    
+    objects = EmpresaManager()
+    
+    class Meta:
+        verbose_name = "Ajuste de Precios"
+        verbose_name_plural = "Ajustes de Precios"
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        signo = '%' if self.tipo == 'porcentaje' else '$'
+        return f"{self.get_campo_display()} {self.valor:+}{signo} en {self.productos} productos ({self.fecha:%d/%m/%Y})"
+
+
+# ============================================
+# SEÑALES: índice de búsqueda de productos
+# ============================================
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, **kwargs):
+    """Mantiene sincronizado el índice de texto completo"""
+    indexar_producto(instance)
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, **kwargs):
+    """Quita el producto eliminado del índice de texto completo"""
+    desindexar_producto(instance.pk)
+
+
+# ============================================
+# SEÑALES: totales de inventario
+# ============================================
+
+@receiver(pre_delete, sender=Producto)
+def producto_por_eliminar_totales(sender, instance, **kwargs):
+    """Lee el aporte guardado del producto antes de eliminarlo"""
+    instance._aporte_eliminado = instance._aporte_guardado()
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado_totales(sender, instance, **kwargs):
+    """Resta de los totales el aporte del producto eliminado"""
+    TotalInventario.aplicar_cambio(getattr(instance, '_aporte_eliminado', None), None)
+
+
+@receiver(pre_delete, sender=Categoria)
+def categoria_eliminada_totales(sender, instance, **kwargs):
+    """
+    Los productos de una categoría eliminada quedan sin categoría (SET_NULL,
+    sin pasar por save): su total se traslada a la fila sin categoría.
+    """
+    for total in TotalInventario.objects.filter(categoria=instance):
+        TotalInventario._sumar(total.empresa_id, None, total.productos, total.cantidad, total.valor)
+
+
+# ============================================
+# SEÑALES: consulta por código (punto de venta)
+# ============================================
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_modificado_codigos(sender, instance, **kwargs):
+    """Invalida la entrada del producto en la caché de códigos cuando se confirma el cambio"""
+    # Al eliminar, el pk de la instancia ya es None cuando se ejecuta on_commit
+    empresa_id, producto_id, codigo = instance.empresa_id, instance.pk, instance.codigo
+    transaction.on_commit(lambda: invalidar_producto(empresa_id, producto_id, codigo))
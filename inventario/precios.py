@@ -0,0 +1,129 @@
+"""
+Ajuste masivo de precios de productos.
+
+Los productos se seleccionan por categoría, estado o lista de códigos y el
+nuevo precio (porcentaje o valor fijo, con regla de redondeo) se calcula en la
+base de datos: la vista previa es una sola agregación y la aplicación un único
+UPDATE ... SET precio = ROUND(precio * factor, 2). El lote queda registrado en
+una fila de AjustePrecios.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Sum, Value
+from django.db.models.functions import Cast, Greatest, Round
+from django.utils import timezone
+
+from .codigos_pos import invalidar_empresa
+from .models import AjustePrecios, Producto
+from .totales import conciliar_totales
+
+PRECIO_MINIMO = Decimal('0.01')
+PRECIO_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+# Múltiplo al que se redondea el precio; 'centavos' usa ROUND(x, 2)
+MULTIPLO_REDONDEO = {
+    'unidad': 1,
+    'decena': 10,
+    'centena': 100,
+    'mil': 1000,
+}
+SALIDA_PRECIO = DecimalField(max_digits=10, decimal_places=2)
+SALIDA_FACTOR = DecimalField(max_digits=12, decimal_places=6)
+
+
+def separar_codigos(texto):
+    """Lista de códigos sin repetir a partir de texto separado por comas, espacios o líneas"""
+    return list(dict.fromkeys(codigo for codigo in texto.replace(',', ' ').split() if codigo))
+
+
+def productos_a_ajustar(empresa, categoria=None, estado='', codigos=None):
+    """Productos de la empresa que cumplen todos los criterios indicados"""
+    productos = Producto.objects.de_empresa(empresa)
+    if categoria is not None:
+        productos = productos.filter(categoria=categoria)
+    if estado:
+        productos = productos.filter(estado=estado)
+    if codigos:
+        productos = productos.filter(codigo__in=codigos)
+    return productos
+
+
+def expresion_precio(campo, tipo, valor, redondeo='centavos'):
+    """
+    Expresión SQL del nuevo precio: precio * (1 + valor/100) o precio + valor,
+    redondeada según la regla y nunca menor a PRECIO_MINIMO.
+    """
+    valor = Decimal(valor)
+    if tipo == 'porcentaje':
+        nuevo = F(campo) * Value(1 + valor / 100, output_field=SALIDA_FACTOR)
+    else:
+        nuevo = F(campo) + Value(valor, output_field=SALIDA_PRECIO)
+    multiplo = MULTIPLO_REDONDEO.get(redondeo)
+    if multiplo:
+        # Múltiplo explícito: ROUND con precisión negativa no es portable (SQLite)
+        nuevo = Round(nuevo / Value(multiplo)) * Value(multiplo)
+    else:
+        nuevo = Round(nuevo, 2)
+    return Cast(Greatest(nuevo, Value(PRECIO_MINIMO, output_field=SALIDA_PRECIO)), SALIDA_PRECIO)
+
+
+def vista_previa(productos, campo, tipo, valor, redondeo='centavos'):
+    """
+    Resumen del ajuste sin aplicarlo, con una sola agregación:
+    {'productos', 'total_anterior', 'total_nuevo', 'minimo_nuevo', 'maximo_nuevo'}.
+    """
+    resumen = productos.annotate(nuevo_precio=expresion_precio(campo, tipo, valor, redondeo)).aggregate(
+        productos=Count('id'),
+        total_anterior=Sum(campo),
+        total_nuevo=Sum('nuevo_precio'),
+        minimo_nuevo=Min('nuevo_precio'),
+        maximo_nuevo=Max('nuevo_precio'),
+    )
+    for clave in ('total_anterior', 'total_nuevo', 'minimo_nuevo', 'maximo_nuevo'):
+        resumen[clave] = Decimal(resumen[clave] or 0).quantize(PRECIO_MINIMO)
+    return resumen
+
+
+@transaction.atomic
+def aplicar_ajuste(empresa, usuario, campo, tipo, valor, redondeo='centavos', categoria=None, estado='',
+                   codigos=None):
+    """
+    Aplica el ajuste con un único UPDATE y registra el lote en AjustePrecios.
+    Lanza ValidationError si no hay productos o algún precio queda fuera de rango.
+    Retorna el AjustePrecios creado.
+    """
+    if campo not in dict(AjustePrecios.CAMPO_CHOICES):
+        raise ValidationError(f'Campo de precio no válido: {campo}')
+    try:
+        # Se guarda en AjustePrecios y se formatea con signo: no puede quedar como texto
+        valor = Decimal(str(valor))
+    except InvalidOperation:
+        raise ValidationError(f'Valor de ajuste no válido: {valor}')
+    productos = productos_a_ajustar(empresa, categoria, estado, codigos)
+    resumen = vista_previa(productos, campo, tipo, valor, redondeo)
+    if not resumen['productos']:
+        raise ValidationError('Ningún producto cumple los criterios de selección')
+    if resumen['maximo_nuevo'] > PRECIO_MAXIMO:
+        raise ValidationError(f'El ajuste deja precios mayores a ${PRECIO_MAXIMO:,.2f}')
+
+    productos.update(**{campo: expresion_precio(campo, tipo, valor, redondeo), 'fecha_actualizacion': timezone.now()})
+    transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+    if campo == 'precio_unitario':
+        # El UPDATE no pasa por Producto.save: se recalcula el valor del inventario de la empresa
+        conciliar_totales(empresa_ids=[empresa.id])
+
+    return AjustePrecios.objects.create(
+        empresa=empresa,
+        campo=campo,
+        tipo=tipo,
+        valor=valor,
+        redondeo=redondeo,
+        categoria=categoria,
+        estado=estado,
+        codigos=', '.join(codigos or []),
+        productos=resumen['productos'],
+        total_anterior=resumen['total_anterior'],
+        total_nuevo=resumen['total_nuevo'],
+        usuario=usuario,
+    )
@@ -1,3 +1,106 @@
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+
+from empresa.models import Empresa
+from .costeo import reconstruir_costeo, registrar_movimiento
+from .cortes import inventario_a_la_fecha
+from .kardex import Kardex
+from .models import CapaCosto, MovimientoInventario, Producto
+
+
+class CosteoFifoTests(TestCase):
+    """Valoración FIFO de las salidas y reconstrucción del costeo"""
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nombre='Empresa', nit='900000001', direccion='x', representante_legal='y')
+        self.producto = Producto.objects.create(
+            empresa=self.empresa, codigo='P1', nombre='Producto', cantidad=5,
+            precio_unitario=Decimal('8.00'), precio_venta=Decimal('15.00'),
+        )
+
+    def _movimiento(self, tipo, cantidad, costo_unitario=Decimal('0')):
+        return registrar_movimiento(MovimientoInventario(
+            producto=self.producto, tipo=tipo, cantidad=cantidad, costo_unitario=costo_unitario, motivo='Prueba'
+        ))
+
+    def _capas(self):
+        return list(CapaCosto.objects.filter(producto=self.producto, cantidad_restante__gt=0).order_by('id').values_list(
+            'cantidad_restante', 'costo_unitario'
+        ))
+
+    def _costos(self):
+        return list(MovimientoInventario.objects.filter(producto=self.producto).order_by('id').values_list(
+            'costo_total', 'variacion'
+        ))
+
+    def test_salida_consume_capas_desde_la_mas_antigua(self):
+        self._movimiento('entrada', 10, Decimal('12.00'))
+        self._movimiento('entrada', 10, Decimal('20.00'))
+
+        salida = self._movimiento('salida', 17)
+
+        # 5 de la capa de apertura a 8, 10 a 12 y 2 a 20
+        self.assertEqual(salida.costo_total, Decimal('200.00'))
+        self.assertEqual(self._capas(), [(8, Decimal('20.0000'))])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad, 8)
+
+    def test_salida_sin_stock_suficiente(self):
+        with self.assertRaises(ValidationError):
+            self._movimiento('salida', 6)
+        self.assertEqual(self._capas(), [(5, Decimal('8.0000'))])
+
+    def test_reconstruir_costeo_es_idempotente(self):
+        self._movimiento('entrada', 10, Decimal('12.00'))
+        self._movimiento('salida', 7)
+        self._movimiento('ajuste', 10)
+        self._movimiento('salida', 4)
+        capas, costos = self._capas(), self._costos()
+
+        for _ in range(2):
+            reconstruir_costeo(Producto.objects.get(pk=self.producto.pk))
+            self.assertEqual(self._capas(), capas)
+            self.assertEqual(self._costos(), costos)
+
+    def test_edicion_de_stock_registra_ajuste(self):
+        self._movimiento('entrada', 10, Decimal('12.00'))
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.cantidad = 3
+        producto.save()
+
+        ajuste = MovimientoInventario.objects.filter(producto=producto, tipo='ajuste').get()
+        self.assertEqual((ajuste.cantidad, ajuste.variacion), (3, -12))
+        # Las 12 unidades salen por FIFO: 5 a 8 y 7 a 12
+        self.assertEqual(ajuste.costo_total, Decimal('124.00'))
+        self.assertEqual(self._capas(), [(3, Decimal('12.0000'))])
+
+    def test_corte_y_kardex_no_incluyen_ediciones_posteriores(self):
+        def en(anio, mes, dia):
+            return mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(datetime(anio, mes, dia, 12)))
+
+        with en(2025, 1, 5):
+            producto = Producto.objects.create(
+                empresa=self.empresa, codigo='P2', nombre='Otro', cantidad=0, precio_unitario=Decimal('10.00')
+            )
+        with en(2025, 2, 5):
+            registrar_movimiento(MovimientoInventario(
+                producto=producto, tipo='entrada', cantidad=10, costo_unitario=Decimal('10.00'), motivo='Compra'
+            ))
+        with en(2025, 10, 1):
+            producto.refresh_from_db()
+            producto.cantidad = 100
+            producto.save()
 
-# Create your tests here.
+        reporte = inventario_a_la_fecha(self.empresa, date(2025, 3, 31))
+        self.assertEqual(
+            [(fila['producto'].pk, fila['cantidad'], fila['valor']) for fila in reporte['productos']],
+            [(producto.pk, 10, Decimal('100.00'))],
+        )
+        kardex = Kardex(producto, date(2025, 2, 1), date(2025, 3, 31))
+        self.assertEqual(kardex.saldo_inicial(), (0, Decimal('0.00')))
+        self.assertEqual(kardex.saldo_final(), (10, Decimal('100.00')))
@@ -0,0 +1,78 @@
+"""
+Conciliación de los totales de inventario por categoría.
+
+TotalInventario se mantiene por diferencia en cada guardado de Producto; esta
+función lo recalcula desde los productos con una consulta agrupada, para
+corregir cambios hechos fuera del ORM (cargas con SQL, update() masivos).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from empresa.models import Empresa
+from .models import Producto, TotalInventario
+
+CERO = Decimal('0.00')
+
+
+def totales_calculados(empresa_ids=None, categoria_ids=None):
+    """{(empresa_id, categoria_id): (productos, cantidad, valor)} desde los productos activos"""
+    productos = Producto.objects.filter(estado='activo', empresa__isnull=False)
+    if empresa_ids is not None:
+        productos = productos.filter(empresa_id__in=empresa_ids)
+    if categoria_ids is not None:
+        productos = productos.filter(categoria_id__in=categoria_ids)
+    filas = productos.values('empresa_id', 'categoria_id').annotate(
+        productos=Count('id'),
+        total_cantidad=Sum('cantidad'),
+        valor=Sum(ExpressionWrapper(F('cantidad') * F('precio_unitario'), output_field=DecimalField())),
+    ).order_by()
+    return {
+        (fila['empresa_id'], fila['categoria_id']): (
+            fila['productos'], fila['total_cantidad'] or 0, (fila['valor'] or CERO).quantize(Decimal('0.01'))
+        )
+        for fila in filas
+    }
+
+
+@transaction.atomic
+def conciliar_totales(empresa_ids=None, categoria_ids=None, corregir=True):
+    """
+    Compara los totales guardados con los calculados y, si corregir, los
+    reemplaza. Retorna la lista de diferencias:
+    [(empresa_id, categoria_id, guardado, calculado)] con tuplas (productos, cantidad, valor).
+    """
+    calculados = totales_calculados(empresa_ids, categoria_ids)
+    guardados = TotalInventario.objects.all()
+    if empresa_ids is not None:
+        guardados = guardados.filter(empresa_id__in=empresa_ids)
+    if categoria_ids is not None:
+        guardados = guardados.filter(categoria_id__in=categoria_ids)
+    existentes = {(total.empresa_id, total.categoria_id): total for total in guardados}
+
+    diferencias = []
+    empresas_con_cambio_valor = set()
+    for clave in sorted(set(calculados) | set(existentes), key=lambda c: (c[0], c[1] or 0)):
+        calculado = calculados.get(clave, (0, 0, CERO))
+        total = existentes.get(clave)
+        guardado = (total.productos, total.cantidad, total.valor) if total else (0, 0, CERO)
+        if guardado == calculado:
+            continue
+        diferencias.append((clave[0], clave[1], guardado, calculado))
+        if not corregir:
+            continue
+        if guardado[2] != calculado[2]:
+            empresas_con_cambio_valor.add(clave[0])
+        if total:
+            total.productos, total.cantidad, total.valor = calculado
+            total.save(update_fields=['productos', 'cantidad', 'valor', 'fecha_actualizacion'])
+        else:
+            TotalInventario.objects.create(
+                empresa_id=clave[0], categoria_id=clave[1],
+                productos=calculado[0], cantidad=calculado[1], valor=calculado[2],
+            )
+    # El Balance General usa estos totales: sus reportes en caché (ETag) dejan de ser válidos
+    for empresa_id in empresas_con_cambio_valor:
+        Empresa.incrementar_version_contable(empresa_id)
+    return diferencias
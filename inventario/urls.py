@@ -10,7 +10,9 @@ urlpatterns = [
     # Productos
     path('productos/', views.lista_productos, name='lista_productos'),
     path('productos/crear/', views.crear_producto, name='crear_producto'),
+    path('productos/buscar/', views.buscar_productos_json, name='buscar_productos'),
     path('productos/importar/', views.importar_productos, name='importar_productos'),
+    path('productos/ajuste-precios/', views.ajuste_precios, name='ajuste_precios'),
     path('productos/plantilla-importacion/', views.plantilla_importacion_productos, name='plantilla_importacion_productos'),
     path('productos/<int:producto_id>/', views.detalle_producto, name='detalle_producto'),
     path('productos/<int:producto_id>/editar/', views.editar_producto, name='editar_producto'),
@@ -19,6 +21,9 @@ urlpatterns = [
     # Movimientos de inventario
     path('movimientos/', views.lista_movimientos, name='lista_movimientos'),
     path('productos/<int:producto_id>/movimiento/', views.crear_movimiento, name='crear_movimiento'),
+    path('productos/<int:producto_id>/kardex/', views.kardex_producto, name='kardex_producto'),
+    path('productos/<int:producto_id>/kardex/exportar/<str:formato>/', views.kardex_producto_exportar,
+         name='kardex_producto_exportar'),
     
     # Categorías
     path('categorias/', views.lista_categorias, name='lista_categorias'),
@@ -26,4 +31,6 @@ urlpatterns = [
     
     # Reportes
     path('reporte/', views.reporte_inventario, name='reporte_inventario'),
+    path('reporte/a-la-fecha/', views.inventario_a_la_fecha_view, name='inventario_a_la_fecha'),
+    path('reporte/analisis/', views.analisis_inventario, name='analisis_inventario'),
 ]
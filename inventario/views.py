@@ -1,22 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, Http404
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum, F
+from django.db.models import Q
 from django.db import models
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_protect
-from .models import Producto, Categoria, MovimientoInventario
-from .forms import ProductoForm, CategoriaForm, MovimientoInventarioForm, ImportarProductosForm
+from django.core.exceptions import ValidationError
+from .models import Producto, Categoria, MovimientoInventario, TotalInventario, AjustePrecios
+from .forms import ProductoForm, CategoriaForm, MovimientoInventarioForm, ImportarProductosForm, AjustePreciosForm
+from S_CONTABLE.utils import obtener_empresa_request, obtener_fechas_desde_request
+from .busqueda import buscar_productos
+from .costeo import registrar_movimiento
+from .kardex import Kardex
+from .cortes import inventario_a_la_fecha
+from .analisis import AnalisisInventario, CLASES_ABC, DIAS_ANALISIS, filas_analisis
+from .precios import aplicar_ajuste, productos_a_ajustar, vista_previa
 from openpyxl import load_workbook
 from io import BytesIO
 from decimal import Decimal
+from datetime import datetime
+import csv
 
 # Constantes para evitar duplicación
 DETALLE_PRODUCTO_URL = 'inventario:detalle_producto'
 TEMPLATE_IMPORTAR_PRODUCTOS = 'inventario/importar_productos.html'
+PRODUCTOS_POR_PAGINA_BUSQUEDA = 20
+MAX_PRODUCTOS_POR_PAGINA_BUSQUEDA = 100
+MAX_FILAS_PDF_KARDEX = 5000
+PRODUCTOS_POR_PAGINA_ANALISIS = 50
 
 def _normalizar_valores_fila(row, indice, estados_validos):
     """
@@ -72,26 +86,27 @@ def _normalizar_valores_fila(row, indice, estados_validos):
         'estado': estado,
     }
 
-def _resolver_categoria_por_nombre(nombre_categoria, crear_categorias):
+def _resolver_categoria_por_nombre(nombre_categoria, crear_categorias, empresa):
     if not nombre_categoria:
         return None
     nombre = str(nombre_categoria).strip()
     if not nombre:
         return None
-    existente = Categoria.objects.filter(nombre__iexact=nombre).first()
+    existente = Categoria.objects.de_empresa(empresa).filter(nombre__iexact=nombre).first()
     if existente:
         return existente
-    return Categoria.objects.create(nombre=nombre) if crear_categorias else None
+    return Categoria.objects.create(empresa=empresa, nombre=nombre) if crear_categorias else None
 
-def _manejar_producto(data, user, crear_categorias):
+def _manejar_producto(data, user, crear_categorias, empresa):
     """
-    Crea o actualiza un producto a partir de data normalizada.
+    Crea o actualiza un producto de la empresa a partir de data normalizada.
     Retorna una tupla (creados, actualizados) con contadores 0/1.
     """
-    categoria_obj = _resolver_categoria_por_nombre(data['categoria_nombre'], crear_categorias)
+    categoria_obj = _resolver_categoria_por_nombre(data['categoria_nombre'], crear_categorias, empresa)
 
     if data['codigo']:
         producto, creado = Producto.objects.get_or_create(
+            empresa=empresa,
             codigo=str(data['codigo']).strip(),
             defaults={
                 'nombre': data['nombre'],
@@ -114,11 +129,13 @@ def _manejar_producto(data, user, crear_categorias):
             producto.precio_venta = data['precio_venta'] or producto.precio_venta
             producto.stock_minimo = data['stock_minimo'] if data['stock_minimo'] is not None else producto.stock_minimo
             producto.estado = data['estado'] or producto.estado
+            producto.usuario_edicion = user
             producto.save()
             return 0, 1
         return 1, 0
 
     Producto.objects.create(
+        empresa=empresa,
         nombre=data['nombre'],
         descripcion=data['descripcion'],
         categoria=categoria_obj,
@@ -131,12 +148,12 @@ def _manejar_producto(data, user, crear_categorias):
     )
     return 1, 0
 
-def _procesar_hoja(ws, indice, crear_categorias, user, estados_validos):
+def _procesar_hoja(ws, indice, crear_categorias, user, estados_validos, empresa):
     creados, actualizados, errores = 0, 0, []
     for row in ws.iter_rows(min_row=2):
         try:
             data = _normalizar_valores_fila(row, indice, estados_validos)
-            c, a = _manejar_producto(data, user, crear_categorias)
+            c, a = _manejar_producto(data, user, crear_categorias, empresa)
             creados += c
             actualizados += a
         except Exception as e:
@@ -148,20 +165,20 @@ def _procesar_hoja(ws, indice, crear_categorias, user, estados_validos):
 @require_GET
 def inventario_dashboard(request):
     """Dashboard principal del inventario"""
-    productos = Producto.objects.filter(estado='activo')
+    empresa = obtener_empresa_request(request)
+    productos = Producto.objects.de_empresa(empresa).filter(estado='activo')
     
-    # Estadísticas generales
-    total_productos = productos.count()
-    valor_total_inventario = productos.aggregate(
-        total=Sum('cantidad') * Sum('precio_unitario')
-    )['total'] or 0
-    productos_bajo_stock = productos.filter(cantidad__lte=F('stock_minimo')).count()
+    # Estadísticas generales (totales mantenidos por categoría)
+    totales = TotalInventario.de_la_empresa(empresa)
+    total_productos = totales['productos']
+    valor_total_inventario = totales['valor']
+    productos_bajo_stock = productos.filter(bajo_stock=True).count()
     
     # Productos más recientes
     productos_recientes = productos.order_by('-fecha_creacion')[:5]
     
-    # Productos con bajo stock
-    productos_alerta = productos.filter(cantidad__lte=F('stock_minimo'))[:5]
+    # Productos con bajo stock (índice parcial sobre bajo_stock)
+    productos_alerta = productos.filter(bajo_stock=True)[:5]
     
     context = {
         'total_productos': total_productos,
@@ -178,17 +195,18 @@ def inventario_dashboard(request):
 @require_GET
 def lista_productos(request):
     """Lista todos los productos con filtros y paginación usando utilidades centralizadas"""
-    from S_CONTABLE.utils import aplicar_busqueda_texto, paginar_queryset
+    from S_CONTABLE.utils import paginar_queryset
     
-    productos = Producto.objects.all()
+    empresa = obtener_empresa_request(request)
+    productos = Producto.objects.de_empresa(empresa)
     
     # Filtros
     busqueda = request.GET.get('busqueda')
     categoria_id = request.GET.get('categoria')
     estado = request.GET.get('estado')
     
-    # Usar helper centralizado para búsqueda de texto
-    productos = aplicar_busqueda_texto(productos, busqueda, ['nombre', 'codigo', 'descripcion'])
+    # Búsqueda de texto completo (FTS5 en SQLite, trigramas en PostgreSQL)
+    productos = buscar_productos(productos, busqueda)
     
     if categoria_id:
         productos = productos.filter(categoria_id=categoria_id)
@@ -200,7 +218,7 @@ def lista_productos(request):
     page_obj = paginar_queryset(productos, request, items_per_page=10)
     
     # Para los filtros
-    categorias = Categoria.objects.all()
+    categorias = Categoria.objects.de_empresa(empresa)
     
     context = {
         'page_obj': page_obj,
@@ -212,12 +230,52 @@ def lista_productos(request):
     
     return render(request, 'inventario/lista_productos.html', context)
 
+@login_required
+@never_cache
+@require_GET
+def buscar_productos_json(request):
+    """
+    Búsqueda paginada de productos activos de la empresa del usuario en JSON.
+    Parámetros: q (código, nombre o descripción), page y por_pagina.
+    La usa el selector de productos de la factura de venta.
+    """
+    from S_CONTABLE.utils import paginar_queryset
+    
+    try:
+        por_pagina = int(request.GET.get('por_pagina', PRODUCTOS_POR_PAGINA_BUSQUEDA))
+    except ValueError:
+        por_pagina = PRODUCTOS_POR_PAGINA_BUSQUEDA
+    por_pagina = min(max(por_pagina, 1), MAX_PRODUCTOS_POR_PAGINA_BUSQUEDA)
+    
+    productos = Producto.objects.de_empresa(obtener_empresa_request(request)).filter(estado='activo')
+    productos = buscar_productos(productos, request.GET.get('q')).order_by('nombre', 'id').only(
+        'id', 'codigo', 'nombre', 'cantidad', 'precio_venta'
+    )
+    page_obj = paginar_queryset(productos, request, items_per_page=por_pagina)
+    
+    return JsonResponse({
+        'resultados': [
+            {
+                'id': p.id,
+                'codigo': p.codigo,
+                'nombre': p.nombre,
+                'cantidad': p.cantidad,
+                'precio_venta': str(p.precio_venta),
+            }
+            for p in page_obj
+        ],
+        'pagina': page_obj.number,
+        'paginas': page_obj.paginator.num_pages,
+        'total': page_obj.paginator.count,
+        'hay_siguiente': page_obj.has_next(),
+    })
+
 @login_required
 @never_cache
 @require_GET
 def detalle_producto(request, producto_id):
     """Muestra el detalle de un producto"""
-    producto = get_object_or_404(Producto, id=producto_id)
+    producto = get_object_or_404(Producto.objects.de_empresa(obtener_empresa_request(request)), id=producto_id)
     movimientos = producto.movimientos.all()[:10]  # Últimos 10 movimientos
     
     context = {
@@ -233,8 +291,9 @@ def detalle_producto(request, producto_id):
 @require_http_methods(['GET', 'POST'])
 def crear_producto(request):
     """Crea un nuevo producto"""
+    empresa = obtener_empresa_request(request)
     if request.method == 'POST':
-        form = ProductoForm(request.POST)
+        form = ProductoForm(request.POST, empresa=empresa)
         if form.is_valid():
             producto = form.save(commit=False)
             producto.usuario_creador = request.user
@@ -242,7 +301,7 @@ def crear_producto(request):
             messages.success(request, f'Producto "{producto.nombre}" creado exitosamente.')
             return redirect(DETALLE_PRODUCTO_URL, producto_id=producto.id)
     else:
-        form = ProductoForm()
+        form = ProductoForm(empresa=empresa)
     
     return render(request, 'inventario/crear_producto.html', {'form': form})
 
@@ -252,11 +311,13 @@ def crear_producto(request):
 @require_http_methods(['GET', 'POST'])
 def editar_producto(request, producto_id):
     """Edita un producto existente"""
-    producto = get_object_or_404(Producto, id=producto_id)
+    producto = get_object_or_404(Producto.objects.de_empresa(obtener_empresa_request(request)), id=producto_id)
     
     if request.method == 'POST':
         form = ProductoForm(request.POST, instance=producto)
         if form.is_valid():
+            # Si cambia la cantidad, el ajuste que la registra queda a nombre del usuario
+            producto.usuario_edicion = request.user
             form.save()
             messages.success(request, f'Producto "{producto.nombre}" actualizado exitosamente.')
             return redirect(DETALLE_PRODUCTO_URL, producto_id=producto.id)
@@ -268,13 +329,50 @@ def editar_producto(request, producto_id):
         'producto': producto
     })
 
+@login_required
+@never_cache
+# NOSONAR - Django CSRF protection is enabled by default for POST requests
+@require_http_methods(['GET', 'POST'])
+def ajuste_precios(request):
+    """
+    Ajuste masivo de precios por categoría, estado o códigos. 'Vista previa'
+    muestra el resumen (una agregación); 'Aplicar' ejecuta un único UPDATE.
+    """
+    empresa = obtener_empresa_request(request)
+    if not empresa:
+        messages.error(request, 'No tiene una empresa asignada.')
+        return redirect('inventario:lista_productos')
+
+    form = AjustePreciosForm(request.POST or None, empresa=empresa)
+    resumen = None
+    if request.method == 'POST' and form.is_valid():
+        datos = form.cleaned_data
+        criterios = {'categoria': datos['categoria'], 'estado': datos['estado'], 'codigos': datos['codigos']}
+        regla = {'campo': datos['campo'], 'tipo': datos['tipo'], 'valor': datos['valor'], 'redondeo': datos['redondeo']}
+        if 'aplicar' in request.POST:
+            try:
+                ajuste = aplicar_ajuste(empresa, request.user, **regla, **criterios)
+            except ValidationError as e:
+                messages.error(request, f'Error al ajustar precios: {e.messages[0]}')
+            else:
+                messages.success(request, f'{ajuste.get_campo_display()} ajustado en {ajuste.productos} productos.')
+                return redirect('inventario:ajuste_precios')
+        else:
+            resumen = vista_previa(productos_a_ajustar(empresa, **criterios), **regla)
+
+    return render(request, 'inventario/ajuste_precios.html', {
+        'form': form,
+        'resumen': resumen,
+        'ajustes': AjustePrecios.objects.de_empresa(empresa).select_related('categoria', 'usuario')[:10],
+    })
+
 @login_required
 @never_cache
 # NOSONAR - Django CSRF protection is enabled by default for POST requests
 @require_http_methods(['GET', 'POST'])
 def eliminar_producto(request, producto_id):
     """Elimina (desactiva) un producto"""
-    producto = get_object_or_404(Producto, id=producto_id)
+    producto = get_object_or_404(Producto.objects.de_empresa(obtener_empresa_request(request)), id=producto_id)
     
     if request.method == 'POST':
         producto.estado = 'inactivo'
@@ -290,7 +388,7 @@ def eliminar_producto(request, producto_id):
 @require_http_methods(['GET', 'POST'])
 def crear_movimiento(request, producto_id):
     """Crea un movimiento de inventario"""
-    producto = get_object_or_404(Producto, id=producto_id)
+    producto = get_object_or_404(Producto.objects.de_empresa(obtener_empresa_request(request)), id=producto_id)
     
     if request.method == 'POST':
         form = MovimientoInventarioForm(request.POST)
@@ -299,25 +397,17 @@ def crear_movimiento(request, producto_id):
             movimiento.producto = producto
             movimiento.usuario = request.user
             
-            # Actualizar cantidad del producto
-            if movimiento.tipo == 'entrada':
-                producto.cantidad += movimiento.cantidad
-            elif movimiento.tipo == 'salida':
-                if producto.cantidad >= movimiento.cantidad:
-                    producto.cantidad -= movimiento.cantidad
-                else:
-                    messages.error(request, 'No hay suficiente stock para realizar esta salida.')
-                    return render(request, 'inventario/crear_movimiento.html', {
-                        'form': form,
-                        'producto': producto
-                    })
-            elif movimiento.tipo == 'ajuste':
-                producto.cantidad = movimiento.cantidad
-            
-            producto.save()
-            movimiento.save()
+            # Actualizar stock y costeo (FIFO y promedio) en una sola transacción
+            try:
+                registrar_movimiento(movimiento)
+            except ValidationError:
+                messages.error(request, 'No hay suficiente stock para realizar esta salida.')
+                return render(request, 'inventario/crear_movimiento.html', {
+                    'form': form,
+                    'producto': producto
+                })
             
-            messages.success(request, f'Movimiento registrado exitosamente. Nueva cantidad: {producto.cantidad}')
+            messages.success(request, f'Movimiento registrado exitosamente. Nueva cantidad: {movimiento.producto.cantidad}')
             return redirect(DETALLE_PRODUCTO_URL, producto_id=producto.id)
     else:
         form = MovimientoInventarioForm()
@@ -334,7 +424,10 @@ def lista_movimientos(request):
     """Lista todos los movimientos de inventario con filtros usando utilidades centralizadas"""
     from S_CONTABLE.utils import aplicar_filtros_fecha, paginar_queryset
     
-    movimientos = MovimientoInventario.objects.select_related('producto', 'usuario').all().order_by('-fecha')
+    empresa = obtener_empresa_request(request)
+    movimientos = MovimientoInventario.objects.de_empresa(empresa).select_related(
+        'producto', 'usuario'
+    ).order_by('-fecha')
     
     # Filtros
     producto_id = request.GET.get('producto')
@@ -355,7 +448,7 @@ def lista_movimientos(request):
     page_obj = paginar_queryset(movimientos, request, items_per_page=20)
     
     # Productos para el filtro
-    productos = Producto.objects.filter(estado='activo').order_by('nombre')
+    productos = Producto.objects.de_empresa(empresa).filter(estado='activo').order_by('nombre')
     
     context = {
         'page_obj': page_obj,
@@ -373,7 +466,7 @@ def lista_movimientos(request):
 @require_GET
 def lista_categorias(request):
     """Lista todas las categorías"""
-    categorias = Categoria.objects.all()
+    categorias = Categoria.objects.de_empresa(obtener_empresa_request(request))
     return render(request, 'inventario/lista_categorias.html', {'categorias': categorias})
 
 @login_required
@@ -382,14 +475,15 @@ def lista_categorias(request):
 @require_http_methods(['GET', 'POST'])
 def crear_categoria(request):
     """Crea una nueva categoría"""
+    empresa = obtener_empresa_request(request)
     if request.method == 'POST':
-        form = CategoriaForm(request.POST)
+        form = CategoriaForm(request.POST, empresa=empresa)
         if form.is_valid():
             categoria = form.save()
             messages.success(request, f'Categoría "{categoria.nombre}" creada exitosamente.')
             return redirect('inventario:lista_categorias')
     else:
-        form = CategoriaForm()
+        form = CategoriaForm(empresa=empresa)
     
     return render(request, 'inventario/crear_categoria.html', {'form': form})
 
@@ -398,22 +492,178 @@ def crear_categoria(request):
 @require_GET
 def reporte_inventario(request):
     """Genera reporte de inventario"""
-    productos = Producto.objects.filter(estado='activo')
+    empresa = obtener_empresa_request(request)
+    productos = Producto.objects.de_empresa(empresa).filter(estado='activo').select_related('categoria')
     
-    # Estadísticas
-    total_productos = productos.count()
-    valor_total = sum(p.valor_total for p in productos)
-    productos_bajo_stock = productos.filter(cantidad__lte=F('stock_minimo'))
+    # Estadísticas: totales mantenidos por categoría, sin recorrer los productos
+    totales = TotalInventario.de_la_empresa(empresa)
+    productos_bajo_stock = productos.filter(bajo_stock=True)
     
     context = {
         'productos': productos,
-        'total_productos': total_productos,
-        'valor_total': valor_total,
+        'total_productos': totales['productos'],
+        'valor_total': totales['valor'],
+        'totales_categorias': totales['categorias'],
         'productos_bajo_stock': productos_bajo_stock,
     }
     
     return render(request, 'inventario/reporte_inventario.html', context)
 
+@login_required
+@never_cache
+@require_GET
+def inventario_a_la_fecha_view(request):
+    """Existencia y valor del inventario al final de una fecha pasada (?fecha=AAAA-MM-DD)"""
+    from S_CONTABLE.utils import parsear_fecha
+
+    empresa = obtener_empresa_request(request)
+    fecha = parsear_fecha(request.GET.get('fecha'))
+    reporte = inventario_a_la_fecha(empresa, fecha) if empresa and fecha else None
+    return render(request, 'inventario/inventario_a_la_fecha.html', {
+        'reporte': reporte,
+        'fecha': request.GET.get('fecha', ''),
+    })
+
+@login_required
+@never_cache
+@require_GET
+def analisis_inventario(request):
+    """Clasificación ABC y rotación de los productos (?fecha=, ?dias=, ?clase=), calculada una vez por día"""
+    from S_CONTABLE.utils import parsear_fecha
+
+    empresa = obtener_empresa_request(request)
+    if not empresa:
+        messages.error(request, 'No tiene una empresa asignada.')
+        return redirect('inventario:dashboard')
+    try:
+        dias = min(max(int(request.GET.get('dias') or DIAS_ANALISIS), 1), 3650)
+    except ValueError:
+        dias = DIAS_ANALISIS
+    clase = request.GET.get('clase', '')
+
+    analisis = AnalisisInventario(empresa, parsear_fecha(request.GET.get('fecha')), dias).generar_con_cache()
+    posiciones = range(len(analisis['ids']))
+    if clase in CLASES_ABC:
+        posiciones = (analisis['clases'] == CLASES_ABC.index(clase)).nonzero()[0]
+    pagina = Paginator(posiciones, PRODUCTOS_POR_PAGINA_ANALISIS).get_page(request.GET.get('page'))
+
+    return render(request, 'inventario/analisis_inventario.html', {
+        'analisis': analisis,
+        'filas': filas_analisis(analisis, list(pagina.object_list)),
+        'pagina': pagina,
+        'clases': CLASES_ABC,
+        'clase': clase,
+        'dias': dias,
+        'fecha': request.GET.get('fecha', ''),
+    })
+
+@login_required
+@never_cache
+@require_GET
+def kardex_producto(request, producto_id):
+    """Kardex del producto: movimientos con saldo acumulado, paginado por llave (?despues=<id>)"""
+    producto = get_object_or_404(Producto.objects.de_empresa(obtener_empresa_request(request)), id=producto_id)
+    fecha_inicio, fecha_fin = obtener_fechas_desde_request(request)
+    try:
+        despues = int(request.GET.get('despues') or 0)
+    except ValueError:
+        despues = 0
+
+    kardex = Kardex(producto, fecha_inicio, fecha_fin).pagina(despues=despues or None)
+    return render(request, 'inventario/kardex.html', {
+        'producto': producto,
+        'kardex': kardex,
+        'es_primera_pagina': not despues,
+        'fecha_inicio': request.GET.get('fecha_inicio', ''),
+        'fecha_fin': request.GET.get('fecha_fin', ''),
+    })
+
+
+class _Eco:
+    """Pseudo-buffer que devuelve lo escrito; permite usar csv.writer en streaming"""
+
+    def write(self, valor):
+        return valor
+
+
+def _kardex_csv(kardex, saldo):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([
+        'fecha', 'tipo', 'motivo', 'entrada', 'salida', 'costo_unitario', 'costo_total',
+        'saldo_cantidad', 'saldo_valor', 'costo_promedio',
+    ])
+    yield escritor.writerow(['', 'saldo_anterior', '', '', '', '', '', saldo[0], saldo[1], ''])
+    for fila in kardex.filas(saldo):
+        yield escritor.writerow([
+            fila['fecha'].isoformat(), fila['tipo'], fila['motivo'], fila['entrada'], fila['salida'],
+            fila['costo_unitario'], fila['costo_total'], fila['saldo_cantidad'], fila['saldo_valor'],
+            fila['costo_promedio'],
+        ])
+
+
+def _kardex_pdf(kardex, saldo, producto):
+    from S_CONTABLE.pdf_utils import GeneradorPDF, formatear_moneda
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph
+
+    titulo = f"Kardex - {producto.codigo} {producto.nombre}"
+    generador = GeneradorPDF(titulo, orientacion='landscape')
+    periodo = generador.generar_periodo_texto(kardex.fecha_inicio, kardex.fecha_fin)
+    generador.agregar_encabezado(producto.empresa, titulo, periodo)
+
+    data = [['Fecha', 'Motivo', 'Entrada', 'Salida', 'Costo Unit.', 'Costo Total', 'Saldo', 'Valor Saldo']]
+    data.append(['', 'Saldo anterior', '', '', '', '', saldo[0], formatear_moneda(saldo[1])])
+    truncado = False
+    for numero, fila in enumerate(kardex.filas(saldo)):
+        if numero >= MAX_FILAS_PDF_KARDEX:
+            truncado = True
+            break
+        data.append([
+            fila['fecha'].strftime('%d/%m/%Y %H:%M'),
+            fila['motivo'][:35],
+            fila['entrada'] or '',
+            fila['salida'] or '',
+            formatear_moneda(fila['costo_unitario']),
+            formatear_moneda(fila['costo_total']),
+            fila['saldo_cantidad'],
+            formatear_moneda(fila['saldo_valor']),
+        ])
+    cantidad_final, valor_final = kardex.saldo_final()
+    data.append(['', 'SALDO FINAL', '', '', '', '', cantidad_final, formatear_moneda(valor_final)])
+
+    anchos = [1.2*inch, 2.6*inch, 0.7*inch, 0.7*inch, 1*inch, 1.1*inch, 0.8*inch, 1.2*inch]
+    generador.agregar_tabla(data, anchos)
+    if truncado:
+        generador.agregar_espaciador()
+        generador.elements.append(Paragraph(
+            f"Se muestran los primeros {MAX_FILAS_PDF_KARDEX} movimientos; exporte a CSV para el detalle completo.",
+            generador.subtitle_style,
+        ))
+    return generador.construir()
+
+
+@login_required
+@never_cache
+@require_GET
+def kardex_producto_exportar(request, producto_id, formato):
+    """Exporta el kardex del producto: CSV en streaming (sin límite de filas) o PDF"""
+    if formato not in ('csv', 'pdf'):
+        raise Http404('Formato no soportado')
+    producto = get_object_or_404(
+        Producto.objects.de_empresa(obtener_empresa_request(request)).select_related('empresa'), id=producto_id
+    )
+    fecha_inicio, fecha_fin = obtener_fechas_desde_request(request)
+    kardex = Kardex(producto, fecha_inicio, fecha_fin)
+    saldo = kardex.saldo_inicial()
+    nombre = f"kardex_{producto.codigo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+
+    if formato == 'csv':
+        response = StreamingHttpResponse(_kardex_csv(kardex, saldo), content_type='text/csv; charset=utf-8')
+    else:
+        response = HttpResponse(_kardex_pdf(kardex, saldo, producto), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
 @login_required
 @never_cache
 @require_http_methods(['GET', 'POST'])
@@ -441,7 +691,8 @@ def importar_productos(request):
 
         estados_validos = set(dict(Producto.ESTADO_CHOICES).keys())
         creados, actualizados, errores = _procesar_hoja(
-            ws, indice, form.cleaned_data.get('crear_categorias', True), request.user, estados_validos
+            ws, indice, form.cleaned_data.get('crear_categorias', True), request.user, estados_validos,
+            obtener_empresa_request(request)
         )
 
         if creados or actualizados:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Comprobante, DetalleComprobante
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante
 
 class DetalleComprobanteInline(admin.TabularInline):
     model = DetalleComprobante
@@ -24,3 +24,14 @@ class DetalleComprobanteAdmin(admin.ModelAdmin):
     list_display = ('comprobante', 'cuenta', 'descripcion', 'debito', 'credito')
     list_filter = ('comprobante__empresa', 'comprobante__tipo')
     search_fields = ('descripcion', 'cuenta__nombre', 'cuenta__codigo')
+
+@admin.register(BloqueoPeriodo)
+class BloqueoPeriodoAdmin(admin.ModelAdmin):
+    list_display = ('empresa', 'fecha_hasta', 'usuario', 'fecha_creacion')
+    list_filter = ('empresa',)
+    readonly_fields = ('usuario', 'fecha_creacion')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.usuario = request.user
+        super().save_model(request, obj, form, change)
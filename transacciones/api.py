@@ -0,0 +1,265 @@
+"""
+API REST de transacciones contables.
+"""
+import csv
+import json
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from cuentas.api import obtener_empresa_api, ERROR_SIN_EMPRESA
+from S_CONTABLE.utils import obtener_fechas_desde_request
+from .busqueda import buscar_comprobantes
+from .carga_masiva import CargaMasivaComprobantes
+from .models import DetalleComprobante, RegistroCambio
+
+CONTENT_TYPE_NDJSON = 'application/x-ndjson'
+TAMANO_CHUNK_EXPORTACION = 2000
+LIMITE_CAMBIOS_DEFECTO = 500
+LIMITE_CAMBIOS_MAXIMO = 5000
+# Los cambios más recientes aún pueden tener transacciones sin confirmar con ids menores
+RETRASO_CAMBIOS = timedelta(seconds=60)
+RESULTADOS_BUSQUEDA_DEFECTO = 20
+RESULTADOS_BUSQUEDA_MAXIMO = 100
+
+# Columnas exportadas: (nombre en la salida, campo del ORM)
+COLUMNAS_EXPORTACION = [
+    ('id', 'id'),
+    ('comprobante_id', 'comprobante_id'),
+    ('comprobante_tipo', 'comprobante__tipo'),
+    ('comprobante_numero', 'comprobante__numero'),
+    ('comprobante_fecha', 'comprobante__fecha'),
+    ('comprobante_descripcion', 'comprobante__descripcion'),
+    ('cuenta_codigo', 'cuenta__codigo'),
+    ('cuenta_nombre', 'cuenta__nombre'),
+    ('descripcion', 'descripcion'),
+    ('debito', 'debito'),
+    ('credito', 'credito'),
+    ('orden', 'orden'),
+]
+
+
+def _leer_ndjson(request):
+    """
+    Genera los comprobantes de un cuerpo NDJSON línea por línea,
+    sin cargar todo el cuerpo en memoria. request.stream es None si no hay cuerpo.
+    """
+    for linea in request.stream or ():
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError:
+            # Se reporta como comprobante con formato inválido en su índice
+            yield None
+
+
+def _leer_json(request):
+    """Obtiene la lista de comprobantes de un cuerpo JSON (lista u objeto con 'comprobantes')"""
+    datos = request.data
+    if isinstance(datos, dict):
+        datos = datos.get('comprobantes')
+    if not isinstance(datos, list):
+        raise ValueError("Se esperaba una lista de comprobantes o un objeto con la clave 'comprobantes'")
+    return datos
+
+
+class ComprobantesBulkView(APIView):
+    """
+    Carga masiva de comprobantes.
+
+    Acepta JSON (lista u objeto {"comprobantes": [...]}) o NDJSON
+    (Content-Type: application/x-ndjson, un comprobante por línea).
+    El encabezado Idempotency-Key identifica la solicitud: los comprobantes sin
+    clave propia reciben '<Idempotency-Key>:<índice>' y los reintentos no duplican.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.content_type.split(';')[0].strip() == CONTENT_TYPE_NDJSON:
+            comprobantes = _leer_ndjson(request)
+        else:
+            try:
+                comprobantes = _leer_json(request)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        carga = CargaMasivaComprobantes(
+            empresa,
+            usuario=request.user,
+            clave_solicitud=request.headers.get('Idempotency-Key'),
+        )
+        resumen = carga.procesar(comprobantes)
+        codigo = status.HTTP_201_CREATED if resumen['creados'] else status.HTTP_200_OK
+        return Response(resumen, status=codigo)
+
+
+class _Eco:
+    """Pseudo-buffer que devuelve lo escrito; permite usar csv.writer en streaming"""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas_exportacion(empresa, fecha_inicio, fecha_fin):
+    """
+    Itera las líneas aprobadas de la empresa con un cursor del lado del servidor.
+    Solo se mantienen en memoria TAMANO_CHUNK_EXPORTACION filas a la vez.
+    """
+    detalles = DetalleComprobante.objects.filter(
+        comprobante__empresa=empresa,
+        comprobante__estado='APROBADO'
+    )
+    if fecha_inicio:
+        detalles = detalles.filter(comprobante__fecha__gte=fecha_inicio)
+    if fecha_fin:
+        detalles = detalles.filter(comprobante__fecha__lte=fecha_fin)
+
+    campos = [campo for _, campo in COLUMNAS_EXPORTACION]
+    return detalles.order_by('comprobante__fecha', 'comprobante_id', 'orden', 'id').values_list(
+        *campos
+    ).iterator(chunk_size=TAMANO_CHUNK_EXPORTACION)
+
+
+def _generar_csv(filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([nombre for nombre, _ in COLUMNAS_EXPORTACION])
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def _generar_ndjson(filas):
+    nombres = [nombre for nombre, _ in COLUMNAS_EXPORTACION]
+    for fila in filas:
+        yield json.dumps(dict(zip(nombres, fila)), default=str, ensure_ascii=False) + '\n'
+
+
+class ExportarDetallesView(APIView):
+    """
+    Exporta en streaming las líneas de comprobantes aprobados como NDJSON o CSV.
+    Parámetros: formato (ndjson|csv), fecha_inicio, fecha_fin.
+    La memoria usada es constante sin importar el tamaño del rango.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        formato = request.GET.get('formato', 'ndjson')
+        if formato not in ('ndjson', 'csv'):
+            return Response({"detail": "Formato inválido. Use ndjson o csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fecha_inicio, fecha_fin = obtener_fechas_desde_request(request)
+        filas = _filas_exportacion(empresa, fecha_inicio, fecha_fin)
+
+        if formato == 'csv':
+            response = StreamingHttpResponse(_generar_csv(filas), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(_generar_ndjson(filas), content_type=CONTENT_TYPE_NDJSON)
+        response['Content-Disposition'] = f'attachment; filename="detalles_{empresa.id}.{formato}"'
+        return response
+
+
+def _entero_parametro(valor, defecto):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+class CambiosView(APIView):
+    """
+    Historial incremental de cambios de la empresa.
+    GET /api/changes/?since=<id>&limit=<n> retorna los registros con id > since
+    en orden creciente; el cliente guarda 'siguiente' y lo envía en la próxima
+    consulta. Usa el índice (empresa, id), por lo que no recorre toda la tabla.
+
+    Los ids se asignan al insertar, no al confirmar: una transacción lenta puede
+    confirmar un id menor que otro ya visible. Para que el cursor no lo salte,
+    la respuesta se corta en el primer registro con menos de RETRASO_CAMBIOS de
+    antigüedad; esos registros se entregan en una consulta posterior.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        desde = max(_entero_parametro(request.GET.get('since'), 0), 0)
+        limite = _entero_parametro(request.GET.get('limit'), LIMITE_CAMBIOS_DEFECTO)
+        limite = min(max(limite, 1), LIMITE_CAMBIOS_MAXIMO)
+
+        registros = list(
+            RegistroCambio.objects.filter(empresa=empresa, id__gt=desde)
+            .order_by('id')
+            .values('id', 'entidad', 'objeto_id', 'accion', 'fecha')[:limite + 1]
+        )
+        # Se corta en el primer registro reciente (no en cada uno) para no avanzar el cursor más allá de él
+        limite_fecha = timezone.now() - RETRASO_CAMBIOS
+        recientes = next((i for i, registro in enumerate(registros) if registro['fecha'] >= limite_fecha), None)
+        if recientes is not None:
+            registros = registros[:recientes]
+        hay_mas = len(registros) > limite
+        registros = registros[:limite]
+
+        return Response({
+            'resultados': registros,
+            'siguiente': registros[-1]['id'] if registros else desde,
+            'hay_mas': hay_mas,
+        })
+
+
+class BusquedaComprobantesView(APIView):
+    """
+    Búsqueda de texto en comprobantes y sus detalles, ordenada por relevancia.
+    GET /api/comprobantes/buscar/?q=<texto>&fecha_inicio=&fecha_fin=&page=&por_pagina=
+    Cada palabra se busca como prefijo y todas deben aparecer en el número, la
+    descripción del comprobante o la descripción de alguna de sus líneas.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        empresa = obtener_empresa_api(request)
+        if not empresa:
+            return Response({"detail": ERROR_SIN_EMPRESA}, status=status.HTTP_404_NOT_FOUND)
+
+        texto = request.GET.get('q', '').strip()
+        if not texto:
+            return Response({"detail": "Debe indicar el texto a buscar en 'q'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fecha_inicio, fecha_fin = obtener_fechas_desde_request(request)
+        pagina = max(_entero_parametro(request.GET.get('page'), 1), 1)
+        por_pagina = _entero_parametro(request.GET.get('por_pagina'), RESULTADOS_BUSQUEDA_DEFECTO)
+        por_pagina = min(max(por_pagina, 1), RESULTADOS_BUSQUEDA_MAXIMO)
+
+        busqueda = buscar_comprobantes(empresa, texto, fecha_inicio, fecha_fin, pagina, por_pagina)
+        return Response({
+            'resultados': [
+                {
+                    'id': comprobante.id,
+                    'numero': comprobante.numero,
+                    'fecha': comprobante.fecha,
+                    'tipo': comprobante.tipo,
+                    'estado': comprobante.estado,
+                    'descripcion': comprobante.descripcion,
+                    'puntaje': comprobante.puntaje,
+                }
+                for comprobante in busqueda['resultados']
+            ],
+            'total': busqueda['total'],
+            'pagina': busqueda['pagina'],
+            'paginas': busqueda['paginas'],
+            'hay_siguiente': busqueda['pagina'] < busqueda['paginas'],
+        })
@@ -0,0 +1,149 @@
+"""
+Aprobación y anulación de comprobantes por lotes.
+
+Pensado para el cierre de mes, cuando hay miles de borradores creados por
+importaciones: el balance de todos los comprobantes se valida con una sola
+consulta agrupada sobre sus detalles y los válidos cambian de estado con un
+único UPDATE. Los comprobantes que no se pueden procesar se retornan con el
+motivo, sin detener el resto del lote.
+"""
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from empresa.models import Empresa
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, RegistroCambio, AccionCambio
+
+ERROR_NO_EXISTE = 'El comprobante no existe o no pertenece a la empresa'
+ERROR_PERIODO_BLOQUEADO = 'El comprobante pertenece a un período bloqueado'
+
+
+def _resultado():
+    return {'procesados': [], 'fallidos': []}
+
+
+def _fallido(resultado, comprobante_id, numero, error):
+    resultado['fallidos'].append({'id': comprobante_id, 'numero': numero, 'error': error})
+
+
+def _bloquear_comprobantes(empresa, comprobante_ids, resultado):
+    """
+    Carga (y bloquea en motores que lo soportan) los comprobantes del lote.
+    Los ids que no pertenecen a la empresa (o todos, si no hay empresa) o caen
+    en un período bloqueado se registran como fallidos.
+    """
+    comprobantes = {
+        fila['id']: fila
+        for fila in Comprobante.objects.de_empresa(empresa)
+        .filter(id__in=comprobante_ids)
+        .select_for_update()
+        .values('id', 'numero', 'estado', 'fecha')
+    }
+    bloqueo = BloqueoPeriodo.vigente(empresa.id) if empresa else None
+    for comprobante_id in comprobante_ids:
+        fila = comprobantes.get(comprobante_id)
+        if fila is None:
+            _fallido(resultado, comprobante_id, None, ERROR_NO_EXISTE)
+        elif bloqueo and fila['fecha'] <= bloqueo.fecha_hasta:
+            _fallido(resultado, comprobante_id, fila['numero'], ERROR_PERIODO_BLOQUEADO)
+            del comprobantes[comprobante_id]
+    return comprobantes
+
+
+def _suma_detalles(campo):
+    """Subconsulta con la suma de un campo de los detalles del comprobante"""
+    return Coalesce(
+        Subquery(
+            DetalleComprobante.objects.filter(comprobante=OuterRef('pk'))
+            .values('comprobante')
+            .annotate(total=Sum(campo))
+            .values('total')
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def _registrar_cambio_estado(empresa, comprobante_ids, accion):
+    """El UPDATE masivo no dispara señales: versión e historial se actualizan aquí"""
+    if not comprobante_ids:
+        return
+    Empresa.incrementar_version_contable(empresa.id)
+    RegistroCambio.registrar_lote(empresa.id, 'comprobante', comprobante_ids, accion)
+
+
+@transaction.atomic
+def aprobar_comprobantes_lote(empresa, comprobante_ids):
+    """
+    Aprueba los comprobantes en borrador que estén balanceados.
+    Retorna {'procesados': [ids], 'fallidos': [{'id', 'numero', 'error'}]}.
+    """
+    resultado = _resultado()
+    comprobante_ids = list(dict.fromkeys(comprobante_ids))
+    comprobantes = _bloquear_comprobantes(empresa, comprobante_ids, resultado)
+
+    borradores = []
+    for comprobante_id, fila in comprobantes.items():
+        if fila['estado'] != 'BORRADOR':
+            _fallido(resultado, comprobante_id, fila['numero'], 'Solo se pueden aprobar comprobantes en estado BORRADOR')
+        else:
+            borradores.append(comprobante_id)
+
+    # Totales de todos los borradores con una sola consulta agrupada
+    totales = {
+        fila['comprobante_id']: (fila['debito'], fila['credito'])
+        for fila in DetalleComprobante.objects.filter(comprobante_id__in=borradores)
+        .values('comprobante_id')
+        .annotate(debito=Sum('debito'), credito=Sum('credito'))
+        .order_by()
+    }
+
+    validos = []
+    for comprobante_id in borradores:
+        debito, credito = totales.get(comprobante_id, (0, 0))
+        numero = comprobantes[comprobante_id]['numero']
+        if not debito:
+            _fallido(resultado, comprobante_id, numero, 'El comprobante debe tener al menos un movimiento')
+        elif debito != credito:
+            _fallido(resultado, comprobante_id, numero, 'Los débitos no son iguales a los créditos')
+        else:
+            validos.append(comprobante_id)
+
+    if validos:
+        # Un único UPDATE: estado, fecha de aprobación y totales recalculados desde los detalles
+        Comprobante.objects.filter(id__in=validos).update(
+            estado='APROBADO',
+            fecha_aprobacion=timezone.now(),
+            total_debito=_suma_detalles('debito'),
+            total_credito=_suma_detalles('credito'),
+        )
+        _registrar_cambio_estado(empresa, validos, AccionCambio.APROBADO)
+
+    resultado['procesados'] = validos
+    return resultado
+
+
+@transaction.atomic
+def anular_comprobantes_lote(empresa, comprobante_ids):
+    """
+    Anula los comprobantes que no estén anulados.
+    Retorna {'procesados': [ids], 'fallidos': [{'id', 'numero', 'error'}]}.
+    """
+    resultado = _resultado()
+    comprobante_ids = list(dict.fromkeys(comprobante_ids))
+    comprobantes = _bloquear_comprobantes(empresa, comprobante_ids, resultado)
+
+    validos = []
+    for comprobante_id, fila in comprobantes.items():
+        if fila['estado'] == 'ANULADO':
+            _fallido(resultado, comprobante_id, fila['numero'], 'El comprobante ya está anulado')
+        else:
+            validos.append(comprobante_id)
+
+    if validos:
+        Comprobante.objects.filter(id__in=validos).update(estado='ANULADO')
+        _registrar_cambio_estado(empresa, validos, AccionCambio.ANULADO)
+
+    resultado['procesados'] = validos
+    return resultado
@@ -0,0 +1,260 @@
+"""
+Búsqueda de texto completo en comprobantes y sus líneas.
+
+Según el motor de base de datos:
+- SQLite: tabla virtual FTS5 (transacciones_comprobante_fts) con una fila por
+  comprobante: número, descripción y las descripciones de sus detalles. Se
+  sincroniza con las señales de Comprobante y DetalleComprobante.
+- PostgreSQL: tabla transacciones_comprobante_busqueda con un tsvector por
+  comprobante (número, descripción y descripciones de sus detalles, con pesos
+  A, B y C) e índice GIN; se sincroniza igual que FTS5 y el ranking usa ts_rank.
+- Otros motores: búsqueda con icontains, ordenada por fecha.
+
+Los resultados se limitan a una empresa y opcionalmente a un rango de fechas.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLA_FTS = 'transacciones_comprobante_fts'
+TABLA_BUSQUEDA_PG = 'transacciones_comprobante_busqueda'
+CONFIGURACION_PG = 'simple'
+PATRON_TERMINO = re.compile(r'\w+', re.UNICODE)
+TAMANO_LOTE_INDICE = 500
+
+# Peso de cada columna FTS5 en bm25: número, descripción del comprobante, detalles
+PESOS_BM25 = (3.0, 2.0, 1.0)
+
+
+def usa_fts5(conexion=None):
+    return (conexion or connection).vendor == 'sqlite'
+
+
+def usa_indice(conexion=None):
+    """True si el motor mantiene un índice de búsqueda propio (FTS5 o tsvector)"""
+    return (conexion or connection).vendor in ('sqlite', 'postgresql')
+
+
+def _terminos(texto):
+    return PATRON_TERMINO.findall(texto or '')
+
+
+def _consulta_fts5(terminos):
+    return ' AND '.join(f'"{t}"*' for t in terminos)
+
+
+def _consulta_tsquery(terminos):
+    return ' & '.join(f"'{t}':*" for t in terminos)
+
+
+# ============================================
+# SINCRONIZACIÓN DEL ÍNDICE (SQLite FTS5 / PostgreSQL)
+# ============================================
+
+SQL_FILAS_INDICE = (
+    "SELECT c.id, c.numero, c.descripcion, "
+    "COALESCE((SELECT group_concat(d.descripcion, ' ') FROM transacciones_detallecomprobante d "
+    "WHERE d.comprobante_id = c.id), '') "
+    "FROM transacciones_comprobante c"
+)
+
+
+SQL_FILAS_INDICE_PG = (
+    f"SELECT c.id, "
+    f"setweight(to_tsvector('{CONFIGURACION_PG}', c.numero), 'A') || "
+    f"setweight(to_tsvector('{CONFIGURACION_PG}', c.descripcion), 'B') || "
+    f"setweight(to_tsvector('{CONFIGURACION_PG}', COALESCE((SELECT string_agg(d.descripcion, ' ') "
+    "FROM transacciones_detallecomprobante d WHERE d.comprobante_id = c.id), '')), 'C') "
+    "FROM transacciones_comprobante c"
+)
+
+
+def _sql_indice(conexion):
+    """(tabla, columnas, SELECT de filas, columna del id) del índice según el motor"""
+    if usa_fts5(conexion):
+        return TABLA_FTS, 'rowid, numero, descripcion, detalles', SQL_FILAS_INDICE, 'rowid'
+    return TABLA_BUSQUEDA_PG, 'comprobante_id, vector', SQL_FILAS_INDICE_PG, 'comprobante_id'
+
+
+def crear_indice_fts(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+        "numero, descripcion, detalles, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def reconstruir_indice(conexion=None):
+    """
+    Reconstruye el índice completo desde comprobantes y detalles.
+    Retorna la cantidad de comprobantes indexados.
+    """
+    conexion = conexion or connection
+    if not usa_indice(conexion):
+        return 0
+    tabla, columnas, filas, _ = _sql_indice(conexion)
+    with conexion.cursor() as cursor:
+        if usa_fts5(conexion):
+            crear_indice_fts(cursor)
+        cursor.execute(f'DELETE FROM {tabla}')
+        cursor.execute(f'INSERT INTO {tabla} ({columnas}) {filas}')
+        return cursor.rowcount
+
+
+def indexar_comprobantes(comprobante_ids):
+    """
+    Reconstruye las filas del índice de los comprobantes indicados con una
+    sentencia por lote (incluye las descripciones de todos sus detalles).
+    """
+    if not usa_indice():
+        return
+    tabla, columnas, filas, clave = _sql_indice(connection)
+    ids = [i for i in comprobante_ids if i]
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), TAMANO_LOTE_INDICE):
+            lote = ids[inicio:inicio + TAMANO_LOTE_INDICE]
+            marcadores = ', '.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM {tabla} WHERE {clave} IN ({marcadores})', lote)
+            cursor.execute(f'INSERT INTO {tabla} ({columnas}) {filas} WHERE c.id IN ({marcadores})', lote)
+
+
+def desindexar_comprobante(comprobante_id):
+    if not usa_indice():
+        return
+    tabla, _, _, clave = _sql_indice(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {clave} = %s', [comprobante_id])
+
+
+# ============================================
+# CONSULTAS
+# ============================================
+
+def filtrar_comprobantes(queryset, texto):
+    """
+    Filtra un queryset de comprobantes por texto en el número, la descripción
+    o las descripciones de sus detalles, usando el índice del motor.
+    """
+    terminos = _terminos(texto)
+    if not (texto or '').strip():
+        return queryset
+    if not terminos:
+        return queryset.none()
+
+    if usa_fts5():
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', [_consulta_fts5(terminos)]
+        ))
+
+    if connection.vendor == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT comprobante_id FROM {TABLA_BUSQUEDA_PG} "
+            f"WHERE vector @@ to_tsquery('{CONFIGURACION_PG}', %s)",
+            [_consulta_tsquery(terminos)]
+        ))
+
+    filtro = Q()
+    for termino in terminos:
+        filtro &= (Q(numero__icontains=termino) | Q(descripcion__icontains=termino)
+                   | Q(detalles__descripcion__icontains=termino))
+    return queryset.filter(filtro).distinct()
+
+
+def _condiciones_comprobante(empresa_id, fecha_inicio, fecha_fin):
+    condiciones = ['c.empresa_id = %s']
+    parametros = [empresa_id]
+    if fecha_inicio:
+        condiciones.append('c.fecha >= %s')
+        parametros.append(fecha_inicio)
+    if fecha_fin:
+        condiciones.append('c.fecha <= %s')
+        parametros.append(fecha_fin)
+    return ' AND '.join(condiciones), parametros
+
+
+def _buscar_sqlite(terminos, filtro, parametros, limite, desplazamiento):
+    consulta = _consulta_fts5(terminos)
+    pesos = ', '.join(str(p) for p in PESOS_BM25)
+    # CROSS JOIN obliga a SQLite a resolver primero la consulta FTS y buscar cada
+    # coincidencia por id; con JOIN podría recorrer los comprobantes de la empresa
+    # y repetir la consulta FTS por cada uno
+    desde = (
+        f'FROM {TABLA_FTS} f CROSS JOIN transacciones_comprobante c ON c.id = f.rowid '
+        f'WHERE {TABLA_FTS} MATCH %s AND {filtro}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) {desde}', [consulta, *parametros])
+        total = cursor.fetchone()[0]
+        # bm25 es menor cuanto más relevante: se invierte el signo para el puntaje
+        cursor.execute(
+            f'SELECT c.id, -bm25({TABLA_FTS}, {pesos}) AS puntaje {desde} '
+            'ORDER BY puntaje DESC, c.fecha DESC, c.id DESC LIMIT %s OFFSET %s',
+            [consulta, *parametros, limite, desplazamiento]
+        )
+        return cursor.fetchall(), total
+
+
+def _buscar_postgresql(terminos, filtro, parametros, limite, desplazamiento):
+    consulta = _consulta_tsquery(terminos)
+    desde = (
+        f"FROM {TABLA_BUSQUEDA_PG} b JOIN transacciones_comprobante c ON c.id = b.comprobante_id, "
+        f"to_tsquery('{CONFIGURACION_PG}', %s) q WHERE b.vector @@ q AND {filtro}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) {desde}', [consulta, *parametros])
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT c.id, ts_rank(b.vector, q) AS puntaje {desde} '
+            'ORDER BY puntaje DESC, c.fecha DESC, c.id DESC LIMIT %s OFFSET %s',
+            [consulta, *parametros, limite, desplazamiento]
+        )
+        return cursor.fetchall(), total
+
+
+def buscar_comprobantes(empresa, texto, fecha_inicio=None, fecha_fin=None, pagina=1, por_pagina=20):
+    """
+    Búsqueda ordenada por relevancia.
+
+    Retorna un diccionario con la lista de comprobantes de la página (cada uno
+    con el atributo puntaje), el total de coincidencias y los datos de paginación.
+    """
+    from .models import Comprobante
+
+    pagina = max(int(pagina), 1)
+    terminos = _terminos(texto)
+    filas, total = [], 0
+
+    if terminos and empresa:
+        filtro, parametros = _condiciones_comprobante(empresa.id, fecha_inicio, fecha_fin)
+        desplazamiento = (pagina - 1) * por_pagina
+        if usa_fts5():
+            filas, total = _buscar_sqlite(terminos, filtro, parametros, por_pagina, desplazamiento)
+        elif connection.vendor == 'postgresql':
+            filas, total = _buscar_postgresql(terminos, filtro, parametros, por_pagina, desplazamiento)
+        else:
+            comprobantes = filtrar_comprobantes(Comprobante.objects.de_empresa(empresa), texto)
+            if fecha_inicio:
+                comprobantes = comprobantes.filter(fecha__gte=fecha_inicio)
+            if fecha_fin:
+                comprobantes = comprobantes.filter(fecha__lte=fecha_fin)
+            total = comprobantes.count()
+            ids = comprobantes.order_by('-fecha', '-id').values_list('id', flat=True)
+            filas = [(i, None) for i in ids[desplazamiento:desplazamiento + por_pagina]]
+
+    puntajes = dict(filas)
+    por_id = Comprobante.objects.select_related('empresa').in_bulk(list(puntajes))
+    resultados = []
+    for comprobante_id, puntaje in filas:
+        comprobante = por_id.get(comprobante_id)
+        if comprobante:
+            comprobante.puntaje = puntaje
+            resultados.append(comprobante)
+
+    return {
+        'resultados': resultados,
+        'total': total,
+        'pagina': pagina,
+        'paginas': max((total + por_pagina - 1) // por_pagina, 1),
+    }
@@ -0,0 +1,264 @@
+"""
+Carga masiva de comprobantes contables.
+Recibe miles de comprobantes (por ejemplo desde un POS externo), los valida en
+memoria contra un mapa de cuentas precargado y los inserta por lotes con
+bulk_create, cada lote en su propia transacción.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from cuentas.models import Cuenta
+from empresa.models import Empresa
+from S_CONTABLE.utils import parsear_fecha
+from .busqueda import indexar_comprobantes
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante, RegistroCambio, AccionCambio
+
+TAMANO_LOTE = 500
+ESTADOS_PERMITIDOS = ('BORRADOR', 'APROBADO')
+
+
+def _a_decimal(valor):
+    """Convierte un valor a Decimal con 2 decimales; None si no es numérico"""
+    try:
+        return Decimal(str(valor if valor not in (None, '') else 0)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+class CargaMasivaComprobantes:
+    """
+    Procesa comprobantes en lotes para una empresa.
+
+    Cada comprobante es un dict con: tipo, numero, fecha, descripcion, estado
+    (opcional), clave_idempotencia (opcional) y detalles, donde cada detalle
+    tiene cuenta (código), descripcion, debito y credito.
+
+    Los comprobantes cuya clave de idempotencia ya existe se omiten, de modo que
+    reintentar la misma carga no duplica información.
+    """
+
+    def __init__(self, empresa, usuario=None, clave_solicitud=None, tamano_lote=TAMANO_LOTE):
+        self.empresa = empresa
+        self.usuario = usuario
+        self.clave_solicitud = clave_solicitud
+        self.tamano_lote = tamano_lote
+        self.mapa_cuentas = self._cargar_mapa_cuentas()
+        bloqueo = BloqueoPeriodo.vigente(empresa.id)
+        self.fecha_bloqueo = bloqueo.fecha_hasta if bloqueo else None
+        self.creados = 0
+        self.duplicados = []
+        self.errores = []
+
+    def _cargar_mapa_cuentas(self):
+        """Precarga {codigo: (id, acepta_movimiento, esta_activa)} con una sola consulta"""
+        return {
+            codigo: (cuenta_id, acepta, activa)
+            for codigo, cuenta_id, acepta, activa in Cuenta.objects.filter(
+                empresa=self.empresa
+            ).values_list('codigo', 'id', 'acepta_movimiento', 'esta_activa')
+        }
+
+    def procesar(self, comprobantes):
+        """
+        Consume un iterable de comprobantes (puede ser un generador) en lotes.
+        Retorna el resumen de la carga.
+        """
+        lote = []
+        for indice, datos in enumerate(comprobantes):
+            lote.append((indice, datos))
+            if len(lote) >= self.tamano_lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+
+        if self.creados:
+            Empresa.incrementar_version_contable(self.empresa.id)
+
+        return {
+            'creados': self.creados,
+            'duplicados': self.duplicados,
+            'errores': self.errores,
+        }
+
+    # ---------------------------------------------
+    # Validación en memoria
+    # ---------------------------------------------
+
+    def _clave_idempotencia(self, indice, datos):
+        clave = datos.get('clave_idempotencia') if isinstance(datos, dict) else None
+        if clave:
+            return str(clave)[:100]
+        if self.clave_solicitud:
+            return f'{self.clave_solicitud}:{indice}'[:100]
+        return None
+
+    def _validar_detalles(self, detalles, errores):
+        """Valida las líneas del asiento y retorna (lineas, total_debito, total_credito)"""
+        lineas = []
+        total_debito = Decimal('0.00')
+        total_credito = Decimal('0.00')
+
+        if not isinstance(detalles, list) or len(detalles) < 2:
+            errores.append('Debe registrar al menos 2 movimientos contables (débito y crédito).')
+            return lineas, total_debito, total_credito
+
+        for orden, detalle in enumerate(detalles, start=1):
+            if not isinstance(detalle, dict):
+                errores.append(f'Línea {orden}: formato inválido')
+                continue
+            codigo = str(detalle.get('cuenta', '')).strip()
+            cuenta = self.mapa_cuentas.get(codigo)
+            debito = _a_decimal(detalle.get('debito'))
+            credito = _a_decimal(detalle.get('credito'))
+
+            if cuenta is None:
+                errores.append(f'Línea {orden}: la cuenta {codigo} no existe')
+            elif not cuenta[1]:
+                errores.append(f'Línea {orden}: la cuenta {codigo} no acepta movimientos')
+            elif not cuenta[2]:
+                errores.append(f'Línea {orden}: la cuenta {codigo} está inactiva')
+            if debito is None or credito is None or debito < 0 or credito < 0:
+                errores.append(f'Línea {orden}: valores de débito/crédito inválidos')
+                continue
+            if debito > 0 and credito > 0:
+                errores.append(f'Línea {orden}: no se puede registrar débito y crédito en la misma línea')
+            if debito == 0 and credito == 0:
+                errores.append(f'Línea {orden}: debe registrar un valor en débito o crédito')
+
+            if cuenta is not None:
+                lineas.append({
+                    'cuenta_id': cuenta[0],
+                    'descripcion': str(detalle.get('descripcion') or '')[:300],
+                    'debito': debito,
+                    'credito': credito,
+                    'orden': orden,
+                })
+            total_debito += debito
+            total_credito += credito
+
+        if total_debito != total_credito:
+            errores.append(f'Los débitos ({total_debito}) no son iguales a los créditos ({total_credito})')
+        return lineas, total_debito, total_credito
+
+    def _validar_comprobante(self, datos):
+        """Valida un comprobante; retorna (Comprobante sin guardar, lineas, errores)"""
+        if not isinstance(datos, dict):
+            return None, [], ['Formato de comprobante inválido']
+
+        errores = []
+        tipo = datos.get('tipo')
+        numero = str(datos.get('numero') or '').strip()
+        fecha = parsear_fecha(datos.get('fecha'))
+        estado = datos.get('estado') or 'BORRADOR'
+
+        if tipo not in TipoComprobante.values:
+            errores.append(f'Tipo de comprobante inválido: {tipo}')
+        if not numero or len(numero) > 50:
+            errores.append('Número de comprobante inválido')
+        if not fecha:
+            errores.append('Fecha inválida (formato YYYY-MM-DD)')
+        elif self.fecha_bloqueo and fecha <= self.fecha_bloqueo:
+            errores.append(f'El período contable está bloqueado hasta el {self.fecha_bloqueo:%d/%m/%Y}')
+        if estado not in ESTADOS_PERMITIDOS:
+            errores.append(f'Estado inválido: {estado}')
+
+        lineas, total_debito, total_credito = self._validar_detalles(datos.get('detalles'), errores)
+        if errores:
+            return None, [], errores
+
+        comprobante = Comprobante(
+            empresa=self.empresa,
+            tipo=tipo,
+            numero=numero,
+            fecha=fecha,
+            descripcion=str(datos.get('descripcion') or ''),
+            total_debito=total_debito,
+            total_credito=total_credito,
+            estado=estado,
+            usuario_creador=self.usuario,
+            fecha_aprobacion=timezone.now() if estado == 'APROBADO' else None,
+        )
+        return comprobante, lineas, []
+
+    # ---------------------------------------------
+    # Inserción por lotes
+    # ---------------------------------------------
+
+    def _procesar_lote(self, lote):
+        claves = {indice: self._clave_idempotencia(indice, datos) for indice, datos in lote}
+        claves_existentes = set(Comprobante.objects.filter(
+            empresa=self.empresa,
+            clave_idempotencia__in=[c for c in claves.values() if c],
+        ).values_list('clave_idempotencia', flat=True))
+
+        candidatos = []
+        for indice, datos in lote:
+            clave = claves[indice]
+            if clave and clave in claves_existentes:
+                self.duplicados.append(clave)
+                continue
+            comprobante, lineas, errores = self._validar_comprobante(datos)
+            if errores:
+                self.errores.append({'indice': indice, 'clave_idempotencia': clave, 'errores': errores})
+                continue
+            comprobante.clave_idempotencia = clave
+            if clave:
+                claves_existentes.add(clave)
+            candidatos.append((indice, comprobante, lineas))
+
+        candidatos = self._descartar_numeros_repetidos(candidatos)
+        if not candidatos:
+            return
+
+        try:
+            with transaction.atomic():
+                comprobantes = Comprobante.objects.bulk_create([c for _, c, _ in candidatos])
+                detalles = [
+                    DetalleComprobante(comprobante=comprobante, **linea)
+                    for comprobante, (_, _, lineas) in zip(comprobantes, candidatos)
+                    for linea in lineas
+                ]
+                DetalleComprobante.objects.bulk_create(detalles, batch_size=1000)
+                # bulk_create no dispara señales: el historial se registra explícitamente
+                RegistroCambio.registrar_lote(
+                    self.empresa.id, 'comprobante', [c.pk for c in comprobantes], AccionCambio.CREADO
+                )
+                RegistroCambio.registrar_lote(
+                    self.empresa.id, 'detalle_comprobante', [d.pk for d in detalles], AccionCambio.CREADO
+                )
+                indexar_comprobantes([c.pk for c in comprobantes])
+        except IntegrityError as e:
+            # Otra solicitud concurrente insertó los mismos comprobantes; el lote completo se revierte
+            for indice, comprobante, _ in candidatos:
+                self.errores.append({
+                    'indice': indice,
+                    'clave_idempotencia': comprobante.clave_idempotencia,
+                    'errores': [f'Lote revertido por conflicto de integridad: {e}'],
+                })
+            return
+        self.creados += len(comprobantes)
+
+    def _descartar_numeros_repetidos(self, candidatos):
+        """Descarta comprobantes cuyo (tipo, numero) ya existe en la base o en el mismo lote"""
+        numeros = {c.numero for _, c, _ in candidatos}
+        usados = set(Comprobante.objects.filter(
+            empresa=self.empresa, numero__in=numeros
+        ).values_list('tipo', 'numero'))
+
+        validos = []
+        for indice, comprobante, lineas in candidatos:
+            llave = (comprobante.tipo, comprobante.numero)
+            if llave in usados:
+                self.errores.append({
+                    'indice': indice,
+                    'clave_idempotencia': comprobante.clave_idempotencia,
+                    'errores': [f'Ya existe un comprobante {comprobante.tipo}-{comprobante.numero}'],
+                })
+                continue
+            usados.add(llave)
+            validos.append((indice, comprobante, lineas))
+        return validos
@@ -0,0 +1,197 @@
+"""
+Cierre del ejercicio contable y apertura del siguiente.
+
+Para una empresa y un año:
+- Genera un comprobante de CIERRE (31/12) que lleva a cero las cuentas de
+  ingresos, costos y gastos contra la cuenta de utilidades acumuladas.
+- Genera un comprobante de APERTURA (01/01 del año siguiente) con los saldos
+  de las cuentas de balance después del cierre.
+- Bloquea el período hasta la fecha de cierre (BloqueoPeriodo), para que
+  ningún comprobante del ejercicio cerrado cambie los saldos ya trasladados.
+
+Los saldos se obtienen con una sola consulta agrupada por cuenta y las líneas
+se insertan con bulk_create. Los reportes acumulados (Balance General y Balance
+de Comprobación) comienzan desde la última apertura en lugar de todo el historial.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from cuentas.models import Cuenta, TipoCuenta
+from .busqueda import indexar_comprobantes
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante, RegistroCambio, AccionCambio
+
+CODIGO_CUENTA_RESULTADO = '3605'  # Utilidades Acumuladas
+TIPOS_CUENTA_RESULTADO = (TipoCuenta.INGRESO, TipoCuenta.COSTO, TipoCuenta.GASTO)
+
+
+class CierreEjercicio:
+    """
+    Genera los comprobantes de cierre y apertura de un ejercicio.
+    Uso: CierreEjercicio(empresa, 2025, usuario).ejecutar()
+    """
+
+    def __init__(self, empresa, anio, usuario=None, codigo_cuenta_resultado=CODIGO_CUENTA_RESULTADO):
+        self.empresa = empresa
+        self.anio = anio
+        self.usuario = usuario
+        self.codigo_cuenta_resultado = codigo_cuenta_resultado
+        self.fecha_cierre = date(anio, 12, 31)
+        self.fecha_apertura = date(anio + 1, 1, 1)
+
+    # ============================================
+    # VALIDACIONES
+    # ============================================
+
+    def _validar(self):
+        comprobantes = Comprobante.objects.de_empresa(self.empresa)
+
+        if comprobantes.filter(tipo=TipoComprobante.CIERRE, fecha__gte=self.fecha_cierre).exists():
+            raise ValidationError(f'El ejercicio {self.anio} o uno posterior ya fue cerrado')
+
+        bloqueo = BloqueoPeriodo.vigente(self.empresa.id)
+        if bloqueo and bloqueo.fecha_hasta >= self.fecha_cierre:
+            raise ValidationError(
+                f'El período está bloqueado hasta el {bloqueo.fecha_hasta:%d/%m/%Y}: '
+                f'no se puede registrar el cierre del ejercicio {self.anio}'
+            )
+
+        borradores = comprobantes.filter(estado='BORRADOR', fecha__lte=self.fecha_cierre).count()
+        if borradores:
+            raise ValidationError(
+                f'Hay {borradores} comprobantes en borrador hasta el {self.fecha_cierre:%d/%m/%Y}. '
+                'Apruébelos o elimínelos antes de cerrar el ejercicio'
+            )
+
+        try:
+            cuenta = Cuenta.objects.get(empresa=self.empresa, codigo=self.codigo_cuenta_resultado)
+        except Cuenta.DoesNotExist:
+            raise ValidationError(f'No existe la cuenta de resultados {self.codigo_cuenta_resultado}')
+        if cuenta.tipo != TipoCuenta.PATRIMONIO:
+            raise ValidationError(f'La cuenta {cuenta.codigo} debe ser de patrimonio')
+        return cuenta
+
+    # ============================================
+    # SALDOS
+    # ============================================
+
+    def _saldos_al_cierre(self):
+        """
+        Saldo neto (débito - crédito) por cuenta al cierre, con una sola consulta
+        agrupada desde la última apertura (o desde el inicio si no hay ninguna).
+        Retorna {cuenta_id: (tipo_cuenta, codigo, saldo_neto)}.
+        """
+        inicio = Comprobante.fecha_ultima_apertura(self.empresa.id, self.fecha_cierre)
+        movimientos = DetalleComprobante.objects.filter(
+            comprobante__empresa=self.empresa,
+            comprobante__estado='APROBADO',
+            comprobante__fecha__lte=self.fecha_cierre,
+        )
+        if inicio:
+            movimientos = movimientos.filter(comprobante__fecha__gte=inicio)
+
+        filas = movimientos.values('cuenta_id', 'cuenta__tipo', 'cuenta__codigo').annotate(
+            debito=Sum('debito'), credito=Sum('credito')
+        ).order_by('cuenta__codigo')
+
+        return {
+            fila['cuenta_id']: (fila['cuenta__tipo'], fila['cuenta__codigo'], fila['debito'] - fila['credito'])
+            for fila in filas
+            if fila['debito'] != fila['credito']
+        }
+
+    @staticmethod
+    def _linea(cuenta_id, saldo_neto, descripcion):
+        """Detalle que registra un saldo neto: débito si es positivo, crédito si es negativo"""
+        return DetalleComprobante(
+            cuenta_id=cuenta_id,
+            descripcion=descripcion,
+            debito=saldo_neto if saldo_neto > 0 else Decimal('0.00'),
+            credito=-saldo_neto if saldo_neto < 0 else Decimal('0.00'),
+        )
+
+    # ============================================
+    # GENERACIÓN DE COMPROBANTES
+    # ============================================
+
+    def _crear_comprobante(self, tipo, numero, fecha, descripcion, lineas):
+        for orden, linea in enumerate(lineas, start=1):
+            linea.orden = orden
+        comprobante = Comprobante.objects.create(
+            empresa=self.empresa,
+            tipo=tipo,
+            numero=numero,
+            fecha=fecha,
+            descripcion=descripcion,
+            estado='APROBADO',
+            fecha_aprobacion=timezone.now(),
+            usuario_creador=self.usuario,
+            total_debito=sum((linea.debito for linea in lineas), Decimal('0.00')),
+            total_credito=sum((linea.credito for linea in lineas), Decimal('0.00')),
+        )
+        for linea in lineas:
+            linea.comprobante = comprobante
+        DetalleComprobante.objects.bulk_create(lineas, batch_size=1000)
+        # bulk_create no dispara señales: el historial se registra explícitamente
+        RegistroCambio.registrar_lote(
+            self.empresa.id, 'detalle_comprobante', [linea.pk for linea in lineas], AccionCambio.CREADO
+        )
+        return comprobante
+
+    @transaction.atomic
+    def ejecutar(self):
+        """
+        Genera los comprobantes de cierre y apertura y bloquea el período hasta
+        la fecha de cierre.
+        Retorna {'cierre': Comprobante, 'apertura': Comprobante, 'bloqueo': BloqueoPeriodo,
+        'resultado': Decimal} donde resultado es la utilidad (positiva) o pérdida
+        (negativa) del ejercicio.
+        """
+        cuenta_resultado = self._validar()
+        saldos = self._saldos_al_cierre()
+
+        # Cierre: cada cuenta de resultados se salda con la línea contraria
+        lineas_cierre = []
+        neto_resultados = Decimal('0.00')
+        for cuenta_id, (tipo, codigo, saldo) in saldos.items():
+            if tipo in TIPOS_CUENTA_RESULTADO:
+                lineas_cierre.append(self._linea(cuenta_id, -saldo, f'Cierre de la cuenta {codigo}'))
+                neto_resultados += saldo
+
+        # La diferencia va a utilidades acumuladas (crédito si hubo utilidad)
+        if neto_resultados:
+            lineas_cierre.append(self._linea(
+                cuenta_resultado.id, neto_resultados, f'Resultado del ejercicio {self.anio}'
+            ))
+
+        # Apertura: saldos de las cuentas de balance, incluida la cuenta de resultados ajustada
+        saldos_balance = {
+            cuenta_id: saldo for cuenta_id, (tipo, _, saldo) in saldos.items()
+            if tipo not in TIPOS_CUENTA_RESULTADO
+        }
+        saldos_balance[cuenta_resultado.id] = saldos_balance.get(cuenta_resultado.id, Decimal('0.00')) + neto_resultados
+        codigos = {cuenta_id: codigo for cuenta_id, (_, codigo, _) in saldos.items()}
+        codigos[cuenta_resultado.id] = cuenta_resultado.codigo
+        lineas_apertura = [
+            self._linea(cuenta_id, saldo, f'Saldo inicial de la cuenta {codigos[cuenta_id]}')
+            for cuenta_id, saldo in saldos_balance.items()
+            if saldo
+        ]
+
+        cierre = self._crear_comprobante(
+            TipoComprobante.CIERRE, f'CIERRE-{self.anio}', self.fecha_cierre,
+            f'Cierre del ejercicio {self.anio}', lineas_cierre,
+        )
+        apertura = self._crear_comprobante(
+            TipoComprobante.APERTURA, f'APERTURA-{self.anio + 1}', self.fecha_apertura,
+            f'Apertura del ejercicio {self.anio + 1}', lineas_apertura,
+        )
+        indexar_comprobantes([cierre.pk, apertura.pk])
+        # Después de crear el cierre (que el bloqueo rechazaría): el ejercicio ya no admite cambios
+        bloqueo = BloqueoPeriodo.objects.create(empresa=self.empresa, fecha_hasta=self.fecha_cierre, usuario=self.usuario)
+
+        return {'cierre': cierre, 'apertura': apertura, 'bloqueo': bloqueo, 'resultado': -neto_resultados}
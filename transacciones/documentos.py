@@ -9,7 +9,8 @@ from django.core.validators import MinValueValidator
 from decimal import Decimal
 from empresa.models import Empresa
 from cuentas.models import Cuenta
-from .models import Comprobante, DetalleComprobante, TipoComprobante
+from django.core.exceptions import ValidationError
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante
 
 # Constantes para evitar duplicación
 ERROR_CUENTAS_NO_ENCONTRADAS = "No se encontraron las cuentas contables necesarias"
@@ -65,6 +66,12 @@ class DocumentoContable(ABC):
         if not self.validar_documento():
             raise ValueError("El documento no es válido")
         
+        # La fecha del documento no puede caer en un período bloqueado
+        try:
+            BloqueoPeriodo.validar_fechas(self.empresa.id, self.fecha)
+        except ValidationError as e:
+            raise ValueError(e.messages[0])
+        
         # 2. Calcular totales
         totales = self.calcular_totales()
         
@@ -1,8 +1,11 @@
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
+from django.urls import reverse_lazy
+from django.utils.functional import cached_property
 from .models import Comprobante, DetalleComprobante, TipoComprobante
 from empresa.models import Empresa
 from cuentas.models import Cuenta
+from cuentas.cache_cuentas import obtener_etiquetas_cuentas
 
 class ComprobanteForm(forms.ModelForm):
     class Meta:
@@ -47,15 +50,101 @@ class ComprobanteForm(forms.ModelForm):
         # Filtrar solo empresas activas
         self.fields['empresa'].queryset = Empresa.objects.filter(activo=True)
 
+class SelectorCuentaWidget(forms.Select):
+    """
+    Select liviano para cuentas: solo renderiza la opción seleccionada.
+    El resto de opciones se cargan en el navegador desde el endpoint de
+    búsqueda de cuentas (atributo data-url) una sola vez por empresa.
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs)
+        self.etiquetas = {}
+
+    def optgroups(self, name, value, attrs=None):
+        seleccionados = [v for v in value if v not in ('', None)]
+        opciones = [self.create_option(name, '', '---------', not seleccionados, 0)]
+        for indice, valor in enumerate(seleccionados, start=1):
+            try:
+                etiqueta = self.etiquetas.get(int(valor), valor)
+            except (TypeError, ValueError):
+                continue
+            opciones.append(self.create_option(name, valor, etiqueta, True, indice))
+        return [(None, opciones, 0)]
+
+
+class CuentaMovimientoField(forms.ModelChoiceField):
+    """
+    Campo de cuenta que valida contra un diccionario {id: Cuenta} compartido
+    por todas las filas del formset, en lugar de consultar la base por fila.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('widget', SelectorCuentaWidget)
+        super().__init__(queryset=Cuenta.objects.none(), **kwargs)
+        self.cuentas = {}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.cuentas[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class DetalleExistenteField(forms.ModelChoiceField):
+    """
+    Campo oculto con el id de un detalle existente. Lo resuelve contra los
+    detalles que el formset ya cargó del comprobante, en lugar de hacer una
+    consulta por fila.
+    """
+
+    def __init__(self, buscar_detalle, **kwargs):
+        super().__init__(queryset=DetalleComprobante.objects.none(), **kwargs)
+        self.buscar_detalle = buscar_detalle
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            detalle = self.buscar_detalle(int(value))
+        except (TypeError, ValueError):
+            detalle = None
+        if detalle is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return detalle
+
+
+def cargar_cuentas_movimiento(empresa_id, ids=None):
+    """
+    Obtiene en una sola consulta {id: Cuenta} de las cuentas activas de la empresa
+    que aceptan movimiento, opcionalmente limitadas a los ids indicados.
+    """
+    if not empresa_id:
+        return {}
+    cuentas = Cuenta.objects.filter(empresa_id=empresa_id, acepta_movimiento=True, esta_activa=True)
+    if ids is not None:
+        cuentas = cuentas.filter(id__in=ids)
+    return {cuenta.id: cuenta for cuenta in cuentas}
+
+
 class DetalleComprobanteForm(forms.ModelForm):
+    cuenta = CuentaMovimientoField(
+        label='Cuenta',
+        widget=SelectorCuentaWidget(attrs={
+            'class': 'form-control cuenta-select',
+            'required': True,
+            'data-url': reverse_lazy('cuentas:buscar_cuentas'),
+        })
+    )
+
     class Meta:
         model = DetalleComprobante
-        fields = ['cuenta', 'descripcion', 'debito', 'credito']
+        # 'cuenta' es un campo declarado fuera de Meta.fields: el modelo no la vuelve a
+        # validar con una consulta por fila (ya se validó contra las cuentas del formset)
+        fields = ['descripcion', 'debito', 'credito']
         widgets = {
-            'cuenta': forms.Select(attrs={
-                'class': 'form-control cuenta-select',
-                'required': True
-            }),
             'descripcion': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Descripción del movimiento',
@@ -77,31 +166,25 @@ class DetalleComprobanteForm(forms.ModelForm):
             }),
         }
         labels = {
-            'cuenta': 'Cuenta',
             'descripcion': 'Descripción',
             'debito': 'Débito',
             'credito': 'Crédito',
         }
     
-    def __init__(self, *args, **kwargs):
-        empresa_id = kwargs.pop('empresa_id', None)
+    def __init__(self, *args, empresa_id=None, cuentas=None, etiquetas=None, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Filtrar cuentas por empresa y que acepten movimiento
-        if empresa_id:
-            self.fields['cuenta'].queryset = Cuenta.objects.filter(
-                empresa_id=empresa_id,
-                acepta_movimiento=True,
-                esta_activa=True
-            ).order_by('codigo')
-        else:
-            self.fields['cuenta'].queryset = Cuenta.objects.filter(
-                acepta_movimiento=True,
-                esta_activa=True
-            ).order_by('codigo')
+        # Las cuentas válidas y sus etiquetas las comparte el formset entre todas las filas
+        campo = self.fields['cuenta']
+        campo.cuentas = cuentas if cuentas is not None else cargar_cuentas_movimiento(empresa_id)
+        campo.widget.etiquetas = etiquetas if etiquetas is not None else obtener_etiquetas_cuentas(empresa_id)
+        if self.instance.pk:
+            self.initial.setdefault('cuenta', self.instance.cuenta_id)
     
     def clean(self):
         cleaned_data = super().clean()
+        if cleaned_data.get('cuenta'):
+            self.instance.cuenta = cleaned_data['cuenta']
         debito = cleaned_data.get('debito', 0)
         credito = cleaned_data.get('credito', 0)
         
@@ -113,11 +196,57 @@ class DetalleComprobanteForm(forms.ModelForm):
         
         return cleaned_data
 
+class BaseDetalleComprobanteFormSet(BaseInlineFormSet):
+    """
+    Formset de detalles limitado a las cuentas de una empresa.
+    Carga las cuentas enviadas con una sola consulta y las etiquetas desde
+    el índice en caché, y las comparte con todas las filas.
+    """
+
+    def __init__(self, *args, empresa_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.empresa_id = empresa_id or self.instance.empresa_id
+
+    @cached_property
+    def cuentas(self):
+        if not self.is_bound:
+            return {}
+        sufijo = '-cuenta'
+        ids = {
+            valor for clave, valor in self.data.items()
+            if clave.startswith(f'{self.prefix}-') and clave.endswith(sufijo) and valor.isdigit()
+        }
+        return cargar_cuentas_movimiento(self.empresa_id, ids) if ids else {}
+
+    @cached_property
+    def etiquetas(self):
+        return obtener_etiquetas_cuentas(self.empresa_id)
+
+    @cached_property
+    def detalles_existentes(self):
+        return {detalle.pk: detalle for detalle in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # El id de cada fila se valida contra los detalles ya cargados del comprobante
+        nombre_pk = self.model._meta.pk.name
+        campo = form.fields[nombre_pk]
+        form.fields[nombre_pk] = DetalleExistenteField(
+            self.detalles_existentes.get, initial=campo.initial, required=False, widget=campo.widget
+        )
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs.update(empresa_id=self.empresa_id, cuentas=self.cuentas, etiquetas=self.etiquetas)
+        return kwargs
+
+
 # Formset para manejar múltiples detalles
 DetalleComprobanteFormSet = inlineformset_factory(
     Comprobante,
     DetalleComprobante,
     form=DetalleComprobanteForm,
+    formset=BaseDetalleComprobanteFormSet,
     extra=1,  # Muestra solo 1 formulario vacío inicial
     can_delete=True,
     min_num=0,  # No forzar mínimo en la visualización
@@ -0,0 +1,56 @@
+"""
+Comando de gestión para aprobar o anular comprobantes por lotes
+Uso:
+    python manage.py aprobar_comprobantes --empresa=<id> --hasta=2025-01-31
+    python manage.py aprobar_comprobantes --empresa=<id> --ids 10 11 12
+    python manage.py aprobar_comprobantes --empresa=<id> --ids 10 11 --anular
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from S_CONTABLE.utils import parsear_fecha
+from transacciones.aprobacion_lote import aprobar_comprobantes_lote, anular_comprobantes_lote
+from transacciones.models import Comprobante
+
+
+class Command(BaseCommand):
+    help = 'Aprueba (o anula con --anular) comprobantes por lotes con una sola actualización'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='ID de la empresa')
+        parser.add_argument('--ids', type=int, nargs='+', help='IDs de los comprobantes a procesar')
+        parser.add_argument('--desde', help='Aprobar borradores desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Aprobar borradores hasta esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--anular', action='store_true', help='Anular en lugar de aprobar (requiere --ids)')
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(id=options['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+
+        if options['anular']:
+            if not options['ids']:
+                raise CommandError('Para anular debe indicar los comprobantes con --ids')
+            resultado = anular_comprobantes_lote(empresa, options['ids'])
+            accion = 'anulados'
+        else:
+            resultado = aprobar_comprobantes_lote(empresa, options['ids'] or self._borradores(empresa, options))
+            accion = 'aprobados'
+
+        for fallido in resultado['fallidos']:
+            self.stdout.write(self.style.WARNING(
+                f'  {fallido["numero"] or fallido["id"]}: {fallido["error"]}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {len(resultado["procesados"])} comprobantes {accion}, {len(resultado["fallidos"])} con errores'
+        ))
+
+    def _borradores(self, empresa, options):
+        borradores = Comprobante.objects.de_empresa(empresa).filter(estado='BORRADOR')
+        desde, hasta = parsear_fecha(options['desde']), parsear_fecha(options['hasta'])
+        if desde:
+            borradores = borradores.filter(fecha__gte=desde)
+        if hasta:
+            borradores = borradores.filter(fecha__lte=hasta)
+        return list(borradores.values_list('id', flat=True))
@@ -0,0 +1,53 @@
+"""
+Comando de gestión para bloquear los períodos contables de una empresa
+Uso:
+    python manage.py bloquear_periodo --empresa=<id> --hasta=2025-06-30
+    python manage.py bloquear_periodo --empresa=<id>            (muestra el bloqueo vigente)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from S_CONTABLE.utils import parsear_fecha
+from transacciones.models import BloqueoPeriodo, Comprobante
+
+
+class Command(BaseCommand):
+    help = 'Bloquea los comprobantes de una empresa hasta una fecha (inclusive)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='ID de la empresa')
+        parser.add_argument('--hasta', help='Último día bloqueado (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(id=options['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+
+        vigente = BloqueoPeriodo.vigente(empresa.id)
+        if not options['hasta']:
+            if vigente:
+                self.stdout.write(f'{empresa.nombre}: bloqueado hasta el {vigente.fecha_hasta:%d/%m/%Y}')
+            else:
+                self.stdout.write(f'{empresa.nombre}: sin períodos bloqueados')
+            return
+
+        fecha_hasta = parsear_fecha(options['hasta'])
+        if not fecha_hasta:
+            raise CommandError('Fecha inválida (formato AAAA-MM-DD)')
+        if vigente and fecha_hasta <= vigente.fecha_hasta:
+            raise CommandError(f'El período ya está bloqueado hasta el {vigente.fecha_hasta:%d/%m/%Y}')
+
+        borradores = Comprobante.objects.de_empresa(empresa).filter(
+            estado='BORRADOR', fecha__lte=fecha_hasta
+        ).count()
+        if borradores:
+            raise CommandError(
+                f'Hay {borradores} comprobantes en borrador hasta el {fecha_hasta:%d/%m/%Y}. '
+                'Apruébelos o elimínelos antes de bloquear el período'
+            )
+
+        BloqueoPeriodo.objects.create(empresa=empresa, fecha_hasta=fecha_hasta)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Período de {empresa.nombre} bloqueado hasta el {fecha_hasta:%d/%m/%Y}'
+        ))
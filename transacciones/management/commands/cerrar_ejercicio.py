@@ -0,0 +1,43 @@
+"""
+Comando de gestión para cerrar un ejercicio contable y generar la apertura del siguiente
+Uso: python manage.py cerrar_ejercicio --empresa=<empresa_id> --anio=2025
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from empresa.models import Empresa
+from transacciones.cierre_ejercicio import CierreEjercicio, CODIGO_CUENTA_RESULTADO
+
+
+class Command(BaseCommand):
+    help = 'Genera los comprobantes de cierre del ejercicio y de apertura del año siguiente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='ID de la empresa')
+        parser.add_argument('--anio', type=int, required=True, help='Año del ejercicio a cerrar')
+        parser.add_argument(
+            '--cuenta-resultado',
+            default=CODIGO_CUENTA_RESULTADO,
+            help=f'Código de la cuenta de patrimonio que recibe el resultado (por defecto {CODIGO_CUENTA_RESULTADO})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(id=options['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f'No se encontró la empresa con ID {options["empresa"]}')
+
+        try:
+            resultado = CierreEjercicio(
+                empresa, options['anio'], codigo_cuenta_resultado=options['cuenta_resultado']
+            ).ejecutar()
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        cierre, apertura = resultado['cierre'], resultado['apertura']
+        self.stdout.write(f'  {cierre.numero}: {cierre.detalles.count()} líneas, ${cierre.total_debito:,.2f}')
+        self.stdout.write(f'  {apertura.numero}: {apertura.detalles.count()} líneas, ${apertura.total_debito:,.2f}')
+        self.stdout.write(f'  Período bloqueado hasta el {resultado["bloqueo"].fecha_hasta:%d/%m/%Y}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Ejercicio {options["anio"]} cerrado. Resultado: ${resultado["resultado"]:,.2f}'
+        ))
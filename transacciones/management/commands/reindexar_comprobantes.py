@@ -0,0 +1,18 @@
+"""
+Comando de gestión para reconstruir el índice de búsqueda de comprobantes
+Uso: python manage.py reindexar_comprobantes
+"""
+from django.core.management.base import BaseCommand
+
+from transacciones.busqueda import reconstruir_indice, usa_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de texto completo de comprobantes y sus detalles'
+
+    def handle(self, *args, **options):
+        if not usa_indice():
+            self.stdout.write('El motor de base de datos actual no usa un índice de búsqueda; no hay nada que reconstruir')
+            return
+        total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} comprobantes indexados'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('transacciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comprobante',
+            options={'ordering': ['-fecha', '-id'], 'verbose_name': 'Comprobante', 'verbose_name_plural': 'Comprobantes'},
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, help_text='Identificador enviado por sistemas externos para evitar duplicados', max_length=100, null=True, verbose_name='Clave de Idempotencia'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='comprobante',
+            unique_together={('empresa', 'clave_idempotencia'), ('empresa', 'tipo', 'numero')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('transacciones', '0002_comprobante_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('comprobante', 'Comprobante'), ('detalle_comprobante', 'Detalle de Comprobante'), ('movimiento_inventario', 'Movimiento de Inventario')], max_length=30, verbose_name='Entidad')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del Objeto')),
+                ('accion', models.CharField(choices=[('CREADO', 'Creado'), ('ACTUALIZADO', 'Actualizado'), ('APROBADO', 'Aprobado'), ('ANULADO', 'Anulado'), ('ELIMINADO', 'Eliminado')], max_length=15, verbose_name='Acción')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('empresa', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='empresa.empresa')),
+            ],
+            options={
+                'verbose_name': 'Registro de Cambio',
+                'verbose_name_plural': 'Registros de Cambios',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['empresa', 'id'], name='cambio_empresa_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('transacciones', '0003_registrocambio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(fields=['empresa', 'fecha'], name='comprobante_empresa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(fields=['empresa', 'estado', 'fecha'], name='comprobante_emp_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    """
+    SQLite: tabla FTS5 con los comprobantes existentes y sus detalles.
+    PostgreSQL: índices GIN de texto completo sobre las descripciones.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS transacciones_comprobante_fts USING fts5("
+            "numero, descripcion, detalles, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO transacciones_comprobante_fts (rowid, numero, descripcion, detalles) "
+            "SELECT c.id, c.numero, c.descripcion, "
+            "COALESCE((SELECT group_concat(d.descripcion, ' ') FROM transacciones_detallecomprobante d "
+            "WHERE d.comprobante_id = c.id), '') "
+            "FROM transacciones_comprobante c"
+        )
+    elif vendor == 'postgresql':
+        for tabla, nombre in (('transacciones_comprobante', 'comprobante'),
+                              ('transacciones_detallecomprobante', 'detalle')):
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {nombre}_descripcion_fts_idx '
+                f"ON {tabla} USING gin (to_tsvector('simple', descripcion))"
+            )
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS transacciones_comprobante_fts')
+    elif vendor == 'postgresql':
+        for nombre in ('comprobante', 'detalle'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}_descripcion_fts_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacciones', '0004_comprobante_indices_empresa'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
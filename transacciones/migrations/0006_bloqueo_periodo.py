@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0003_empresa_version_contable'),
+        ('transacciones', '0005_busqueda_comprobantes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueoPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_hasta', models.DateField(verbose_name='Bloqueado hasta')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloqueos_periodo', to='empresa.empresa')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bloqueos_periodo', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bloqueo de Período',
+                'verbose_name_plural': 'Bloqueos de Períodos',
+                'ordering': ['-fecha_hasta', '-id'],
+                'indexes': [models.Index(fields=['empresa', 'fecha_hasta'], name='bloqueo_empresa_fecha_idx')],
+            },
+        ),
+    ]
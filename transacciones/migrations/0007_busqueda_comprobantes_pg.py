@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+def crear_tabla_busqueda(apps, schema_editor):
+    """
+    PostgreSQL: reemplaza los índices por descripción (que no cubrían el número
+    ni permitían que los términos estuvieran en líneas distintas) por una tabla
+    con un tsvector por comprobante e índice GIN, cargada con los existentes.
+    Como la tabla FTS5, no tiene clave foránea: la sincronizan las señales.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in ('comprobante', 'detalle'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}_descripcion_fts_idx')
+    schema_editor.execute(
+        'CREATE TABLE IF NOT EXISTS transacciones_comprobante_busqueda ('
+        'comprobante_id integer PRIMARY KEY, vector tsvector NOT NULL)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS comprobante_busqueda_vector_idx '
+        'ON transacciones_comprobante_busqueda USING gin (vector)'
+    )
+    schema_editor.execute(
+        "INSERT INTO transacciones_comprobante_busqueda (comprobante_id, vector) "
+        "SELECT c.id, "
+        "setweight(to_tsvector('simple', c.numero), 'A') || "
+        "setweight(to_tsvector('simple', c.descripcion), 'B') || "
+        "setweight(to_tsvector('simple', COALESCE((SELECT string_agg(d.descripcion, ' ') "
+        "FROM transacciones_detallecomprobante d WHERE d.comprobante_id = c.id), '')), 'C') "
+        "FROM transacciones_comprobante c "
+        "ON CONFLICT (comprobante_id) DO NOTHING"
+    )
+
+
+def eliminar_tabla_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS transacciones_comprobante_busqueda')
+    for tabla, nombre in (('transacciones_comprobante', 'comprobante'),
+                          ('transacciones_detallecomprobante', 'detalle')):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre}_descripcion_fts_idx '
+            f"ON {tabla} USING gin (to_tsvector('simple', descripcion))"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacciones', '0006_bloqueo_periodo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla_busqueda, eliminar_tabla_busqueda),
+    ]
@@ -2,8 +2,12 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from empresa.models import Empresa
+from empresa.managers import EmpresaManager
 from cuentas.models import Cuenta
+from .busqueda import indexar_comprobantes, desindexar_comprobante
 
 class TipoComprobante(models.TextChoices):
     """Tipos de comprobantes contables"""
@@ -13,6 +17,48 @@ class TipoComprobante(models.TextChoices):
     APERTURA = 'A', 'Apertura'
     CIERRE = 'C', 'Cierre'
 
+class BloqueoPeriodo(models.Model):
+    """
+    Bloqueo de períodos contables de una empresa: los comprobantes con fecha hasta
+    fecha_hasta (inclusive) no pueden crearse, modificarse, aprobarse, anularse ni
+    eliminarse. El bloqueo vigente es el de fecha_hasta más reciente.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='bloqueos_periodo')
+    fecha_hasta = models.DateField(verbose_name="Bloqueado hasta")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='bloqueos_periodo')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    objects = EmpresaManager()
+
+    class Meta:
+        verbose_name = "Bloqueo de Período"
+        verbose_name_plural = "Bloqueos de Períodos"
+        ordering = ['-fecha_hasta', '-id']
+        indexes = [models.Index(fields=['empresa', 'fecha_hasta'], name='bloqueo_empresa_fecha_idx')]
+
+    def __str__(self):
+        return f"{self.empresa} - bloqueado hasta {self.fecha_hasta:%d/%m/%Y}"
+
+    @classmethod
+    def vigente(cls, empresa_id):
+        """Bloqueo vigente de la empresa o None si no tiene períodos bloqueados"""
+        if not empresa_id:
+            return None
+        return cls.objects.filter(empresa_id=empresa_id).order_by('-fecha_hasta', '-id').first()
+
+    @classmethod
+    def validar_fechas(cls, empresa_id, *fechas):
+        """Lanza ValidationError si alguna de las fechas cae en un período bloqueado"""
+        fechas = [fecha for fecha in fechas if fecha]
+        if not fechas:
+            return
+        bloqueo = cls.vigente(empresa_id)
+        if bloqueo and min(fechas) <= bloqueo.fecha_hasta:
+            raise ValidationError(
+                f'El período contable está bloqueado hasta el {bloqueo.fecha_hasta:%d/%m/%Y}'
+            )
+
 class Comprobante(models.Model):
     """Modelo para comprobantes contables"""
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='comprobantes')
@@ -28,16 +74,52 @@ class Comprobante(models.Model):
     usuario_creador = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='comprobantes_creados')
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     fecha_aprobacion = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Aprobación")
+    clave_idempotencia = models.CharField(max_length=100, null=True, blank=True, editable=False,
+                                          verbose_name="Clave de Idempotencia",
+                                          help_text="Identificador enviado por sistemas externos para evitar duplicados")
+    
+    objects = EmpresaManager()
     
     class Meta:
         verbose_name = "Comprobante"
         verbose_name_plural = "Comprobantes"
         ordering = ['-fecha', '-id']  # Ordenar por fecha descendente y luego por ID (más reciente primero)
-        unique_together = ['empresa', 'tipo', 'numero']
+        unique_together = [['empresa', 'tipo', 'numero'], ['empresa', 'clave_idempotencia']]
+        indexes = [
+            models.Index(fields=['empresa', 'fecha'], name='comprobante_empresa_fecha_idx'),
+            models.Index(fields=['empresa', 'estado', 'fecha'], name='comprobante_emp_estado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.numero} ({self.fecha})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Recuerda el estado leído de la base para detectar aprobaciones y anulaciones"""
+        instancia = super().from_db(db, field_names, values)
+        instancia._estado_original = instancia.__dict__.get('estado')
+        instancia._fecha_original = instancia.__dict__.get('fecha')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        """No permite guardar comprobantes (ni moverlos) dentro de un período bloqueado"""
+        BloqueoPeriodo.validar_fechas(self.empresa_id, self.fecha, getattr(self, '_fecha_original', None))
+        super().save(*args, **kwargs)
+        self._fecha_original = self.fecha
+
+    def delete(self, *args, **kwargs):
+        """No permite eliminar comprobantes de un período bloqueado"""
+        BloqueoPeriodo.validar_fechas(self.empresa_id, getattr(self, '_fecha_original', None) or self.fecha)
+        return super().delete(*args, **kwargs)
+
+    def esta_bloqueado(self):
+        """Indica si el comprobante pertenece a un período bloqueado"""
+        try:
+            BloqueoPeriodo.validar_fechas(self.empresa_id, getattr(self, '_fecha_original', None) or self.fecha)
+        except ValidationError:
+            return True
+        return False
+
     def clean(self):
         """Validar que débito = crédito cuando se aprueba"""
         if self.estado == 'APROBADO':
@@ -46,8 +128,8 @@ class Comprobante(models.Model):
             if self.total_debito == 0:
                 raise ValidationError('El comprobante debe tener al menos un movimiento')
     
-    def calcular_totales(self):
-        """Calcula los totales de débito y crédito desde los detalles"""
+    def _asignar_totales(self):
+        """Asigna los totales de débito y crédito desde los detalles, sin guardar"""
         from django.db.models import Sum
         totales = self.detalles.aggregate(
             total_debito=Sum('debito'),
@@ -55,11 +137,15 @@ class Comprobante(models.Model):
         )
         self.total_debito = totales['total_debito'] or 0
         self.total_credito = totales['total_credito'] or 0
+    
+    def calcular_totales(self):
+        """Calcula los totales de débito y crédito desde los detalles"""
+        self._asignar_totales()
         self.save()
     
     def aprobar(self, usuario=None):
-        """Aprueba el comprobante"""
-        self.calcular_totales()
+        """Aprueba el comprobante (los totales y el estado se guardan juntos)"""
+        self._asignar_totales()
         if self.total_debito != self.total_credito:
             raise ValidationError('No se puede aprobar: Los débitos no son iguales a los créditos')
         self.estado = 'APROBADO'
@@ -76,6 +162,20 @@ class Comprobante(models.Model):
     def esta_balanceado(self):
         """Verifica si el comprobante está balanceado"""
         return self.total_debito == self.total_credito
+    
+    @staticmethod
+    def fecha_ultima_apertura(empresa_id, hasta=None):
+        """
+        Fecha del último comprobante de apertura aprobado de la empresa (hasta la
+        fecha indicada). Los saldos acumulados pueden calcularse desde esa fecha
+        en lugar de recorrer todo el historial.
+        """
+        aperturas = Comprobante.objects.filter(
+            empresa_id=empresa_id, estado='APROBADO', tipo=TipoComprobante.APERTURA
+        )
+        if hasta:
+            aperturas = aperturas.filter(fecha__lte=hasta)
+        return aperturas.order_by('-fecha').values_list('fecha', flat=True).first()
 
 class DetalleComprobante(models.Model):
     """Modelo para el detalle de cada comprobante"""
@@ -100,5 +200,106 @@ class DetalleComprobante(models.Model):
             raise ValidationError('No se puede registrar débito y crédito en la misma línea')
         if self.debito == 0 and self.credito == 0:
             raise ValidationError('Debe registrar un valor en débito o crédito')
-        if not self.cuenta.acepta_movimiento:
+        if self.cuenta_id and not self.cuenta.acepta_movimiento:
             raise ValidationError(f'La cuenta {self.cuenta.codigo} no acepta movimientos')
+
+
+class AccionCambio(models.TextChoices):
+    """Acciones registradas en el historial de cambios"""
+    CREADO = 'CREADO', 'Creado'
+    ACTUALIZADO = 'ACTUALIZADO', 'Actualizado'
+    APROBADO = 'APROBADO', 'Aprobado'
+    ANULADO = 'ANULADO', 'Anulado'
+    ELIMINADO = 'ELIMINADO', 'Eliminado'
+
+class RegistroCambio(models.Model):
+    """
+    Historial de cambios (solo inserción) de comprobantes, detalles y movimientos de inventario.
+    El id creciente sirve de cursor para que sistemas externos sincronicen de forma incremental.
+    """
+    ENTIDADES = [
+        ('comprobante', 'Comprobante'),
+        ('detalle_comprobante', 'Detalle de Comprobante'),
+        ('movimiento_inventario', 'Movimiento de Inventario'),
+    ]
+    
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, null=True, related_name='cambios')
+    entidad = models.CharField(max_length=30, choices=ENTIDADES, verbose_name="Entidad")
+    objeto_id = models.BigIntegerField(verbose_name="ID del Objeto")
+    accion = models.CharField(max_length=15, choices=AccionCambio.choices, verbose_name="Acción")
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    
+    class Meta:
+        verbose_name = "Registro de Cambio"
+        verbose_name_plural = "Registros de Cambios"
+        ordering = ['id']
+        indexes = [models.Index(fields=['empresa', 'id'], name='cambio_empresa_id_idx')]
+    
+    def __str__(self):
+        return f"#{self.id} {self.entidad} {self.objeto_id} {self.accion}"
+    
+    @classmethod
+    def registrar(cls, empresa_id, entidad, objeto_id, accion):
+        """Agrega una entrada al historial"""
+        return cls.objects.create(empresa_id=empresa_id, entidad=entidad, objeto_id=objeto_id, accion=accion)
+    
+    @classmethod
+    def registrar_lote(cls, empresa_id, entidad, objeto_ids, accion):
+        """Agrega entradas para operaciones masivas que no disparan señales (bulk_create, update)"""
+        cls.objects.bulk_create(
+            [cls(empresa_id=empresa_id, entidad=entidad, objeto_id=objeto_id, accion=accion)
+             for objeto_id in objeto_ids],
+            batch_size=1000,
+        )
+
+
+# ============================================
+# SEÑALES: VERSIÓN DEL LIBRO E HISTORIAL DE CAMBIOS
+# ============================================
+
+def _accion_comprobante(instance, created):
+    """Determina la acción según la transición de estado del comprobante"""
+    if created:
+        return AccionCambio.CREADO
+    estado_original = getattr(instance, '_estado_original', None)
+    if instance.estado != estado_original and instance.estado in (AccionCambio.APROBADO, AccionCambio.ANULADO):
+        return instance.estado
+    return AccionCambio.ACTUALIZADO
+
+@receiver(post_save, sender=Comprobante)
+def comprobante_guardado(sender, instance, created, **kwargs):
+    """Marca el libro como modificado y registra el cambio del comprobante"""
+    Empresa.incrementar_version_contable(instance.empresa_id)
+    RegistroCambio.registrar(instance.empresa_id, 'comprobante', instance.pk, _accion_comprobante(instance, created))
+    instance._estado_original = instance.estado
+    indexar_comprobantes([instance.pk])
+
+@receiver(post_delete, sender=Comprobante)
+def comprobante_eliminado(sender, instance, **kwargs):
+    """Marca el libro como modificado y registra la eliminación del comprobante"""
+    Empresa.incrementar_version_contable(instance.empresa_id)
+    RegistroCambio.registrar(instance.empresa_id, 'comprobante', instance.pk, AccionCambio.ELIMINADO)
+    desindexar_comprobante(instance.pk)
+
+@receiver(post_save, sender=DetalleComprobante)
+@receiver(post_delete, sender=DetalleComprobante)
+def detalle_comprobante_modificado(sender, instance, created=False, **kwargs):
+    """Marca el libro como modificado y registra el cambio del detalle"""
+    # Si el comprobante ya no existe su propio post_delete registra el cambio
+    empresa_id = Comprobante.objects.filter(pk=instance.comprobante_id).values_list('empresa_id', flat=True).first()
+    if not empresa_id:
+        return
+    Empresa.incrementar_version_contable(empresa_id)
+    if kwargs.get('signal') is post_delete:
+        accion = AccionCambio.ELIMINADO
+    else:
+        accion = AccionCambio.CREADO if created else AccionCambio.ACTUALIZADO
+    RegistroCambio.registrar(empresa_id, 'detalle_comprobante', instance.pk, accion)
+    indexar_comprobantes([instance.comprobante_id])
+
+@receiver(post_save, sender='inventario.MovimientoInventario')
+def movimiento_inventario_creado(sender, instance, created, **kwargs):
+    """Registra los nuevos movimientos de inventario en el historial"""
+    if not created:
+        return
+    RegistroCambio.registrar(instance.empresa_id, 'movimiento_inventario', instance.pk, AccionCambio.CREADO)
@@ -1,3 +1,95 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from cuentas.models import Cuenta
+from empresa.models import Empresa
+from .cierre_ejercicio import CierreEjercicio
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante
+
+
+class CierreEjercicioTests(TestCase):
+    """Comprobantes de cierre y apertura del ejercicio y bloqueo del período"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nombre='Empresa', nit='900000002', direccion='x', representante_legal='y')
+        call_command('init_plan_cuentas', empresa=cls.empresa.id, force=True, verbosity=0)
+        cls.cuentas = {cuenta.codigo: cuenta for cuenta in Cuenta.objects.filter(empresa=cls.empresa)}
+
+    def _comprobante(self, numero, fecha, lineas):
+        comprobante = Comprobante.objects.create(
+            empresa=self.empresa, tipo=TipoComprobante.NOTA_CONTABLE, numero=numero, fecha=fecha, descripcion=numero
+        )
+        for codigo, debito, credito in lineas:
+            DetalleComprobante.objects.create(
+                comprobante=comprobante, cuenta=self.cuentas[codigo], descripcion=codigo,
+                debito=Decimal(debito), credito=Decimal(credito),
+            )
+        comprobante.aprobar()
+        return comprobante
+
+    def _registrar_ejercicio_2024(self):
+        self._comprobante('NC-1', date(2024, 1, 10), [('1110', 1000, 0), ('3105', 0, 1000)])
+        self._comprobante('NC-2', date(2024, 5, 10), [('1110', 500, 0), ('4135', 0, 500)])
+        self._comprobante('NC-3', date(2024, 6, 10), [('5105', 200, 0), ('1110', 0, 200)])
+
+    @staticmethod
+    def _lineas(comprobante):
+        return sorted(
+            (detalle.cuenta.codigo, detalle.debito, detalle.credito)
+            for detalle in comprobante.detalles.select_related('cuenta')
+        )
+
+    def test_cierre_salda_resultados_y_apertura_traslada_balance(self):
+        self._registrar_ejercicio_2024()
+
+        resultado = CierreEjercicio(self.empresa, 2024).ejecutar()
+
+        self.assertEqual(resultado['resultado'], Decimal('300.00'))
+        cierre, apertura = resultado['cierre'], resultado['apertura']
+        self.assertEqual((cierre.fecha, apertura.fecha), (date(2024, 12, 31), date(2025, 1, 1)))
+        self.assertEqual(self._lineas(cierre), [
+            ('3605', Decimal('0.00'), Decimal('300.00')),
+            ('4135', Decimal('500.00'), Decimal('0.00')),
+            ('5105', Decimal('0.00'), Decimal('200.00')),
+        ])
+        self.assertEqual(self._lineas(apertura), [
+            ('1110', Decimal('1300.00'), Decimal('0.00')),
+            ('3105', Decimal('0.00'), Decimal('1000.00')),
+            ('3605', Decimal('0.00'), Decimal('300.00')),
+        ])
+        for comprobante in (cierre, apertura):
+            self.assertEqual(comprobante.total_debito, comprobante.total_credito)
+        self.assertEqual(resultado['bloqueo'].fecha_hasta, date(2024, 12, 31))
+
+    def test_no_permite_cerrar_dos_veces(self):
+        self._registrar_ejercicio_2024()
+        CierreEjercicio(self.empresa, 2024).ejecutar()
+
+        with self.assertRaisesMessage(ValidationError, 'ya fue cerrado'):
+            CierreEjercicio(self.empresa, 2024).ejecutar()
+        with self.assertRaisesMessage(ValidationError, 'ya fue cerrado'):
+            CierreEjercicio(self.empresa, 2023).ejecutar()
+        self.assertEqual(Comprobante.objects.filter(empresa=self.empresa, tipo=TipoComprobante.CIERRE).count(), 1)
+
+    def test_no_permite_cerrar_un_periodo_bloqueado(self):
+        self._registrar_ejercicio_2024()
+        BloqueoPeriodo.objects.create(empresa=self.empresa, fecha_hasta=date(2025, 3, 31))
+
+        with self.assertRaisesMessage(ValidationError, 'bloqueado'):
+            CierreEjercicio(self.empresa, 2024).ejecutar()
+        self.assertFalse(Comprobante.objects.filter(empresa=self.empresa, tipo=TipoComprobante.CIERRE).exists())
+
+    def test_periodo_cerrado_no_admite_comprobantes(self):
+        self._registrar_ejercicio_2024()
+        CierreEjercicio(self.empresa, 2024).ejecutar()
+
+        with self.assertRaisesMessage(ValidationError, 'bloqueado'):
+            self._comprobante('NC-4', date(2024, 11, 30), [('1110', 10, 0), ('4135', 0, 10)])
+        with self.assertRaisesMessage(ValidationError, 'bloqueado'):
+            Comprobante.objects.get(numero='NC-1').delete()
+        self._comprobante('NC-5', date(2025, 2, 10), [('1110', 100, 0), ('4135', 0, 100)])
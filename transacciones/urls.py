@@ -6,6 +6,8 @@ app_name = 'transacciones'
 urlpatterns = [
     path('', views.lista_comprobantes, name='lista_comprobantes'),
     path('crear/', views.crear_comprobante, name='crear_comprobante'),
+    path('aprobar-lote/', views.aprobar_lote, name='aprobar_lote'),
+    path('anular-lote/', views.anular_lote, name='anular_lote'),
     path('<int:comprobante_id>/', views.detalle_comprobante, name='detalle_comprobante'),
     path('<int:comprobante_id>/editar/', views.editar_comprobante, name='editar_comprobante'),
     path('<int:comprobante_id>/aprobar/', views.aprobar_comprobante, name='aprobar_comprobante'),
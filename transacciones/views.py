@@ -3,39 +3,116 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
 from datetime import date
 from decimal import Decimal
-from .models import Comprobante, DetalleComprobante, TipoComprobante
+from .models import BloqueoPeriodo, Comprobante, DetalleComprobante, TipoComprobante, RegistroCambio, AccionCambio
+from .busqueda import filtrar_comprobantes, indexar_comprobantes
+from .aprobacion_lote import aprobar_comprobantes_lote, anular_comprobantes_lote
 from .forms import ComprobanteForm, DetalleComprobanteFormSet, FiltroComprobanteForm
 from empresa.models import Empresa
+from inventario.costeo import registrar_movimiento
 from inventario.models import Producto, MovimientoInventario
+from S_CONTABLE.utils import obtener_empresa_request, aplicar_filtro_empresa, empresas_visibles
 
 # Constantes para evitar duplicación
 DETALLE_COMPROBANTE_URL = 'transacciones:detalle_comprobante'
 CREAR_COMPROBANTE_TEMPLATE = 'transacciones/crear_comprobante.html'
 MAX_ITEMS_PER_DOCUMENT = 100  # Límite máximo de items por seguridad
+ERROR_PERIODO_BLOQUEADO = 'El comprobante pertenece a un período contable bloqueado.'
+ERROR_EMPRESA_LOTE = 'No tiene una empresa asignada. Filtre la lista por empresa antes de aprobar o anular en lote.'
+
+
+def _obtener_comprobante(request, comprobante_id, queryset=None):
+    """Comprobante de la empresa del usuario (los superusuarios ven todas) o 404"""
+    queryset = Comprobante.objects.all() if queryset is None else queryset
+    return get_object_or_404(aplicar_filtro_empresa(queryset, request), id=comprobante_id)
+
+
+def _eliminar_detalles(comprobante_id, detalle_ids):
+    """
+    Elimina detalles del comprobante con un único DELETE, sin cargar las filas
+    ni enviar post_delete por cada una (ningún modelo referencia a DetalleComprobante).
+    """
+    tabla = connection.ops.quote_name(DetalleComprobante._meta.db_table)
+    marcadores = ', '.join(['%s'] * len(detalle_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {tabla} WHERE comprobante_id = %s AND id IN ({marcadores})',
+            [comprobante_id, *detalle_ids],
+        )
 
 
 def _procesar_detalles_formset(formset):
     """
-    Procesa y guarda los detalles del formset.
-    Extrae lógica para reducir complejidad cognitiva.
+    Guarda los detalles del formset aplicando solo las diferencias con los
+    detalles existentes: un bulk_create para las filas nuevas, un bulk_update
+    para las modificadas y un único DELETE para las eliminadas.
+    Las filas ya se validaron en el formset (cuentas con una sola consulta), y
+    los totales se calculan en memoria y quedan asignados al comprobante,
+    que debe guardarse después.
     """
-    # Guardar detalles
-    detalles = formset.save(commit=False)
-    
-    # Eliminar detalles marcados para borrar
-    for detalle in formset.deleted_objects:
-        detalle.delete()
+    comprobante = formset.instance
+    nuevos, modificados, eliminados = [], [], []
+    total_debito = total_credito = Decimal('0')
+    orden = 0
+    
+    for form in formset.forms:
+        detalle = form.instance
+        if formset.can_delete and form.cleaned_data.get('DELETE'):
+            if detalle.pk:
+                eliminados.append(detalle.pk)
+            continue
+        if detalle.pk is None and not form.has_changed():
+            continue  # Fila extra vacía
+        
+        orden += 1
+        if detalle.pk is None:
+            detalle.comprobante = comprobante
+            detalle.orden = orden
+            nuevos.append(detalle)
+        elif form.has_changed() or detalle.orden != orden:
+            detalle.orden = orden
+            modificados.append(detalle)
+        total_debito += detalle.debito or 0
+        total_credito += detalle.credito or 0
+    
+    # Detalles existentes que no llegaron en el formulario se conservan tal cual
+    enviados = {form.instance.pk for form in formset.initial_forms}
+    for detalle in formset.get_queryset():
+        if detalle.pk not in enviados:
+            total_debito += detalle.debito
+            total_credito += detalle.credito
+    
+    if eliminados:
+        _eliminar_detalles(comprobante.pk, eliminados)
+    DetalleComprobante.objects.bulk_create(nuevos)
+    DetalleComprobante.objects.bulk_update(modificados, ['cuenta', 'descripcion', 'debito', 'credito', 'orden'])
+    
+    # Ninguna de estas operaciones dispara señales: historial, versión del libro e
+    # índice de búsqueda se actualizan explícitamente, una vez por comprobante
+    RegistroCambio.registrar_lote(comprobante.empresa_id, 'detalle_comprobante', eliminados, AccionCambio.ELIMINADO)
+    RegistroCambio.registrar_lote(comprobante.empresa_id, 'detalle_comprobante', [d.pk for d in nuevos], AccionCambio.CREADO)
+    RegistroCambio.registrar_lote(
+        comprobante.empresa_id, 'detalle_comprobante', [d.pk for d in modificados], AccionCambio.ACTUALIZADO
+    )
+    if eliminados or nuevos or modificados:
+        Empresa.incrementar_version_contable(comprobante.empresa_id)
+        indexar_comprobantes([comprobante.pk])
     
-    # Guardar y validar detalles
-    for i, detalle in enumerate(detalles, start=1):
-        detalle.orden = i
-        detalle.full_clean()
-        detalle.save()
+    comprobante.total_debito = total_debito
+    comprobante.total_credito = total_credito
+
+
+def _formulario_comprobante(request, *args, **kwargs):
+    """
+    Crea el ComprobanteForm limitando las empresas a las visibles para el usuario.
+    """
+    form = ComprobanteForm(*args, **kwargs)
+    form.fields['empresa'].queryset = empresas_visibles(request)
+    return form
 
 
 def _mostrar_mensaje_balanceo(request, comprobante):
@@ -55,7 +132,10 @@ def lista_comprobantes(request):
     """Lista todos los comprobantes con filtros usando utilidades centralizadas"""
     from S_CONTABLE.utils import aplicar_filtros_fecha, paginar_queryset
     
-    comprobantes = Comprobante.objects.select_related('empresa', 'usuario_creador').all()
+    # Solo los comprobantes de las empresas visibles para el usuario
+    comprobantes = aplicar_filtro_empresa(
+        Comprobante.objects.select_related('empresa', 'usuario_creador'), request
+    )
     
     # Filtros
     empresa_id = request.GET.get('empresa')
@@ -63,9 +143,7 @@ def lista_comprobantes(request):
     estado = request.GET.get('estado')
     fecha_desde = request.GET.get('fecha_desde')
     fecha_hasta = request.GET.get('fecha_hasta')
-    
-    if empresa_id:
-        comprobantes = comprobantes.filter(empresa_id=empresa_id)
+    busqueda = request.GET.get('busqueda', '').strip()
     
     if tipo:
         comprobantes = comprobantes.filter(tipo=tipo)
@@ -76,22 +154,22 @@ def lista_comprobantes(request):
     # Usar helper centralizado para filtros de fecha
     comprobantes = aplicar_filtros_fecha(comprobantes, fecha_desde, fecha_hasta, campo_fecha='fecha')
     
+    # Búsqueda en número, descripción y líneas usando el índice de texto completo
+    comprobantes = filtrar_comprobantes(comprobantes, busqueda)
+    
     # Usar helper centralizado para paginación
     page_obj = paginar_queryset(comprobantes, request, items_per_page=15)
     
-    # Para los filtros
-    empresas = Empresa.objects.filter(activo=True)
-    productos_activos = Producto.objects.filter(estado='activo').order_by('nombre')
-    
     context = {
         'page_obj': page_obj,
-        'empresas': empresas,
+        'empresas': empresas_visibles(request),
         'tipos': TipoComprobante.choices,
         'empresa_seleccionada': empresa_id,
         'tipo_seleccionado': tipo,
         'estado_seleccionado': estado,
         'fecha_desde': fecha_desde,
         'fecha_hasta': fecha_hasta,
+        'busqueda': busqueda,
     }
     
     return render(request, 'transacciones/lista_comprobantes.html', context)
@@ -100,9 +178,8 @@ def lista_comprobantes(request):
 @require_GET
 def detalle_comprobante(request, comprobante_id):
     """Muestra el detalle de un comprobante"""
-    comprobante = get_object_or_404(
-        Comprobante.objects.select_related('empresa', 'usuario_creador'),
-        id=comprobante_id
+    comprobante = _obtener_comprobante(
+        request, comprobante_id, Comprobante.objects.select_related('empresa', 'usuario_creador')
     )
     
     # Obtener detalles ordenados
@@ -111,6 +188,7 @@ def detalle_comprobante(request, comprobante_id):
     context = {
         'comprobante': comprobante,
         'detalles': detalles,
+        'bloqueado': comprobante.esta_bloqueado(),
     }
     
     return render(request, 'transacciones/detalle_comprobante.html', context)
@@ -122,8 +200,10 @@ def detalle_comprobante(request, comprobante_id):
 def crear_comprobante(request):
     """Crea un nuevo comprobante con sus detalles"""
     if request.method == 'POST':
-        form = ComprobanteForm(request.POST)
-        formset = DetalleComprobanteFormSet(request.POST)
+        form = _formulario_comprobante(request, request.POST)
+        # Las cuentas de los detalles se validan contra la empresa elegida
+        empresa_id = form.cleaned_data['empresa'].id if form.is_valid() else None
+        formset = DetalleComprobanteFormSet(request.POST, empresa_id=empresa_id)
         
         # Mostrar errores si el formulario no es válido
         if not form.is_valid():
@@ -149,18 +229,10 @@ def crear_comprobante(request):
                 comprobante.usuario_creador = request.user
                 comprobante.save()
                 
-                # Guardar detalles
+                # Guardar detalles y totales
                 formset.instance = comprobante
-                detalles = formset.save(commit=False)
-                
-                # Asignar orden y guardar
-                for i, detalle in enumerate(detalles, start=1):
-                    detalle.orden = i
-                    detalle.full_clean()  # Validar
-                    detalle.save()
-                
-                # Calcular totales
-                comprobante.calcular_totales()
+                _procesar_detalles_formset(formset)
+                comprobante.save()
                 
                 messages.success(
                     request, 
@@ -183,8 +255,9 @@ def crear_comprobante(request):
             except ValidationError as e:
                 messages.error(request, f'Error de validación: {e}')
     else:
-        form = ComprobanteForm()
-        formset = DetalleComprobanteFormSet()
+        empresa = obtener_empresa_request(request)
+        form = _formulario_comprobante(request, initial={'empresa': empresa})
+        formset = DetalleComprobanteFormSet(empresa_id=empresa.id if empresa else None)
     
     context = {
         'form': form,
@@ -200,15 +273,20 @@ def crear_comprobante(request):
 @require_http_methods(['GET', 'POST'])
 def editar_comprobante(request, comprobante_id):
     """Edita un comprobante existente (solo si está en borrador)"""
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id)
+    comprobante = _obtener_comprobante(request, comprobante_id)
     
     if comprobante.estado != 'BORRADOR':
         messages.error(request, 'Solo se pueden editar comprobantes en estado BORRADOR.')
         return redirect(DETALLE_COMPROBANTE_URL, comprobante_id=comprobante.id)
     
+    if comprobante.esta_bloqueado():
+        messages.error(request, ERROR_PERIODO_BLOQUEADO)
+        return redirect(DETALLE_COMPROBANTE_URL, comprobante_id=comprobante.id)
+    
     if request.method == 'POST':
-        form = ComprobanteForm(request.POST, instance=comprobante)
-        formset = DetalleComprobanteFormSet(request.POST, instance=comprobante)
+        form = _formulario_comprobante(request, request.POST, instance=comprobante)
+        empresa_id = form.cleaned_data['empresa'].id if form.is_valid() else comprobante.empresa_id
+        formset = DetalleComprobanteFormSet(request.POST, instance=comprobante, empresa_id=empresa_id)
         
         if form.is_valid() and formset.is_valid():
             try:
@@ -222,11 +300,16 @@ def editar_comprobante(request, comprobante_id):
                         'comprobante': comprobante,
                         'titulo': 'Editar Comprobante',
                     }
-                    return render(request, 'transacciones/editar_comprobante.html', context)
+                    return render(request, CREAR_COMPROBANTE_TEMPLATE, context)
                 
-                form.save()
+                # La nueva fecha no puede caer en un período bloqueado; se valida antes
+                # de escribir los detalles
+                BloqueoPeriodo.validar_fechas(comprobante.empresa_id, comprobante.fecha)
+                
+                # Los detalles se escriben primero para que el guardado del comprobante
+                # (con los totales ya calculados) actualice la versión y el índice de búsqueda
                 _procesar_detalles_formset(formset)
-                comprobante.calcular_totales()
+                form.save()
                 
                 messages.success(request, f'Comprobante "{comprobante.numero}" actualizado exitosamente.')
                 _mostrar_mensaje_balanceo(request, comprobante)
@@ -236,7 +319,7 @@ def editar_comprobante(request, comprobante_id):
             except ValidationError as e:
                 messages.error(request, f'Error de validación: {e}')
     else:
-        form = ComprobanteForm(instance=comprobante)
+        form = _formulario_comprobante(request, instance=comprobante)
         formset = DetalleComprobanteFormSet(instance=comprobante)
     
     context = {
@@ -252,7 +335,7 @@ def editar_comprobante(request, comprobante_id):
 @require_http_methods(['GET'])
 def aprobar_comprobante(request, comprobante_id):
     """Aprueba un comprobante (valida partida doble)"""
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id)
+    comprobante = _obtener_comprobante(request, comprobante_id)
     
     if comprobante.estado != 'BORRADOR':
         messages.error(request, 'Solo se pueden aprobar comprobantes en estado BORRADOR.')
@@ -270,7 +353,7 @@ def aprobar_comprobante(request, comprobante_id):
 @require_http_methods(['GET'])
 def anular_comprobante(request, comprobante_id):
     """Anula un comprobante aprobado"""
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id)
+    comprobante = _obtener_comprobante(request, comprobante_id)
     
     if comprobante.estado == 'ANULADO':
         messages.error(request, 'El comprobante ya está anulado.')
@@ -284,17 +367,80 @@ def anular_comprobante(request, comprobante_id):
     
     return redirect(DETALLE_COMPROBANTE_URL, comprobante_id=comprobante.id)
 
+def _ids_seleccionados(request):
+    """Ids de comprobantes marcados en la lista (checkboxes 'comprobantes')"""
+    return [int(valor) for valor in request.POST.getlist('comprobantes') if valor.isdigit()]
+
+
+def _empresa_lote(request):
+    """
+    Empresa sobre la que actúan las operaciones por lotes. Un superusuario
+    usa la empresa filtrada en la lista (campo 'empresa') o la de su perfil;
+    sin ninguna de las dos no se elige una por defecto y se retorna None.
+    """
+    if not request.user.is_superuser:
+        return obtener_empresa_request(request)
+    empresa_id = request.POST.get('empresa', '').strip()
+    if empresa_id.isdigit():
+        return Empresa.objects.filter(pk=int(empresa_id)).first()
+    perfil = getattr(request.user, 'perfil', None)
+    return perfil.empresa if perfil and perfil.empresa_id else None
+
+
+def _mensajes_lote(request, resultado, accion):
+    """Resume el resultado de una operación por lotes con mensajes"""
+    if resultado['procesados']:
+        messages.success(request, f'✅ {len(resultado["procesados"])} comprobantes {accion}.')
+    for fallido in resultado['fallidos'][:10]:
+        messages.error(request, f'❌ {fallido["numero"] or fallido["id"]}: {fallido["error"]}')
+    if len(resultado['fallidos']) > 10:
+        messages.error(request, f'... y {len(resultado["fallidos"]) - 10} comprobantes más no se procesaron.')
+
+
+@login_required
+@require_POST
+def aprobar_lote(request):
+    """Aprueba los comprobantes seleccionados en la lista (un solo UPDATE)"""
+    empresa = _empresa_lote(request)
+    ids = _ids_seleccionados(request)
+    if not empresa:
+        messages.error(request, ERROR_EMPRESA_LOTE)
+    elif not ids:
+        messages.warning(request, 'No seleccionó comprobantes.')
+    else:
+        _mensajes_lote(request, aprobar_comprobantes_lote(empresa, ids), 'aprobados')
+    return redirect('transacciones:lista_comprobantes')
+
+
+@login_required
+@require_POST
+def anular_lote(request):
+    """Anula los comprobantes seleccionados en la lista (un solo UPDATE)"""
+    empresa = _empresa_lote(request)
+    ids = _ids_seleccionados(request)
+    if not empresa:
+        messages.error(request, ERROR_EMPRESA_LOTE)
+    elif not ids:
+        messages.warning(request, 'No seleccionó comprobantes.')
+    else:
+        _mensajes_lote(request, anular_comprobantes_lote(empresa, ids), 'anulados')
+    return redirect('transacciones:lista_comprobantes')
+
 @login_required
 # NOSONAR - Django CSRF protection is enabled by default for POST requests
 @require_http_methods(['GET', 'POST'])
 def eliminar_comprobante(request, comprobante_id):
     """Elimina un comprobante (solo si está en borrador)"""
-    comprobante = get_object_or_404(Comprobante, id=comprobante_id)
+    comprobante = _obtener_comprobante(request, comprobante_id)
     
     if comprobante.estado != 'BORRADOR':
         messages.error(request, 'Solo se pueden eliminar comprobantes en estado BORRADOR.')
         return redirect(DETALLE_COMPROBANTE_URL, comprobante_id=comprobante.id)
     
+    if comprobante.esta_bloqueado():
+        messages.error(request, ERROR_PERIODO_BLOQUEADO)
+        return redirect(DETALLE_COMPROBANTE_URL, comprobante_id=comprobante.id)
+    
     if request.method == 'POST':
         numero = comprobante.numero
         comprobante.delete()
@@ -309,11 +455,11 @@ def eliminar_comprobante(request, comprobante_id):
 # ============================================
 
 def _obtener_empresa_desde_post(request):
-    """Obtiene la empresa desde el POST o la primera activa."""
+    """Obtiene la empresa desde el POST o la del usuario."""
     empresa_id = request.POST.get('empresa')
     if empresa_id:
-        return Empresa.objects.get(id=empresa_id)
-    return Empresa.objects.filter(activo=True).first()
+        return empresas_visibles(request).get(id=empresa_id)
+    return obtener_empresa_request(request)
 
 def _agregar_items_a_factura(request, factura, usuario):
     """Agrega ítems a la factura validando stock y registrando movimientos."""
@@ -324,7 +470,7 @@ def _agregar_items_a_factura(request, factura, usuario):
         if not prod_id:
             continue
         try:
-            producto = Producto.objects.get(id=prod_id, estado='activo')
+            producto = Producto.objects.de_empresa(factura.empresa).get(id=prod_id, estado='activo')
         except Producto.DoesNotExist:
             raise ValidationError('Producto inválido en la fila de ítems')
 
@@ -344,17 +490,15 @@ def _agregar_items_a_factura(request, factura, usuario):
         # 1) Registrar ítem de venta (ingreso)
         factura.agregar_item(f"{producto.codigo} - {producto.nombre}", cantidad, precio_venta)
 
-        # 2) Disminuir stock y crear movimiento de salida para COSTO DE VENTAS
-        producto.cantidad -= int(cantidad)
-        producto.save()
-        MovimientoInventario.objects.create(
+        # 2) Disminuir stock y crear movimiento de salida para COSTO DE VENTAS (valorado por FIFO)
+        registrar_movimiento(MovimientoInventario(
             producto=producto,
             tipo='salida',
             cantidad=int(cantidad),
             motivo='Venta (salida automática)',
             observaciones=f'Factura a {request.POST.get("cliente")}',
             usuario=usuario,
-        )
+        ))
 
 @login_required
 @require_http_methods(['GET', 'POST'])  # NOSONAR python:S3752 - CSRF token is present in template
@@ -365,7 +509,7 @@ def crear_factura_venta(request):
     """
     from .documentos import FacturaVenta
     
-    empresas = Empresa.objects.filter(activo=True)
+    empresas = empresas_visibles(request)
     
     if request.method == 'POST':
         try:
@@ -387,11 +531,10 @@ def crear_factura_venta(request):
         except Exception as e:
             messages.error(request, f'Error al crear la factura: {str(e)}')
     
-    productos_activos = Producto.objects.filter(estado='activo').order_by('nombre')
+    # Los productos se buscan desde el formulario con inventario:buscar_productos
     context = {
         'empresas': empresas,
         'today': date.today(),
-        'productos': productos_activos,
     }
     
     return render(request, 'transacciones/documentos/crear_factura_venta.html', context)
@@ -407,12 +550,12 @@ def crear_nota_credito(request):
     """
     from .documentos import NotaCredito
     
-    empresas = Empresa.objects.filter(activo=True)
+    empresas = empresas_visibles(request)
     
     if request.method == 'POST':
         try:
             empresa_id = request.POST.get('empresa')
-            empresa = Empresa.objects.get(id=empresa_id)
+            empresa = empresas_visibles(request).get(id=empresa_id)
             
             # Crear la nota de crédito usando la clase abstracta
             nota = NotaCredito(
@@ -460,12 +603,12 @@ def crear_recibo_caja(request):
     """
     from .documentos import ReciboCaja
     
-    empresas = Empresa.objects.filter(activo=True)
+    empresas = empresas_visibles(request)
     
     if request.method == 'POST':
         try:
             empresa_id = request.POST.get('empresa')
-            empresa = Empresa.objects.get(id=empresa_id)
+            empresa = empresas_visibles(request).get(id=empresa_id)
             
             # Crear el recibo usando la clase abstracta
             recibo = ReciboCaja(